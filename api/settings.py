@@ -62,6 +62,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'drf_yasg',
     'restapi',
@@ -141,6 +142,16 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+# Every process caches in its own memory. Cached responses and Slack payloads are keyed by version counters kept in
+# the database (see restapi.cache_versions), so a write made by any process, web or worker, is seen by all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
 
 
 # Password validation
@@ -171,7 +182,7 @@ if secrets is None:
             'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
             'PAGE_SIZE': 25,
             'DEFAULT_AUTHENTICATION_CLASSES': (
-                'rest_framework_simplejwt.authentication.JWTAuthentication',
+                'restapi.authentication.MemberJWTAuthentication',
             ),
         }
     else:
@@ -182,7 +193,7 @@ if secrets is None:
             'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
             'PAGE_SIZE': 25,
             'DEFAULT_AUTHENTICATION_CLASSES': (
-                'rest_framework_simplejwt.authentication.JWTAuthentication',
+                'restapi.authentication.MemberJWTAuthentication',
             ),
         }
 else:
@@ -194,7 +205,7 @@ else:
             'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
             'PAGE_SIZE': 25,
             'DEFAULT_AUTHENTICATION_CLASSES': (
-                'rest_framework_simplejwt.authentication.JWTAuthentication',
+                'restapi.authentication.MemberJWTAuthentication',
             ),
         }
     else:
@@ -205,7 +216,7 @@ else:
             'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
             'PAGE_SIZE': 25,
             'DEFAULT_AUTHENTICATION_CLASSES': (
-                'rest_framework_simplejwt.authentication.JWTAuthentication',
+                'restapi.authentication.MemberJWTAuthentication',
             ),
         }
 
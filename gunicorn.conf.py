@@ -0,0 +1,19 @@
+# Read by gunicorn on start-up, from the directory it's started in.
+import os
+
+# Help flag long polls and event streams keep their request open while they wait for a flag. A sync worker would be
+# tied up for the whole wait, and killed once a stream outlived the worker timeout. gthread workers serve each request
+# on a thread of their own and only time out when the worker itself stops responding, so streams can stay open.
+# EventViewSet.max_waiting keeps them from taking every thread.
+worker_class = 'gthread'
+timeout = 30
+
+# EventViewSet lets all but 4 of each worker's threads wait on help flags, and reads WEB_THREADS too, so the two stay
+# in step. At 12 threads that's 8 streams per worker, 16 per dyno.
+#
+# Every thread keeps a Postgres connection of its own open between requests (conn_max_age in api/settings.py), so
+# workers * threads is how many connections a web dyno can hold: 2 * 12 = 24. The outbox, reminders and scores
+# processes in the Procfile hold one each, plus one per lease (see restapi.leases), for about 6 more. That needs more
+# than a 20 connection plan. On one, run WEB_CONCURRENCY=1, for 12 + 6 = 18.
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('WEB_THREADS', 12))
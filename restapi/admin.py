@@ -6,6 +6,12 @@ from restapi.models.events import Event
 from restapi.models.event_attendances import EventAttendance
 from restapi.models.guests import Guest
 from restapi.models.aliases import Alias
+from restapi.models.slack_messages import SlackMessage
+from restapi.models.leases import Lease
+from restapi.models.member_score_updates import MemberScoreUpdate
+from restapi.models.member_score_scales import MemberScoreScale
+from restapi.models.member_ranks import MemberRank
+from restapi.models.api_key_usages import APIKeyUsage
 
 # Register your models here.
 admin.site.register(Member)
@@ -15,3 +21,9 @@ admin.site.register(Event)
 admin.site.register(EventAttendance)
 admin.site.register(Guest)
 admin.site.register(Alias)
+admin.site.register(SlackMessage)
+admin.site.register(Lease)
+admin.site.register(MemberScoreUpdate)
+admin.site.register(MemberScoreScale)
+admin.site.register(MemberRank)
+admin.site.register(APIKeyUsage)
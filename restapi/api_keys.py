@@ -0,0 +1,152 @@
+import atexit
+import datetime
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework_api_key.models import APIKey
+from rest_framework_api_key.permissions import BaseHasAPIKey
+
+from restapi.batching import BatchBuffer
+from restapi.models.api_key_usages import APIKeyUsage
+
+
+class APIKeyVerifier:
+    """
+    Verifies API keys, remembering the ones that passed.
+
+    Checking a key the usual way means finding it by prefix and checking it against a password hash, which is slow
+    on purpose. A key that passes is remembered by its SHA-256 for `ttl`, in an LRU of at most `max_size` keys, so
+    a client polling with the same key pays for that once per ttl rather than on every request. Keys that fail
+    aren't remembered.
+
+    Saving or deleting a key forgets it straight away in this process (see restapi.signals). Other processes keep
+    trusting it until their entry runs out, so ttl bounds how long a revoked key can still be used.
+    """
+
+    def __init__(self, max_size=1000, ttl=datetime.timedelta(seconds=60)):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+
+    def verify(self, key):
+        """
+        Returns the id of the API key, or None if it isn't a usable key.
+        """
+        digest = hashlib.sha256(key.encode()).digest()
+
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                api_key_id, checked_until, expiry_date = entry
+
+                if time.monotonic() < checked_until and (expiry_date is None or expiry_date > timezone.now()):
+                    self.entries.move_to_end(digest)
+                    return api_key_id
+                del self.entries[digest]
+
+            generation = self.generation
+
+        try:
+            api_key = APIKey.objects.get_from_key(key)
+        except APIKey.DoesNotExist:
+            return None
+
+        if api_key.has_expired:
+            return None
+
+        with self.lock:
+            # A key forgotten while it was being checked may have just been revoked, so it's not remembered.
+            if generation == self.generation:
+                self.entries[digest] = (api_key.id, time.monotonic() + self.ttl.total_seconds(), api_key.expiry_date)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        return api_key.id
+
+    def forget(self, api_key_id):
+        with self.lock:
+            self.generation += 1
+
+            for digest in [digest for digest, entry in self.entries.items() if entry[0] == api_key_id]:
+                del self.entries[digest]
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+class APIKeyUsageBuffer(BatchBuffer):
+    """
+    Counts requests per API key in memory and writes the counts to APIKeyUsage in batches: `max_delay` seconds
+    after the first request of a batch, or sooner once `max_batch` requests are waiting. Each flush is an UPDATE
+    per key used, however many requests it made.
+    """
+
+    def __init__(self, max_batch=1000, max_delay=5.0):
+        super().__init__(max_batch, max_delay)
+
+    def add(self, api_key_id):
+        self.queue(api_key_id, (1, timezone.now()))
+
+    def combine(self, queued, value):
+        return queued[0] + value[0], max(queued[1], value[1])
+
+    def weight(self, value):
+        return value[0]
+
+    def write(self, batch):
+        with transaction.atomic():
+            # A key deleted since it was used has nowhere to count its requests.
+            api_key_ids = set(APIKey.objects.filter(id__in=list(batch)).values_list('id', flat=True))
+
+            APIKeyUsage.objects.bulk_create([
+                APIKeyUsage(api_key_id=api_key_id) for api_key_id in api_key_ids
+            ], ignore_conflicts=True)
+
+            for api_key_id in api_key_ids:
+                count, last_used_at = batch[api_key_id]
+                APIKeyUsage.objects.filter(api_key_id=api_key_id).update(
+                    request_count=F('request_count') + count,
+                    last_used_at=last_used_at
+                )
+
+
+api_key_verifier = APIKeyVerifier()
+api_key_usage = APIKeyUsageBuffer()
+
+# Whatever's still counted when the process exits is written on the way out.
+atexit.register(api_key_usage.flush)
+
+
+class HasCachedAPIKey(BaseHasAPIKey):
+    """
+    HasAPIKey, verifying keys through api_key_verifier and counting each request against its key.
+    """
+    model = APIKey
+
+    def has_permission(self, request, view):
+        api_key_id = self.verify(request)
+        if api_key_id is None:
+            return False
+
+        api_key_usage.add(api_key_id)
+        return True
+
+    def has_object_permission(self, request, view, obj):
+        return self.verify(request) is not None
+
+    def verify(self, request):
+        key = self.get_key(request)
+        if not key:
+            return None
+
+        return api_key_verifier.verify(key)
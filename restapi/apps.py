@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RestapiConfig(AppConfig):
     name = 'restapi'
     verbose_name = 'The Wooglin REST API'
+
+    def ready(self):
+        # Registers the model signal handlers.
+        from restapi import signals  # noqa: F401
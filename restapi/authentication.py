@@ -0,0 +1,135 @@
+import copy
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from restapi.models.members import Member
+
+
+def user_member(user):
+    """
+    The user's member, or None if they don't have one. Free for users loaded by UserCache, which selects it.
+    """
+    try:
+        return user.member
+    except Member.DoesNotExist:
+        return None
+
+
+def request_member(request):
+    """
+    The requesting user's member, or None. MemberJWTAuthentication sets request.member as it authenticates; for a
+    request authenticated any other way (a session, or force_authenticate in tests) it's loaded here on first use.
+    """
+    if not hasattr(request, 'member'):
+        request.member = user_member(request.user) if request.user.is_authenticated else None
+    return request.member
+
+
+class UserCache:
+    """
+    Remembers users and their members for `ttl`, in an LRU of at most `max_size` users, so an authenticated request
+    doesn't load them from the database every time.
+
+    A user is loaded with their member in one query. Each request gets its own copies, so nothing a view does to
+    request.user or request.member leaks into another request. Saving or deleting a user or member forgets them in
+    this process (see restapi.signals); other processes see the change once their entry runs out.
+    """
+
+    def __init__(self, max_size=1000, ttl=datetime.timedelta(seconds=60)):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+
+    def get(self, user_id):
+        """
+        Returns (user, member) for the user id, where member is None for a user without one. Raises
+        User.DoesNotExist for a missing user.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                user, member, checked_until = entry
+
+                if time.monotonic() < checked_until:
+                    self.entries.move_to_end(user_id)
+                    return copy.deepcopy((user, member))
+                del self.entries[user_id]
+
+            generation = self.generation
+
+        user = User.objects.select_related('member').get(id=user_id)
+        member = user_member(user)
+
+        with self.lock:
+            # A user forgotten while they were being loaded may have just changed, so they're not remembered.
+            if generation == self.generation:
+                self.entries[user_id] = (user, member, time.monotonic() + self.ttl.total_seconds())
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        return copy.deepcopy((user, member))
+
+    def forget(self, user_id):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+class MemberJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, resolving users through user_cache, and setting request.member to the user's member (or None
+    if they don't have one).
+
+    Tokens from /api/token/ carry member_id and is_staff claims. They're checked against the user as they stand,
+    so a token issued before someone's role changed stops working, rather than carrying the old role until it
+    expires. Tokens issued without the claims are accepted as they are.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+
+        user, validated_token = result
+        request.member = user_member(user)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        try:
+            user, member = user_cache.get(user_id)
+        except (User.DoesNotExist, ValueError):
+            raise AuthenticationFailed("User not found", code='user_not_found')
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+
+        member_id = member.id if member is not None else None
+        if validated_token.get('is_staff', user.is_staff) != user.is_staff or \
+                validated_token.get('member_id', member_id) != member_id:
+            raise AuthenticationFailed("This token is out of date. Log in again to get a new one.",
+                                       code='token_out_of_date')
+
+        return user
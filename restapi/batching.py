@@ -0,0 +1,122 @@
+import logging
+import threading
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBuffer:
+    """
+    Collects writes in memory, by key, and makes them in batches: `max_delay` seconds after the first write of a
+    batch, from a timer thread, or straight away once `max_batch` writes are waiting.
+
+    Subclasses write a batch in write(), and say how two writes to the same key fold together in combine() and how
+    many writes a queued value stands for in weight(). A batch that fails to write is queued again for the next one.
+    Register flush() with atexit to write whatever's still waiting when the process exits.
+    """
+
+    def __init__(self, max_batch, max_delay):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.pending_weight = 0
+        self.timer = None
+
+    def queue(self, key, value):
+        """
+        Queues a write. Returns False, without queueing it, if accept() turns it down.
+        """
+        with self.lock:
+            if not self.accept(key):
+                return False
+
+            self.put(key, value)
+            full = self.pending_weight >= self.max_batch
+            if not full and self.timer is None:
+                self.start_timer()
+
+        if full:
+            self.flush()
+        return True
+
+    def requeue(self, batch):
+        with self.lock:
+            for key, value in batch.items():
+                self.put(key, value)
+
+            if self.timer is None:
+                self.start_timer()
+
+    def put(self, key, value):
+        if key in self.pending:
+            value = self.combine(self.pending[key], value)
+            self.pending_weight -= self.weight(self.pending[key])
+
+        self.pending[key] = value
+        self.pending_weight += self.weight(value)
+
+    def start_timer(self):
+        self.timer = threading.Timer(self.max_delay, self.flush_in_background)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """
+        Writes everything queued. Returns how many writes were made.
+        """
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            self.pending_weight = 0
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        if not batch:
+            return 0
+
+        written = self.write_batch(batch)
+        self.after_write(written)
+
+        return sum(self.weight(value) for value in written.values())
+
+    def write_batch(self, batch):
+        """
+        Writes a batch and returns what was written. A batch that fails is queued again.
+        """
+        try:
+            self.write(batch)
+        except Exception:
+            logger.exception(f"Unable to write a batch of {len(batch)} for {type(self).__name__}, queueing it again")
+            self.requeue(batch)
+            return {}
+
+        return batch
+
+    def accept(self, key):
+        """
+        Whether a write to the key can be queued. Called with the lock held.
+        """
+        return True
+
+    def combine(self, queued, value):
+        return value
+
+    def weight(self, value):
+        return 1
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def after_write(self, batch):
+        """
+        Called with whatever was written by each flush.
+        """
@@ -0,0 +1,85 @@
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from restapi.models.cache_versions import CacheVersion
+
+
+def current_versions(keys):
+    """
+    Returns {key: version} for the version counters, in a single query once they all exist.
+
+    Cached values are stored under keys that include the versions they were built from. Bumping a version drops them
+    all at once, since they're never read again, and a value built from data read just before the bump lands under
+    the old version rather than the new one. The counters are rows in CacheVersion, so a bump made by any process
+    is seen by all of them, while the values themselves can stay in each process's own cache.
+    """
+    keys = set(keys)
+    versions = dict(CacheVersion.objects.filter(key__in=keys).values_list('key', 'version'))
+
+    missing = keys - set(versions)
+    if missing:
+        create_versions(missing)
+        versions.update(CacheVersion.objects.filter(key__in=missing).values_list('key', 'version'))
+
+    return {key: versions.get(key, 0) for key in keys}
+
+
+def bump_versions(keys):
+    keys = set(keys)
+    if not keys:
+        return
+
+    bumped = CacheVersion.objects.filter(key__in=keys).update(version=F('version') + 1)
+    if bumped < len(keys):
+        create_versions(keys)
+
+
+def bump_versions_on_commit(keys, using=None):
+    """
+    Bumps the versions once the current transaction commits. Bumping any earlier would let a read of the old data,
+    made before the commit, be cached under the new version. Until then, the writing transaction should read around
+    the cache for these keys (see pending_bumps).
+    """
+    keys = set(keys)
+
+    def bump():
+        bump_versions(keys)
+    bump.cache_version_keys = keys
+
+    transaction.on_commit(bump, using=using)
+
+
+def delete_versions_on_commit(keys, using=None):
+    """
+    Deletes the version counters once the current transaction commits, for data that's gone for good. Values cached
+    under them are never read again, and expire from the cache in time. Bumps the transaction queued earlier for the
+    same keys run first, so they can't recreate the counters afterwards.
+    """
+    keys = set(keys)
+
+    def delete():
+        CacheVersion.objects.filter(key__in=keys).delete()
+
+    transaction.on_commit(delete, using=using)
+
+
+def pending_bumps(using=None):
+    """
+    The version keys the current transaction will bump when it commits. A transaction that's rolled back or rolled
+    back to a savepoint drops its callbacks, and their keys with them.
+    """
+    connection = transaction.get_connection(using)
+    return {
+        key for savepoint_ids, callback in connection.run_on_commit
+        for key in getattr(callback, 'cache_version_keys', ())
+    }
+
+
+def create_versions(keys):
+    # A new counter starts from the clock, so it can't collide with a version some process cached values under before
+    # the counter was last reset.
+    CacheVersion.objects.bulk_create([
+        CacheVersion(key=key, version=time.time_ns()) for key in keys
+    ], ignore_conflicts=True)
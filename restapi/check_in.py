@@ -0,0 +1,351 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from restapi.member_scores import members_for_guests, queue_score_updates
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+from restapi.serializers import CheckInRecordSerializer
+
+NON_DIGITS = re.compile(r'\D')
+
+
+class CheckInError(Exception):
+    """
+    Raised when a guest can't be checked in. `field` and `message` make up the error response body.
+    """
+
+    def __init__(self, field, message, status_code=400):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+        self.status_code = status_code
+
+
+def normalize_phone(phone):
+    """
+    Reduces a phone number to its digits, so the same number typed differently at the door finds the same guest.
+    """
+    digits = NON_DIGITS.sub('', str(phone or ''))
+
+    if not 7 <= len(digits) <= 15:
+        raise CheckInError('phone', "A phone number must have between 7 and 15 digits.")
+    return digits
+
+
+def find_or_create_guest(phone, name=None):
+    """
+    Looks a guest up by phone, through the unique Guest.phone index, creating them if this is their first visit.
+    """
+    guest = Guest.objects.filter(phone=phone).first()
+    if guest is not None:
+        return guest
+
+    name = (name or '').strip()
+    if not name:
+        raise CheckInError('name', "A name is required the first time a guest checks in.")
+
+    try:
+        with transaction.atomic():
+            return Guest.objects.create(phone=phone, name=name[:255])
+    except IntegrityError:
+        # Another first visit with the same number created the guest since the lookup above.
+        return Guest.objects.get(phone=phone)
+
+
+def recount_guests(event_ids):
+    """
+    Resets guest_count from the attendance rows for each of the given events, in a single UPDATE.
+    """
+    attendance_count = EventAttendance.objects.filter(event=OuterRef('pk')).values('event').annotate(
+        count=Count('id')
+    ).values('count')
+
+    Event.objects.filter(id__in=event_ids).update(guest_count=Coalesce(Subquery(attendance_count), Value(0)))
+
+
+def check_in(event_id, phone, name=None, arrival_time=None):
+    """
+    Checks a guest in to an event and returns (attendance, guest_count).
+
+    The attendance row and the event's guest_count change together in one short transaction. The count moves by an
+    F() increment rather than a recount, so concurrent check-ins to the same event never lose an update. A guest
+    already checked in raises a CheckInError, and the unique (event, guest) constraint keeps two simultaneous
+    check-ins for one guest from both going through.
+    """
+    phone = normalize_phone(phone)
+    guest = find_or_create_guest(phone, name)
+
+    try:
+        with transaction.atomic():
+            attendance = EventAttendance.objects.create(
+                event_id=event_id,
+                guest=guest,
+                arrival_time=arrival_time or timezone.now()
+            )
+
+            Event.objects.filter(id=event_id).update(guest_count=F('guest_count') + 1)
+            guest_count = Event.objects.filter(id=event_id).values_list('guest_count', flat=True).get()
+    except IntegrityError:
+        raise CheckInError('guest', guest.name + " has already checked in to this event.")
+
+    return attendance, guest_count
+
+
+class CheckInSync:
+    """
+    Records a batch of check-ins that a door device took while offline.
+
+    Records are validated one by one, and invalid ones are reported without holding up the rest. The valid ones are
+    written together in one transaction, at a fixed number of queries however large the batch is:
+    - guests are resolved by phone with one lookup and one bulk insert;
+    - attendances are inserted with one bulk insert and merged into existing ones with one bulk update;
+    - guest_count is recounted once at the end;
+    - the help flags it raises are numbered and announced in a handful more.
+
+    Each record carries an idempotency key. A record whose key is already stored is reported as a duplicate and
+    changes nothing, so a device can safely re-send a batch it never got an answer for. A record for a guest who's
+    already checked in is merged into their existing attendance, keeping the earliest arrival and any help flag.
+
+    A help flag the batch raises is recorded as raised when it's synced, not when the device took it, and numbered
+    after every flag already raised at the event, so streams in every process pick it up (see restapi.help_flags).
+    Each one alerts the sober bros on duty, as raising it at the door does. The on-duty roster is read once and the
+    alerts are queued with one insert, however many flags the batch raises.
+    """
+
+    def __init__(self, event_id):
+        self.event_id = int(event_id)
+
+    def run(self, records):
+        """
+        Returns (results, guest_count), with one result per record, in order. Each result has the record's index,
+        idempotency_key and status: created, updated, duplicate or error. All but errors give the attendance id;
+        errors give the errors.
+        """
+        self.results = []
+        valid = []
+
+        for index, record in enumerate(records):
+            data, errors = self.validate_record(record)
+            key = record.get('idempotency_key') if isinstance(record, dict) else None
+            self.results.append({'index': index, 'idempotency_key': key})
+
+            if errors:
+                self.fail(index, errors)
+            else:
+                valid.append((index, data))
+
+        with transaction.atomic():
+            # Locks the event, so two syncs for it can't interleave.
+            Event.objects.select_for_update().filter(id=self.event_id).values_list('id', flat=True).get()
+            self.synced_at = timezone.now()
+
+            valid = self.drop_synced(valid)
+            guests = self.resolve_guests(valid)
+            raised = self.upsert(valid, guests)
+            guest_count = self.recount()
+            self.announce_help_flags(raised)
+
+        return self.results, guest_count
+
+    def validate_record(self, record):
+        if not isinstance(record, dict):
+            return None, {'record': "Each record must be an object."}
+
+        serializer = CheckInRecordSerializer(data=record)
+        if not serializer.is_valid():
+            return None, {field: " ".join(str(message) for message in messages)
+                          for field, messages in serializer.errors.items()}
+
+        data = dict(serializer.validated_data)
+        try:
+            data['phone'] = normalize_phone(data['phone'])
+        except CheckInError as e:
+            return None, {e.field: e.message}
+
+        return data, None
+
+    def fail(self, index, errors):
+        self.results[index].update({'status': 'error', 'errors': errors})
+
+    def drop_synced(self, valid):
+        """
+        Reports records whose idempotency key has been seen before, in an earlier sync or earlier in this batch.
+        """
+        keys = [data['idempotency_key'] for index, data in valid]
+        synced = {
+            key: (attendance_id, event_id) for key, attendance_id, event_id in
+            EventAttendance.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', 'id', 'event_id')
+        }
+
+        unsynced = []
+        first_seen = {}
+        self.repeats = []
+
+        for index, data in valid:
+            key = data['idempotency_key']
+
+            if key in synced:
+                attendance_id, event_id = synced[key]
+                if event_id != self.event_id:
+                    self.fail(index, {'idempotency_key': "That key was already used for a check-in to another event."})
+                else:
+                    self.results[index].update({'status': 'duplicate', 'attendance': attendance_id})
+            elif key in first_seen:
+                self.repeats.append((index, first_seen[key]))
+            else:
+                first_seen[key] = index
+                unsynced.append((index, data))
+
+        return unsynced
+
+    def resolve_guests(self, valid):
+        """
+        Returns the guest id for each phone in the batch, creating guests for phones that haven't been seen.
+        """
+        phones = {data['phone'] for index, data in valid}
+        guests = {}
+
+        for guest_id, phone in Guest.objects.filter(phone__in=phones).values_list('id', 'phone'):
+            guests[phone] = guest_id
+
+        names = {}
+        for index, data in valid:
+            name = (data.get('name') or '').strip()
+            if data['phone'] not in guests and name:
+                names.setdefault(data['phone'], name[:255])
+
+        if names:
+            # A guest created by a check-in to another event since the lookup above is skipped here, and picked up
+            # below.
+            Guest.objects.bulk_create([Guest(phone=phone, name=name) for phone, name in names.items()],
+                                      ignore_conflicts=True)
+
+            # Not every backend hands primary keys back from bulk_create, so they're looked up in one query.
+            for guest_id, phone in Guest.objects.filter(phone__in=names).values_list('id', 'phone'):
+                guests[phone] = guest_id
+
+        return guests
+
+    def upsert(self, valid, guests):
+        """
+        Writes the batch's attendances. Returns the ids of those whose help flag it raised.
+        """
+        attendances = {
+            attendance.guest_id: attendance for attendance in
+            EventAttendance.objects.filter(event_id=self.event_id, guest_id__in=guests.values())
+        }
+        flagged = {guest_id for guest_id, attendance in attendances.items() if attendance.help_flag}
+
+        created = {}
+        changed = {}
+        record_guests = {}
+
+        for index, data in valid:
+            guest_id = guests.get(data['phone'])
+            if guest_id is None:
+                self.fail(index, {'name': "A name is required the first time a guest checks in."})
+                continue
+
+            record_guests[index] = guest_id
+
+            if guest_id in attendances:
+                if self.merge(attendances[guest_id], data):
+                    changed[guest_id] = attendances[guest_id]
+                self.results[index]['status'] = 'updated'
+            elif guest_id in created:
+                self.merge(created[guest_id], data)
+                self.results[index]['status'] = 'updated'
+            else:
+                created[guest_id] = EventAttendance(
+                    event_id=self.event_id,
+                    guest_id=guest_id,
+                    arrival_time=data['arrival_time'],
+                    help_flag=data['help_flag'],
+                    help_flag_raised_at=self.synced_at if data['help_flag'] else None,
+                    idempotency_key=data['idempotency_key']
+                )
+                self.results[index]['status'] = 'created'
+
+        # A door check-in can land between the lookup above and this insert. Conflicting rows are skipped here and
+        # merged into the row that won below.
+        EventAttendance.objects.bulk_create(created.values(), ignore_conflicts=True)
+
+        # bulk_create skips the post_save handler that queues member score updates.
+        if created:
+            queue_score_updates(members_for_guests(created))
+
+        for attendance in EventAttendance.objects.filter(event_id=self.event_id, guest_id__in=created):
+            planned = created[attendance.guest_id]
+            if attendance.idempotency_key != planned.idempotency_key:
+                if attendance.help_flag:
+                    flagged.add(attendance.guest_id)
+                self.merge(attendance, {'arrival_time': planned.arrival_time, 'help_flag': planned.help_flag})
+                changed[attendance.guest_id] = attendance
+                for index, guest_id in record_guests.items():
+                    if guest_id == attendance.guest_id:
+                        self.results[index]['status'] = 'updated'
+            attendances[attendance.guest_id] = attendance
+
+        # A planned row whose key was committed for another event since drop_synced ran was skipped by the insert
+        # above, as a conflict, and there's no row of this event's to merge it into.
+        for guest_id in created:
+            if guest_id not in attendances:
+                for index in [index for index, record_guest in record_guests.items() if record_guest == guest_id]:
+                    self.fail(index, {'idempotency_key': "That key was already used for a check-in to another event."})
+                    del record_guests[index]
+
+        if changed:
+            EventAttendance.objects.bulk_update(changed.values(), ['arrival_time', 'help_flag', 'help_flag_raised_at'])
+
+        for index, guest_id in record_guests.items():
+            self.results[index]['attendance'] = attendances[guest_id].id
+
+        for index, first in self.repeats:
+            if self.results[first]['status'] == 'error':
+                self.fail(index, self.results[first]['errors'])
+            else:
+                self.results[index].update({'status': 'duplicate', 'attendance': self.results[first]['attendance']})
+
+        return [attendances[guest_id].id for guest_id in set(record_guests.values())
+                if attendances[guest_id].help_flag and guest_id not in flagged]
+
+    def merge(self, attendance, data):
+        """
+        Folds a record into an attendance, keeping the earliest arrival and raising the help flag if either did.
+        Returns whether anything changed.
+        """
+        changed = False
+
+        if data['arrival_time'] < attendance.arrival_time:
+            attendance.arrival_time = data['arrival_time']
+            changed = True
+
+        if data['help_flag'] and not attendance.help_flag:
+            attendance.help_flag = True
+            attendance.help_flag_raised_at = self.synced_at
+            changed = True
+
+        return changed
+
+    def announce_help_flags(self, attendance_ids):
+        # restapi.help_flags imports this module, so it's imported here rather than at the top.
+        from restapi.help_flags import announce_help_flags, number_help_flags
+
+        raised = list(EventAttendance.objects.filter(id__in=attendance_ids).select_related('guest', 'event').order_by(
+            'id'
+        ))
+        if not raised:
+            return
+
+        number_help_flags(self.event_id, raised)
+        EventAttendance.objects.bulk_update(raised, ['help_flag_sequence'])
+        announce_help_flags(self.event_id, raised)
+
+    def recount(self):
+        recount_guests([self.event_id])
+        return Event.objects.filter(id=self.event_id).values_list('guest_count', flat=True).get()
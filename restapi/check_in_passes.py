@@ -0,0 +1,173 @@
+import atexit
+import base64
+import hashlib
+import hmac
+import io
+import logging
+import time
+from collections import OrderedDict
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from restapi.batching import BatchBuffer
+from restapi.check_in import CheckInError, recount_guests
+from restapi.member_scores import members_for_guests, queue_score_updates
+from restapi.models.event_attendances import EventAttendance
+
+logger = logging.getLogger(__name__)
+
+PASS_VERSION = 'p1'
+
+
+class CheckInPassSigner:
+    """
+    Issues and verifies signed check-in passes.
+
+    A pass reads p1.<event id>.<guest id>.<expiry>.<signature>, where the signature is a truncated HMAC-SHA256 of
+    the middle three fields. The HMAC key is derived from SECRET_KEY once, when the signer is made, so verifying a
+    pass is a split, one HMAC and a constant-time compare. Verification never touches the database.
+    """
+    salt = 'restapi.check_in_passes'
+
+    # 128 bits of the HMAC is plenty, and keeps the QR code small.
+    signature_bytes = 16
+
+    def __init__(self, secret=None):
+        secret = secret or settings.SECRET_KEY
+        self.key = hashlib.sha256((self.salt + secret).encode()).digest()
+
+    def sign(self, event_id, guest_id, expires_at):
+        """
+        Returns a pass for the guest at the event, valid until expires_at, a unix timestamp.
+        """
+        payload = str(int(event_id)) + "." + str(int(guest_id)) + "." + str(int(expires_at))
+        return PASS_VERSION + "." + payload + "." + self.signature(payload)
+
+    def verify(self, token, now=None):
+        """
+        Returns the (event_id, guest_id) a pass was issued for. Raises a CheckInError if the pass was tampered
+        with, wasn't issued by us, or has expired.
+        """
+        parts = str(token).strip().split(".")
+
+        if len(parts) != 5 or parts[0] != PASS_VERSION or not all(part.isdigit() for part in parts[1:4]):
+            raise CheckInError('pass', "This isn't a valid check-in pass.")
+
+        payload = ".".join(parts[1:4])
+        if not hmac.compare_digest(parts[4], self.signature(payload)):
+            raise CheckInError('pass', "This isn't a valid check-in pass.")
+
+        if int(parts[3]) < (now or time.time()):
+            raise CheckInError('pass', "This check-in pass has expired.")
+
+        return int(parts[1]), int(parts[2])
+
+    def signature(self, payload):
+        digest = hmac.new(self.key, payload.encode(), hashlib.sha256).digest()[:self.signature_bytes]
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def qr_code_svg(token):
+    """
+    Renders a pass as an SVG QR code.
+    """
+    image = qrcode.make(token, image_factory=qrcode.image.svg.SvgPathImage)
+
+    output = io.BytesIO()
+    image.save(output)
+    return output.getvalue().decode()
+
+
+class AttendanceBuffer(BatchBuffer):
+    """
+    Collects scanned check-ins and writes them in batches.
+
+    A batch is written once it reaches max_batch check-ins, or max_delay seconds after its first one, whichever
+    comes first. Writing it is one bulk insert that skips guests already checked in, plus one guest_count recount
+    for the events in it. Recently written check-ins are remembered, so a pass scanned twice can be reported without
+    asking the database.
+
+    Scans have already been answered by the time they're written, so a batch that fails isn't dropped. It's written
+    again one check-in at a time: a check-in the database rejects outright, say for a guest deleted since their pass
+    was scanned, is logged and dropped, and the rest are written around it. If the database can't be reached, what's
+    left is queued again for the next batch.
+    """
+
+    def __init__(self, max_batch=100, max_delay=0.5, remembered=10000):
+        super().__init__(max_batch, max_delay)
+        self.remembered = remembered
+        self.written = OrderedDict()
+
+    def add(self, event_id, guest_id, arrival_time):
+        """
+        Queues a check-in. Returns False if the guest was already checked in to the event through this buffer.
+        """
+        return self.queue((event_id, guest_id), arrival_time)
+
+    def accept(self, key):
+        return key not in self.pending and key not in self.written
+
+    def combine(self, queued, arrival_time):
+        # A check-in queued again after a failed batch keeps the guest's earliest arrival.
+        return min(queued, arrival_time)
+
+    def write(self, batch):
+        with transaction.atomic():
+            EventAttendance.objects.bulk_create([
+                EventAttendance(event_id=event_id, guest_id=guest_id, arrival_time=arrival_time)
+                for (event_id, guest_id), arrival_time in batch.items()
+            ], ignore_conflicts=True)
+
+            recount_guests({event_id for event_id, guest_id in batch})
+            queue_score_updates(members_for_guests({guest_id for event_id, guest_id in batch}))
+
+    def write_batch(self, batch):
+        try:
+            self.write(batch)
+        except Exception:
+            logger.exception(f"Unable to write {len(batch)} scanned check-ins together, writing them one at a time")
+            return self.write_each(batch)
+
+        return batch
+
+    def write_each(self, batch):
+        """
+        Writes the check-ins one at a time, dropping the ones the database rejects. Stops and queues the rest again
+        at the first failure that isn't about the check-in itself. Returns the check-ins written.
+        """
+        written = {}
+        remaining = list(batch.items())
+
+        while remaining:
+            key, arrival_time = remaining[0]
+
+            try:
+                self.write({key: arrival_time})
+            except IntegrityError:
+                logger.exception(f"Dropping the scanned check-in of guest {key[1]} to event {key[0]}")
+            except Exception:
+                logger.exception(f"Unable to write scanned check-ins, queueing {len(remaining)} again")
+                self.requeue(dict(remaining))
+                break
+            else:
+                written[key] = arrival_time
+
+            remaining.pop(0)
+
+        return written
+
+    def after_write(self, batch):
+        with self.lock:
+            for key in batch:
+                self.written[key] = True
+            while len(self.written) > self.remembered:
+                self.written.popitem(last=False)
+
+
+attendance_buffer = AttendanceBuffer()
+
+# Whatever's still queued when the process exits is written on the way out.
+atexit.register(attendance_buffer.flush)
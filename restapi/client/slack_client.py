@@ -1,29 +1,59 @@
 import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 
 
-# The client used to interact with the Slack API
+# The client used to interact with the Slack API.
+#
+# One client holds one requests.Session, so every message after the first reuses a pooled keep-alive connection
+# instead of paying for a new TCP and TLS handshake. Create a client once and share it rather than making one per
+# message.
 class SlackClient:
-    def __init__(self):
-        self.SLACK_URL = "https://slack.com/api/chat.postMessage"
-        self.SLACK_TOKEN = os.environ.get("SLACK_TOKEN", None)
-        print(self.SLACK_TOKEN)
+    SLACK_URL = "https://slack.com/api/chat.postMessage"
+
+    def __init__(self, url: str = None, token: str = None, max_workers: int = 8, max_retries: int = 3,
+                 timeout: float = 10, max_backoff: float = 30):
+        self.SLACK_URL = url or os.environ.get("SLACK_URL", SlackClient.SLACK_URL)
+        self.SLACK_TOKEN = token or os.environ.get("SLACK_TOKEN", None)
         self.logger = logging.getLogger(__name__)
 
         if self.SLACK_TOKEN is None:
             self.logger.error("SLACK_TOKEN not set")
             raise Exception("SLACK_TOKEN not set")
 
-    # Send a message to a channel, returns tuple of (status_code, response)
-    def send_message(self, message: str, channel: str, blocks: list = None) -> (bool, requests.Response):
-        if blocks is None:
-            print("No blocks provided to send_message")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_backoff = max_backoff
 
-        headers = {
+        self.session = requests.Session()
+        self.session.headers.update({
             "Authorization": f"Bearer {self.SLACK_TOKEN}",
             "Content-Type": "application/json; charset=utf-8"
-        }
+        })
+
+        # Enough pooled connections for every thread send_messages fans out to.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    # Send a message to a channel, returns tuple of (ok, response body)
+    def send_message(self, message: str, channel: str, blocks: list = None) -> (bool, dict):
+        if blocks is None:
+            self.logger.debug("No blocks provided to send_message")
 
         payload = {
             "channel": channel,
@@ -31,18 +61,66 @@ class SlackClient:
             "blocks": blocks
         }
 
-        print(f"payload: {payload}")
+        response = self.post_message(payload)
+        return response.status_code == 200, self.response_body(response)
+
+    # Send many messages at once. Each message is a dict of send_message's arguments. The messages are sent
+    # concurrently over the pooled session, and the (ok, response body) results come back in the same order.
+    def send_messages(self, messages: list) -> list:
+        messages = list(messages)
+        if len(messages) <= 1:
+            return [self.send_message(**message) for message in messages]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(messages))) as pool:
+            return list(pool.map(lambda message: self.send_message(**message), messages))
+
+    # Posts a payload, retrying when Slack rate limits us (honouring Retry-After), answers with a 5xx, or the
+    # connection fails. Once the retries run out the last response is returned, or the connection error re-raised.
+    def post_message(self, payload) -> requests.Response:
+        self.logger.debug(f"Sending message to slack channel {payload.get('channel')}")
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.SLACK_URL, json=payload, timeout=self.timeout)
+            except requests.ConnectionError:
+                if attempt >= self.max_retries:
+                    self.logger.exception("Unable to reach Slack")
+                    raise
 
-        response = self.post_message(headers, payload)
-        return response.status_code == 200, response.json()
+                delay = self.backoff(attempt)
+                self.logger.warning(f"Unable to reach Slack, retrying in {delay}s")
+            else:
+                if (response.status_code != 429 and response.status_code < 500) or attempt >= self.max_retries:
+                    break
 
-    def post_message(self, headers, payload) -> requests.Response:
-        print(f"Sending message to slack: {payload}")
+                delay = self.retry_after(response, attempt)
+                self.logger.warning(f"Slack responded {response.status_code}, retrying in {delay}s")
 
-        response = requests.post(self.SLACK_URL, headers=headers, json=payload)
-        print(f"Slack response: {response}")
+            time.sleep(delay)
+            attempt += 1
 
         if response.status_code != 200:
-            self.logger.error(f"Slack response not ok: {response}")
+            self.logger.error(f"Slack response not ok: {response.status_code} {response.text}")
 
         return response
+
+    # The longest one attempt of post_message can take: its timeout run out both connecting and reading, then the
+    # longest wait before the next.
+    def max_attempt_time(self) -> float:
+        return 2 * self.timeout + self.max_backoff
+
+    def retry_after(self, response, attempt) -> float:
+        try:
+            return min(float(response.headers["Retry-After"]), self.max_backoff)
+        except (KeyError, ValueError):
+            return self.backoff(attempt)
+
+    def backoff(self, attempt) -> float:
+        return min(2 ** attempt, self.max_backoff)
+
+    def response_body(self, response):
+        try:
+            return response.json()
+        except ValueError:
+            return None
@@ -1,8 +1,19 @@
+from rest_framework import status
+
+from restapi.search import apply_search_query
+
 protected_fields = ['member_score', 'address', 'present', 'temp_password']
 
+# Fields a member list can be sorted by. Each one is indexed, so sorting never falls back to a full-table sort.
+sortable_fields = ['id', 'name', 'phone', 'rollnumber', 'position', 'member_score']
 
-# TODO: Clean this up and add in a few more search luxuries, like fuzzy matching and general multi-field search.
+
+# TODO: Clean this up.
 def apply_search_filters(data, query_params, is_staff=False):
+    # General multi-field search, ranked by how well each member matches.
+    if 'q' in query_params:
+        data = apply_search_query(data, query_params['q'])
+
     if 'phone' in query_params:
         data = data.filter(phone=query_params['phone'])
 
@@ -24,28 +35,57 @@ def apply_search_filters(data, query_params, is_staff=False):
     return data
 
 
-# TODO Need to write test cases for this.
-# TODO Implement best practices here.
-def apply_ordering(data, query_params, is_staff=False):
-    order_operations = query_params['order_by'].split(",")
+class OrderingError(Exception):
+    """
+    Raised when an order_by request can't be honored. Carries the HTTP status the view should respond with.
+    """
 
-    for order_request in order_operations:
-        processed = order_request.split(".")
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
 
-        operation = processed[0]
 
-        if processed[1] == "desc":
-            operation = "-" + operation
+def parse_ordering(order_by, is_staff=False):
+    """
+    Turns an order_by parameter like 'name.asc,rollnumber.desc' into order_by() keys, ending with 'id' so the
+    ordering is always total. Expects each operation to have already been checked against the name.direction format.
+    """
+    keys = []
+    fields = []
 
-        if processed[0] in protected_fields:
-            if is_staff:
-                data = data.order_by(operation)
-            else:
-                return "You've attempted to sort by a field you do not have permission to view."
-        else:
-            data = data.order_by(operation)
+    for order_request in order_by.split(","):
+        field, direction = order_request.split(".")
 
-    return data
+        if field not in sortable_fields:
+            raise OrderingError(
+                "You can only sort by the following fields: " + ", ".join(sortable_fields) + ".",
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        if field in protected_fields and not is_staff:
+            raise OrderingError(
+                "You've attempted to sort by a field you do not have permission to view.",
+                status.HTTP_403_FORBIDDEN
+            )
+
+        if field in fields:
+            raise OrderingError(
+                "You've attempted to sort by " + field + " more than once.",
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        fields.append(field)
+        keys.append(("-" if direction == "desc" else "") + field)
+
+    if 'id' not in fields:
+        keys.append('id')
+
+    return keys
+
+
+def apply_ordering(data, query_params, is_staff=False):
+    return data.order_by(*parse_ordering(query_params['order_by'], is_staff))
 
 
 # Takes a string and returns the string in normal format.
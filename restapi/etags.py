@@ -0,0 +1,111 @@
+import functools
+import hashlib
+
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from restapi.cache_versions import pending_bumps
+from restapi.response_cache import model_versions, version_key
+
+
+def make_etag(*parts):
+    """
+    A strong ETag for a representation, from the values it's built from.
+    """
+    return quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+
+def version_state(*models):
+    """
+    The models' versions, as the response cache keeps them, in a single query. They're rows in the database, bumped
+    by whichever process commits a write, so ETags built from them agree across processes. Returns None while the
+    current transaction has writes to any of them that haven't committed, since the versions won't move until they do.
+    """
+    if pending_bumps() & {version_key(model) for model in models}:
+        return None
+    return model_versions(models)
+
+
+def row_state(model, pk, request):
+    """
+    When the row was last saved, or None if there's no such row. The row is locked for unsafe requests.
+    """
+    try:
+        rows = model.objects.filter(id=pk)
+    except ValueError:
+        # A primary key that isn't a number matches nothing.
+        return None
+
+    if request.method not in SAFE_METHODS:
+        rows = rows.select_for_update()
+    return rows.values_list('updated_at', flat=True).first()
+
+
+def request_state(request):
+    """
+    What a list response varies on besides the rows: its query parameters, which carry the page, and whether the
+    staff view was rendered.
+    """
+    return sorted((key, sorted(values)) for key, values in request.query_params.lists()), bool(request.user.is_staff)
+
+
+def etag_matches(header, etag, weak=False):
+    """
+    Whether an If-Match or If-None-Match header lists the ETag. If-None-Match compares weakly, ignoring W/ prefixes.
+    """
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+
+    if weak:
+        etags = [tag[2:] if tag.startswith('W/') else tag for tag in etags]
+    return etag in etags
+
+
+def conditional(etag_method):
+    """
+    Adds ETags and conditional requests to a view method. `etag_method` names a method on the view that takes the
+    same arguments and returns the ETag of the resource as it stands, or None if there isn't one to compare.
+
+    A safe request whose If-None-Match lists the current ETag gets an empty 304. An unsafe request whose If-Match
+    doesn't list it gets a 412. The ETag is computed and the write made in one transaction, and the ETag method
+    locks what it reads for unsafe requests, so two writers holding the same ETag can't both go through.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            get_etag = getattr(view, etag_method)
+
+            if request.method in SAFE_METHODS:
+                etag = get_etag(request, *args, **kwargs)
+
+                if etag is not None and etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag, weak=True):
+                    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+                response = method(view, request, *args, **kwargs)
+            else:
+                with transaction.atomic():
+                    etag = get_etag(request, *args, **kwargs)
+                    if_match = request.META.get('HTTP_IF_MATCH')
+
+                    if if_match and etag is not None and not etag_matches(if_match, etag):
+                        return Response(
+                            {
+                                'etag': "This record has changed since you loaded it. Reload it and try again."
+                            },
+                            status=status.HTTP_412_PRECONDITION_FAILED,
+                            headers={'ETag': etag}
+                        )
+
+                    response = method(view, request, *args, **kwargs)
+                    etag = get_etag(request, *args, **kwargs)
+
+            if etag is not None and response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,315 @@
+import logging
+import os
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from restapi.check_in import CheckInError, normalize_phone
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+from restapi.slack_outbox import enqueue_slack_messages
+from restapi.util.messaging.slack_block_builder import SlackBlockBuilder
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(sequence):
+    return str(sequence)
+
+
+def decode_cursor(cursor):
+    """
+    Returns the help flag number a cursor was made from, or None for a missing or malformed cursor.
+    """
+    cursor = str(cursor or '')
+    return int(cursor) if cursor.isdigit() else None
+
+
+def number_help_flags(event_id, attendances):
+    """
+    Gives newly raised flags the next numbers in their event's sequence, in the order they're listed. Call it in the
+    transaction that raises them. The event's row stays locked until that commits, so an event's flags always commit
+    in the order they're numbered and a stream can't pass a number that's still to come.
+    """
+    Event.objects.filter(id=event_id).update(help_flag_sequence=F('help_flag_sequence') + len(attendances))
+    last = Event.objects.filter(id=event_id).values_list('help_flag_sequence', flat=True).get()
+
+    for sequence, attendance in enumerate(attendances, start=last - len(attendances) + 1):
+        attendance.help_flag_sequence = sequence
+
+
+def serialize_alert(attendance):
+    """
+    An alert as it's streamed. Expects the attendance's guest to be loaded.
+    """
+    return {
+        'cursor': encode_cursor(attendance.help_flag_sequence),
+        'attendance': attendance.id,
+        'guest': {
+            'id': attendance.guest.id,
+            'name': attendance.guest.name,
+            'phone': attendance.guest.phone,
+        },
+        'raised_at': attendance.help_flag_raised_at.isoformat(),
+    }
+
+
+def load_alerts(event_id, after=None, limit=100):
+    """
+    Reads the raised flags for an event from the database, in order, skipping those numbered `after` or lower.
+    """
+    flags = EventAttendance.objects.filter(event=event_id, help_flag_sequence__isnull=False)
+
+    if after is not None:
+        flags = flags.filter(help_flag_sequence__gt=after)
+
+    flags = flags.select_related('guest').order_by('help_flag_sequence')[:limit]
+    return [serialize_alert(attendance) for attendance in flags]
+
+
+class HelpFlagBroker:
+    """
+    Fans raised help flags out to everyone streaming an event's alerts.
+
+    Flags raised in this process, at the door or by a door device's offline sync, are published the moment their
+    transaction commits, and every waiting stream is woken at once. Flags raised by another process are caught by a
+    DB fallback: while anyone is waiting on an event, one of the waiters reads the flags after the last one read
+    every fallback_interval seconds and publishes them for the rest. However many clients are connected, that's one
+    query per event per interval, rather than one per client.
+
+    Each event's flags are numbered in the order they commit (see number_help_flags), and a cursor is the number of
+    the last flag seen. A flag published here can still be waiting on a lower number from another process, so alerts
+    are only handed out without gaps, unless the database has already been read past the gap, which is then a flag
+    that was never committed.
+
+    Only the last `backlog` alerts per event are kept in memory. A stream that falls behind them reads from the
+    database.
+    """
+
+    def __init__(self, fallback_interval=0.5, backlog=100):
+        self.fallback_interval = fallback_interval
+        self.backlog = backlog
+
+        self.condition = threading.Condition()
+        self.alerts = {}
+        self.settled = {}
+        self.trimmed = {}
+        self.checked_at = {}
+        self.checking = set()
+
+    def publish(self, event_id, alerts, settled=None):
+        """
+        Adds alerts to an event's backlog and wakes its streams. Alerts already in the backlog are ignored. `settled`
+        is the number of the last flag read from the database, when the alerts come from there.
+        """
+        with self.condition:
+            backlog = self.alerts.setdefault(event_id, {})
+            trimmed = self.trimmed.get(event_id, 0)
+
+            for alert in alerts:
+                key = decode_cursor(alert['cursor'])
+                if key > trimmed:
+                    backlog.setdefault(key, alert)
+
+            if settled is not None:
+                self.settled[event_id] = max(self.settled.get(event_id, 0), settled)
+
+            for key in sorted(backlog)[:-self.backlog]:
+                self.trimmed[event_id] = max(self.trimmed.get(event_id, 0), key)
+                del backlog[key]
+
+            self.condition.notify_all()
+
+    def load(self, event_id, after):
+        """
+        Reads the flags after `after` from the database and publishes them. Returns them.
+        """
+        alerts = load_alerts(event_id, after=after, limit=self.backlog)
+        settled = decode_cursor(alerts[-1]['cursor']) if alerts else after
+
+        self.publish(event_id, alerts, settled=settled)
+        return alerts
+
+    def poll(self, event_id, after, timeout):
+        """
+        A long poll: returns the alerts for the event after `after`, waiting up to `timeout` seconds for one if
+        there are none yet. The database is read once up front, so a new or long-disconnected stream starts from
+        every flag that's up.
+        """
+        alerts = self.load(event_id, after)
+        if alerts:
+            return alerts
+
+        return self.wait(event_id, after, timeout)
+
+    def since(self, event_id, after):
+        """
+        Returns the alerts in memory for an event that come after `after`, in order, up to the first flag that's
+        still to arrive. Returns None if the backlog no longer reaches back to `after`.
+        """
+        after = after or 0
+
+        with self.condition:
+            if after < self.trimmed.get(event_id, 0):
+                return None
+
+            backlog = self.alerts.get(event_id, {})
+            settled = self.settled.get(event_id, 0)
+            alerts = []
+
+            for key in sorted(key for key in backlog if key > after):
+                if key - 1 > max(after, settled):
+                    break
+                alerts.append(backlog[key])
+                after = key
+
+            return alerts
+
+    def wait(self, event_id, after, timeout):
+        """
+        Blocks until there are alerts for the event after `after`, or `timeout` seconds pass. Returns the alerts,
+        which is an empty list on a timeout.
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            alerts = self.since(event_id, after)
+            if alerts is None:
+                return load_alerts(event_id, after=after, limit=self.backlog)
+            if alerts:
+                return alerts
+
+            now = time.monotonic()
+            if now >= deadline:
+                return []
+
+            with self.condition:
+                next_check = self.checked_at.get(event_id, 0) + self.fallback_interval
+                check = now >= next_check and event_id not in self.checking
+                if check:
+                    self.checking.add(event_id)
+                else:
+                    self.condition.wait(min(deadline, max(next_check, now + 0.01)) - now)
+
+            if check:
+                self.check(event_id)
+
+    def check(self, event_id):
+        """
+        Publishes the flags raised for the event since the last one read from the database.
+        """
+        try:
+            with self.condition:
+                settled = self.settled.get(event_id, 0)
+            self.load(event_id, settled)
+        except Exception:
+            logger.exception(f"Unable to check event {event_id} for help flags")
+        finally:
+            with self.condition:
+                self.checked_at[event_id] = time.monotonic()
+                self.checking.discard(event_id)
+
+
+help_flag_broker = HelpFlagBroker()
+
+
+def on_duty_sober_bros(at):
+    """
+    Returns the names of the sober bros on every shift running at the given time.
+    """
+    roster = SoberBro.objects.select_related('member').only('id', 'shift', 'member__name').order_by('id')
+    shifts = SoberBroShift.objects.filter(time_start__lte=at, time_end__gt=at).prefetch_related(
+        Prefetch('soberbro_set', queryset=roster)
+    ).order_by('time_start', 'id')
+
+    return [sober_bro.member.name for shift in shifts for sober_bro in shift.soberbro_set.all()]
+
+
+def notify_on_duty(attendances, note=None, channel=None):
+    """
+    Queues a Slack alert for each raised flag, naming the sober bros on duty when it went up. The roster is read
+    once for every flag raised at the same moment, as a sync's are, and the alerts are queued with one insert.
+    """
+    channel = channel or os.environ.get('SLACK_SOBER_BRO_CHANNEL')
+    if not channel:
+        logger.warning(f"SLACK_SOBER_BRO_CHANNEL not set, not sending Slack alerts for {len(attendances)} help flags")
+        return
+
+    builder = SlackBlockBuilder()
+    rosters = {}
+    messages = []
+
+    for attendance in attendances:
+        raised_at = attendance.help_flag_raised_at
+        if raised_at not in rosters:
+            rosters[raised_at] = on_duty_sober_bros(raised_at)
+
+        payload = builder.help_flag_alert(
+            attendance.guest.name,
+            phone=attendance.guest.phone,
+            location=attendance.event.event_name + ", " + attendance.event.location,
+            note=note,
+            raised_at=raised_at,
+            on_duty=rosters[raised_at]
+        )
+
+        messages.append({
+            'channel': channel,
+            'text': payload['text'],
+            'blocks': payload['blocks'],
+            'dedupe_key': "help-flag:" + str(attendance.id) + ":" + raised_at.isoformat(),
+        })
+
+    enqueue_slack_messages(messages)
+
+
+def raise_help_flag(event_id, phone, note=None, channel=None):
+    """
+    Raises the help flag for a guest checked in to the event, alerts the on-duty sober bros through the Slack
+    outbox, and publishes the flag to the event's streams once it commits. Returns (attendance, raised), where
+    raised is False if the flag was already up.
+    """
+    event_id = int(event_id)
+    phone = normalize_phone(phone)
+
+    with transaction.atomic():
+        # The event is locked before the attendance, the order a sync takes them in, so the two can't deadlock.
+        Event.objects.select_for_update().filter(id=event_id).values_list('id', flat=True).first()
+
+        attendance = EventAttendance.objects.select_for_update(of=('self',)).select_related('guest', 'event').filter(
+            event=event_id,
+            guest__phone=phone
+        ).order_by('id').first()
+
+        if attendance is None:
+            raise CheckInError('guest', "This guest hasn't checked in to the event.", status_code=404)
+
+        if attendance.help_flag and attendance.help_flag_raised_at is not None:
+            return attendance, False
+
+        attendance.help_flag = True
+        attendance.help_flag_raised_at = timezone.now()
+        number_help_flags(event_id, [attendance])
+        attendance.save(update_fields=['help_flag', 'help_flag_raised_at', 'help_flag_sequence'])
+
+        announce_help_flags(event_id, [attendance], note=note, channel=channel)
+
+    return attendance, True
+
+
+def announce_help_flags(event_id, attendances, note=None, channel=None):
+    """
+    Alerts the on-duty sober bros to newly raised flags through the Slack outbox, and publishes them to the event's
+    streams once the current transaction commits. Expects each attendance's guest and event to be loaded.
+    """
+    # The broker keys events by their int id, which is what the streams wait on, rather than the URL's string.
+    event_id = int(event_id)
+    notify_on_duty(attendances, note=note, channel=channel)
+
+    alerts = [serialize_alert(attendance) for attendance in attendances]
+    transaction.on_commit(lambda: help_flag_broker.publish(event_id, alerts))
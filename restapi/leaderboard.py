@@ -0,0 +1,88 @@
+import logging
+
+import numpy as np
+from django.db import transaction
+
+from restapi.cache_versions import create_versions
+from restapi.models.cache_versions import CacheVersion
+from restapi.models.member_ranks import MemberRank
+from restapi.models.members import Member
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_LOCK = 'leaderboard'
+
+
+def rank_scores(scores):
+    """
+    Returns the competition rank of each score: 1 for the highest, with ties sharing a rank and the next rank
+    skipping past them, so scores of 90, 80, 80, 70 rank 1, 2, 2, 4.
+    """
+    descending = np.sort(-scores)
+    return np.searchsorted(descending, -scores, side='left') + 1
+
+
+def lock_leaderboard():
+    """
+    Locks the leaderboard until the current transaction ends, by locking a CacheVersion row kept for it. The
+    MemberRank rows can't serve as the lock: a refresh that finds the table empty would have nothing to lock.
+
+    Migration 0028 creates the row. It's recreated here if it has gone missing since, as it does when tests flush
+    the database.
+    """
+    if not list(CacheVersion.objects.select_for_update().filter(key=LEADERBOARD_LOCK).values_list('id', flat=True)):
+        create_versions([LEADERBOARD_LOCK])
+        list(CacheVersion.objects.select_for_update().filter(key=LEADERBOARD_LOCK).values_list('id', flat=True))
+
+
+def refresh_leaderboard():
+    """
+    Brings the MemberRank table in line with the current member scores. Active members who have been scored are
+    ranked; everyone else is left off.
+
+    Every refresh re-ranks everyone: it reads every scored member's id and score in one query and sorts them, an
+    O(N log N) pass however few scores changed. Only the writes are incremental. The ranks are compared against the
+    stored ones, so only members whose rank or score moved are written, which for one score change is the member it
+    belongs to and the members they pass. Returns the number of ranks created, updated and removed.
+
+    Refreshes take the leaderboard lock before reading any scores, so they run one at a time and each one reads the
+    scores the last one saw or newer. A refresh can't write ranks over those of a refresh that read after it.
+    """
+    with transaction.atomic():
+        lock_leaderboard()
+
+        rows = list(Member.objects.filter(inactive_flag=False, member_score__gte=0).values_list('id', 'member_score'))
+
+        ids = np.array([member_id for member_id, score in rows], dtype=np.int64)
+        scores = np.array([score for member_id, score in rows], dtype=np.float64)
+        ranks = rank_scores(scores)
+
+        existing = {rank.member_id: rank for rank in MemberRank.objects.only(
+            'id', 'member_id', 'rank', 'member_score'
+        )}
+
+        created = []
+        updated = []
+        for member_id, score, rank in zip(ids.tolist(), scores.tolist(), ranks.tolist()):
+            current = existing.pop(member_id, None)
+
+            if current is None:
+                created.append(MemberRank(member_id=member_id, rank=rank, member_score=score))
+            elif current.rank != rank or current.member_score != score:
+                current.rank = rank
+                current.member_score = score
+                updated.append(current)
+
+        MemberRank.objects.bulk_create(created)
+        MemberRank.objects.bulk_update(updated, ['rank', 'member_score'], batch_size=1000)
+        if existing:
+            MemberRank.objects.filter(id__in=[rank.id for rank in existing.values()]).delete()
+
+    result = {
+        'created': len(created),
+        'updated': len(updated),
+        'removed': len(existing)
+    }
+    logger.info(f"Refreshed the leaderboard: {result}")
+
+    return result
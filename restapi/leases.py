@@ -0,0 +1,261 @@
+import datetime
+import functools
+import hashlib
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from restapi.models.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder():
+    return socket.gethostname() + ":" + str(os.getpid()) + ":" + uuid.uuid4().hex[:8]
+
+
+def advisory_lock_key(name):
+    """
+    Maps a lease name onto the signed 64-bit key pg_try_advisory_lock takes.
+    """
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:8], 'big', signed=True)
+
+
+class LeaderLease:
+    """
+    Elects a single holder for a named job across every process sharing the database.
+
+    On PostgreSQL the lease is a session-level advisory lock, held on a connection of its own. If the holder dies,
+    its connection goes with it and the lock is free immediately. Elsewhere it's a row in the Lease table that the
+    holder has to keep renewing. A holder that stops renewing loses the row to the next candidate once `ttl` runs
+    out.
+
+    While the lease is held, a heartbeat thread renews it every `ttl / 3`. If a renewal can't succeed before the
+    lease would lapse, the lease is marked lost and every on_lost callback is called, so the job can stop before
+    someone else starts it.
+    """
+
+    def __init__(self, name, ttl=datetime.timedelta(seconds=30), holder=None, using='default', advisory=None):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or default_holder()
+        self.using = using
+
+        if advisory is None:
+            advisory = connections[using].vendor == 'postgresql'
+        self.advisory = advisory
+
+        self.held = False
+        self.lost = threading.Event()
+        self.stopped = threading.Event()
+        self.lost_callbacks = []
+        self.lock_connection = None
+        self.connection_lock = threading.Lock()
+        self.heartbeat = None
+        self.last_renewed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def heartbeat_interval(self):
+        return self.ttl.total_seconds() / 3
+
+    def on_lost(self, callback):
+        self.lost_callbacks.append(callback)
+
+    def acquire(self):
+        """
+        Tries once to take the lease. Returns whether it's now held.
+        """
+        if self.advisory:
+            self.held = self.acquire_advisory_lock()
+        else:
+            self.held = self.acquire_row()
+
+        if self.held:
+            self.last_renewed = timezone.now()
+            self.lost.clear()
+        return self.held
+
+    def wait(self, poll_interval=None):
+        """
+        Blocks as a standby until the lease is taken, or release() is called. Returns whether it's held.
+        """
+        poll_interval = poll_interval or self.heartbeat_interval
+
+        while not self.acquire():
+            if self.stopped.wait(poll_interval):
+                return False
+        return True
+
+    def renew(self):
+        """
+        Extends the lease. Returns whether it's still held.
+        """
+        if not self.held:
+            return False
+
+        if self.advisory:
+            with self.connection_lock:
+                with self.lock_connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            renewed = True
+        else:
+            now = timezone.now()
+            renewed = Lease.objects.using(self.using).filter(name=self.name, holder=self.holder).update(
+                expires_at=now + self.ttl
+            ) == 1
+
+        if renewed:
+            self.last_renewed = timezone.now()
+        return renewed
+
+    def release(self):
+        self.stopped.set()
+        if self.heartbeat is not None and self.heartbeat is not threading.current_thread():
+            self.heartbeat.join()
+        self.heartbeat = None
+
+        if not self.held:
+            self.close_lock_connection()
+            return
+
+        self.held = False
+        try:
+            if self.advisory:
+                with self.connection_lock:
+                    with self.lock_connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", [advisory_lock_key(self.name)])
+            else:
+                # Expiring the row rather than deleting it lets a standby take over on its next poll.
+                Lease.objects.using(self.using).filter(name=self.name, holder=self.holder).update(
+                    expires_at=timezone.now()
+                )
+        except Exception:
+            logger.exception(f"Unable to release the {self.name} lease cleanly")
+        finally:
+            self.close_lock_connection()
+
+    def start_heartbeat(self):
+        self.stopped.clear()
+        self.heartbeat = threading.Thread(target=self.beat, name="lease-" + self.name, daemon=True)
+        self.heartbeat.start()
+
+    def beat(self):
+        try:
+            while not self.stopped.wait(self.heartbeat_interval):
+                try:
+                    if self.renew():
+                        continue
+                    reason = "another process took it"
+                except Exception as e:
+                    # A blip is survivable as long as it's over before the lease would have lapsed. An advisory
+                    # lock goes with its connection, though, so there's nothing to wait for.
+                    if not self.advisory and timezone.now() - self.last_renewed < self.ttl - datetime.timedelta(
+                            seconds=self.heartbeat_interval):
+                        logger.warning(f"Unable to renew the {self.name} lease, retrying: {e}")
+                        continue
+                    reason = str(e)
+
+                self.mark_lost(reason)
+                return
+        finally:
+            if not self.advisory:
+                connections.close_all()
+
+    def mark_lost(self, reason):
+        logger.error(f"Lost the {self.name} lease: {reason}")
+        self.held = False
+        self.lost.set()
+
+        for callback in self.lost_callbacks:
+            callback()
+
+    def acquire_row(self):
+        now = timezone.now()
+
+        taken = Lease.objects.using(self.using).filter(name=self.name).filter(
+            Q(holder=self.holder) | Q(expires_at__lte=now)
+        ).update(holder=self.holder, expires_at=now + self.ttl, acquired_at=now)
+
+        if taken:
+            return True
+
+        try:
+            with transaction.atomic(using=self.using):
+                Lease.objects.using(self.using).create(
+                    name=self.name,
+                    holder=self.holder,
+                    expires_at=now + self.ttl,
+                    acquired_at=now
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def acquire_advisory_lock(self):
+        if self.lock_connection is None:
+            # Its own connection, so the lock's lifetime isn't tied to whatever the job does with the default one.
+            self.lock_connection = connections[self.using].copy()
+            self.lock_connection.inc_thread_sharing()
+
+        with self.connection_lock:
+            with self.lock_connection.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [advisory_lock_key(self.name)])
+                acquired = cursor.fetchone()[0]
+
+        # A candidate that didn't get the lock doesn't keep a connection open while it waits for its next try.
+        if not acquired:
+            self.close_lock_connection()
+        return acquired
+
+    def close_lock_connection(self):
+        if self.lock_connection is not None:
+            self.lock_connection.close()
+            self.lock_connection.dec_thread_sharing()
+            self.lock_connection = None
+
+
+def leader_only(name, ttl=datetime.timedelta(seconds=30)):
+    """
+    Decorates a management command's handle() so only one process runs it at a time.
+
+    If another process holds the lease, the command exits straight away, or with --standby waits until the lease
+    is free. The lease is kept for as long as handle() runs and is available as self.lease, so long-running commands
+    can register a stop callback with self.lease.on_lost().
+    """
+    def decorator(handle):
+        @functools.wraps(handle)
+        def wrapper(self, *args, **options):
+            lease = LeaderLease(name, ttl=ttl)
+
+            if options.get('standby'):
+                self.stdout.write("Waiting to take the " + name + " lease.")
+                acquired = lease.wait()
+            else:
+                acquired = lease.acquire()
+
+            if not acquired:
+                lease.release()
+                self.stdout.write("Another process holds the " + name + " lease, exiting.")
+                return
+
+            self.lease = lease
+            lease.start_heartbeat()
+            try:
+                return handle(self, *args, **options)
+            finally:
+                lease.release()
+
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restapi.member_scores import MemberScoreEngine
+from restapi.models.members import Member
+
+
+class Command(BaseCommand):
+    help = "Compares every stored member_score against a full recompute, and reports the ones that have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the recomputed scores for drifted members.')
+        parser.add_argument('--limit', type=int, default=20, help='Drifted members to list.')
+
+    def handle(self, *args, **options):
+        engine = MemberScoreEngine()
+        drifted = engine.check()
+
+        if not drifted:
+            self.stdout.write("All member scores match a full recompute.")
+            return
+
+        listed = drifted[:options['limit']]
+        names = dict(Member.objects.filter(id__in=[member_id for member_id, stored, expected in listed]).values_list(
+            'id', 'name'
+        ))
+
+        for member_id, stored, expected in listed:
+            self.stdout.write(names.get(member_id, str(member_id)) + ": stored " + str(stored) +
+                              ", expected " + str(expected))
+
+        if options['fix']:
+            engine.run_exclusively()
+            self.stdout.write("Fixed " + str(len(drifted)) + " drifted member scores.")
+        else:
+            raise CommandError(str(len(drifted)) + " member scores don't match a full recompute. "
+                               "Run with --fix to correct them.")
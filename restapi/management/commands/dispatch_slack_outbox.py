@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restapi.client.slack_client import SlackClient
+from restapi.slack_outbox import SlackOutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Sends the Slack messages waiting in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages claimed and sent at a time.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Messages in flight to Slack at once.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Attempts before a message is marked failed.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is drained.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        try:
+            client = SlackClient(max_workers=options['concurrency'])
+        except Exception as e:
+            raise CommandError(str(e))
+
+        dispatcher = SlackOutboxDispatcher(
+            client,
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            max_attempts=options['max_attempts']
+        )
+
+        with client:
+            while True:
+                totals = dispatcher.run()
+
+                if any(totals.values()) or not options['loop']:
+                    self.stdout.write("Sent " + str(totals['sent']) + " messages, " + str(totals['retrying']) +
+                                      " will be retried, " + str(totals['failed']) + " failed.")
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
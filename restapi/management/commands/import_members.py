@@ -0,0 +1,48 @@
+import csv
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restapi.member_import import MemberImport
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports members from a CSV file whose header row names the Member fields.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The CSV file to import.')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows validated and inserted at a time.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Processes used to hash passwords. Defaults to one per CPU.')
+        parser.add_argument('--credentials', default=None,
+                            help='Where to write the usernames and passwords generated for rows without one.')
+
+    def handle(self, *args, **options):
+        start_time = datetime.datetime.now().replace(microsecond=0)
+
+        try:
+            csv_file = open(options['path'], 'r', encoding='utf-8-sig', newline='')
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        with csv_file:
+            report = MemberImport(chunk_size=options['chunk_size'], workers=options['workers'],
+                                  processes=True).run(csv_file)
+
+        for error in report['errors']:
+            messages = "; ".join(field + ": " + message for field, message in error['errors'].items())
+            self.stderr.write("Row " + str(error['row']) + " skipped. " + messages)
+
+        if options['credentials'] is None and report['credentials']:
+            self.stderr.write(str(len(report['credentials'])) + " generated passwords were not saved. Pass "
+                              "--credentials to keep them.")
+        elif report['credentials']:
+            with open(options['credentials'], 'w', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(['username', 'password'])
+                for credential in report['credentials']:
+                    writer.writerow([credential['username'], credential['password']])
+
+        end_time = datetime.datetime.now().replace(microsecond=0)
+        self.stdout.write("Imported " + str(report['created']) + " members, skipped " + str(len(report['errors'])) +
+                          " rows in " + str(end_time - start_time))
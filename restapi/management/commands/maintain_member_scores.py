@@ -0,0 +1,43 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from restapi.leases import leader_only
+from restapi.member_scores import MemberScoreUpdater
+
+
+class Command(BaseCommand):
+    help = 'Keeps member scores up to date, rescoring members as changes to them are queued.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debounce', type=float, default=2,
+                            help='Seconds a member has to go untouched before they are rescored.')
+        parser.add_argument('--max-wait', type=float, default=30,
+                            help='Seconds after which a queued member is rescored even if they keep changing.')
+        parser.add_argument('--interval', type=float, default=1, help='Seconds between checks of the queue.')
+        parser.add_argument('--once', action='store_true',
+                            help='Rescore whoever is due right now, then exit.')
+        parser.add_argument('--standby', action='store_true',
+                            help='If another process is already maintaining scores, wait to take over from it '
+                                 'instead of exiting.')
+
+    @leader_only('member-score-updates')
+    def handle(self, *args, **options):
+        updater = MemberScoreUpdater(
+            debounce=datetime.timedelta(seconds=options['debounce']),
+            max_wait=datetime.timedelta(seconds=options['max_wait']),
+            interval=datetime.timedelta(seconds=options['interval'])
+        )
+        self.lease.on_lost(updater.stop)
+
+        try:
+            if options['once']:
+                result = updater.tick()
+                self.stdout.write(
+                    "Rescored " + str(result['members']) + " members, " + str(result['updated']) + " changed."
+                )
+            else:
+                self.stdout.write("Maintaining member scores.")
+                updater.run()
+        except KeyboardInterrupt:
+            updater.stop()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from restapi.leases import leader_only
+from restapi.member_scores import RECOMPUTE_LEASE, MemberScoreEngine
+
+
+class Command(BaseCommand):
+    help = "Recomputes every member's member_score from chapter attendance, sober bro shifts and events."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Members written per UPDATE statement.')
+        parser.add_argument('--standby', action='store_true',
+                            help='If another process is already recomputing scores, wait for it to finish and '
+                                 'then run, instead of exiting.')
+
+    @leader_only(RECOMPUTE_LEASE)
+    def handle(self, *args, **options):
+        result = MemberScoreEngine(batch_size=options['batch_size']).run()
+
+        self.stdout.write(
+            "Scored " + str(result['members']) + " members, " + str(result['updated']) + " changed."
+        )
@@ -0,0 +1,63 @@
+import datetime
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restapi.client.slack_client import SlackClient
+from restapi.leases import leader_only
+from restapi.shift_reminders import ShiftReminderScheduler
+from restapi.slack_outbox import SlackOutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Posts a Slack reminder ahead of every sober bro shift, sleeping until each one is due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--channel', default=os.environ.get('SLACK_SOBER_BRO_CHANNEL'),
+                            help='The Slack channel reminders are posted to. Defaults to $SLACK_SOBER_BRO_CHANNEL.')
+        parser.add_argument('--lead', type=int, default=15, help='Minutes before a shift starts to remind.')
+        parser.add_argument('--horizon', type=int, default=24, help='Hours ahead to schedule reminders for.')
+        parser.add_argument('--reload-interval', type=int, default=60,
+                            help='Seconds between checks for new, moved or deleted shifts.')
+        parser.add_argument('--once', action='store_true',
+                            help="Send whatever reminders are due right now, then exit.")
+        parser.add_argument('--no-dispatch', action='store_true',
+                            help='Only queue reminders, leaving dispatch_slack_outbox to send them.')
+        parser.add_argument('--standby', action='store_true',
+                            help='If another process is already sending reminders, wait to take over from it '
+                                 'instead of exiting.')
+
+    @leader_only('shift-reminders')
+    def handle(self, *args, **options):
+        if not options['channel']:
+            raise CommandError("A channel is required. Pass --channel or set SLACK_SOBER_BRO_CHANNEL.")
+
+        client = None
+        dispatcher = None
+        if not options['no_dispatch']:
+            try:
+                client = SlackClient()
+            except Exception as e:
+                raise CommandError(str(e))
+            dispatcher = SlackOutboxDispatcher(client)
+
+        scheduler = ShiftReminderScheduler(
+            options['channel'],
+            lead=datetime.timedelta(minutes=options['lead']),
+            horizon=datetime.timedelta(hours=options['horizon']),
+            reload_interval=datetime.timedelta(seconds=options['reload_interval']),
+            dispatcher=dispatcher
+        )
+        self.lease.on_lost(scheduler.stop)
+
+        try:
+            if options['once']:
+                scheduler.tick()
+            else:
+                self.stdout.write("Scheduling reminders for " + options['channel'] + ".")
+                scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+        finally:
+            if client is not None:
+                client.close()
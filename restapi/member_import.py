@@ -0,0 +1,235 @@
+import csv
+import secrets
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from restapi.member_scores import queue_score_updates
+from restapi.models.members import Member
+from restapi.response_cache import invalidate_responses
+from restapi.search import rebuild_search_tokens, token_index_enabled
+from restapi.serializers import MemberSerializerAdmin
+
+# Columns every row needs. inactive_flag, abroad_flag, present and password are optional.
+REQUIRED_COLUMNS = ['name', 'first_name', 'last_name', 'legal_name', 'address', 'email', 'phone', 'rollnumber',
+                    'position']
+
+BOOLEAN_COLUMNS = ['inactive_flag', 'abroad_flag']
+
+
+def hash_password(password):
+    return make_password(password)
+
+
+def prepare_worker():
+    """
+    Worker processes that weren't forked from a configured parent (e.g. spawned on macOS) need Django set up.
+    """
+    if not apps.ready:
+        django.setup()
+
+
+class MemberImport:
+    """
+    Imports members from CSV rows in bulk.
+
+    Rows are read lazily and validated a chunk at a time, with the duplicate checks for a chunk done in three
+    queries. Passwords for the valid rows are hashed across a pool, and each chunk's users and members are written
+    with bulk_create. The whole import runs in one transaction, but rows that fail validation are reported and
+    skipped rather than aborting it.
+
+    The pool is a thread pool unless `processes` is set. hashlib lets go of the GIL while it hashes, so threads
+    still hash in parallel, and they're safe inside a threaded web worker, where forking a process pool isn't. Only
+    the import_members command, which runs on its own, uses processes.
+    """
+
+    def __init__(self, chunk_size=500, workers=None, pool_threshold=32, processes=False):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.processes = processes
+
+        # Below this many passwords in a chunk, starting a pool costs more than it saves.
+        self.pool_threshold = pool_threshold
+
+    def run(self, csv_file):
+        """
+        Imports every row of an open CSV file with a header row. Returns a report of the form
+        {'created': int, 'errors': [{'row': int, 'errors': {...}}], 'credentials': [{'username', 'password'}]}.
+        """
+        self.report = {'created': 0, 'errors': [], 'credentials': []}
+        self.seen = {'phone': set(), 'email': set(), 'username': set()}
+
+        reader = csv.DictReader(csv_file)
+
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            self.report['errors'].append({
+                'row': 1,
+                'errors': {'header': 'The CSV is missing the following columns: ' + ", ".join(missing) + "."}
+            })
+            return self.report
+
+        # Line 1 is the header, so data starts on line 2.
+        rows = enumerate(reader, start=2)
+
+        with self.pool() as pool:
+            with transaction.atomic():
+                chunk = list(islice(rows, self.chunk_size))
+                while chunk:
+                    self.import_chunk(chunk, pool)
+                    chunk = list(islice(rows, self.chunk_size))
+
+        return self.report
+
+    def pool(self):
+        if self.processes:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=prepare_worker)
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def import_chunk(self, chunk, pool):
+        candidates = []
+        for line, row in chunk:
+            data, errors = self.validate_row(row)
+
+            if errors:
+                self.report['errors'].append({'row': line, 'errors': errors})
+            else:
+                candidates.append((line, data))
+
+        candidates = self.drop_duplicates(candidates)
+        if not candidates:
+            return
+
+        passwords = []
+        for line, data in candidates:
+            if data['password']:
+                passwords.append(data['password'])
+            else:
+                passwords.append(secrets.token_urlsafe(12))
+                self.report['credentials'].append({'username': data['username'], 'password': passwords[-1]})
+
+        if len(passwords) < self.pool_threshold:
+            hashed = [hash_password(password) for password in passwords]
+        else:
+            hashed = list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 16)))
+
+        self.insert(candidates, hashed)
+
+    def validate_row(self, row):
+        """
+        Runs a row through the same validation as the member create endpoint. Returns (data, errors).
+        """
+        data = {field: (row.get(field) or '').strip() for field in REQUIRED_COLUMNS}
+        data['position'] = data['position'] or 'Brother'
+        data['member_score'] = -1
+        data['present'] = (row.get('present') or '').strip() or 0
+        data['temp_password'] = True
+
+        errors = {}
+        for field in BOOLEAN_COLUMNS:
+            value = (row.get(field) or '').strip().upper()
+            if value in ('', 'FALSE'):
+                data[field] = False
+            elif value == 'TRUE':
+                data[field] = True
+            else:
+                errors[field] = field + " must be TRUE or FALSE."
+
+        if not data['name'].strip() or len(data['name'].split(" ")) < 2:
+            errors['name'] = "A member's name must include both a first and last name."
+
+        serializer = MemberSerializerAdmin(data=data)
+        if not serializer.is_valid():
+            errors.update(serializer.errors)
+
+        if errors:
+            return None, {field: self.flatten(message) for field, message in errors.items()}
+
+        validated = dict(serializer.validated_data)
+        validated['username'] = data['name'].lower().replace(" ", ".")
+        validated['password'] = (row.get('password') or '').strip()
+        return validated, None
+
+    def drop_duplicates(self, candidates):
+        """
+        Rejects rows whose phone, email or username is already taken, in the database or earlier in this import.
+        """
+        phones = [data['phone'] for line, data in candidates]
+        emails = [data['email'] for line, data in candidates]
+        usernames = [data['username'] for line, data in candidates]
+
+        self.seen['phone'].update(Member.objects.filter(phone__in=phones).values_list('phone', flat=True))
+        self.seen['email'].update(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        self.seen['username'].update(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+        unique = []
+        for line, data in candidates:
+            errors = {}
+            if data['phone'] in self.seen['phone']:
+                errors['phone'] = "A member account with that phone number already exists."
+            if data['email'] in self.seen['email']:
+                errors['email'] = "There's already a user with that email."
+            if data['username'] in self.seen['username']:
+                errors['name'] = "There's already a user with the username " + data['username'] + "."
+
+            if errors:
+                self.report['errors'].append({'row': line, 'errors': errors})
+                continue
+
+            self.seen['phone'].add(data['phone'])
+            self.seen['email'].add(data['email'])
+            self.seen['username'].add(data['username'])
+            unique.append((line, data))
+
+        return unique
+
+    def insert(self, candidates, hashed):
+        User.objects.bulk_create([
+            User(username=data['username'], email=data['email'], password=password)
+            for (line, data), password in zip(candidates, hashed)
+        ])
+
+        # Not every backend hands primary keys back from bulk_create, so they're looked up in one query.
+        user_ids = dict(User.objects.filter(
+            username__in=[data['username'] for line, data in candidates]
+        ).values_list('username', 'id'))
+
+        members = Member.objects.bulk_create([
+            Member(
+                user_id=user_ids[data['username']],
+                name=data['name'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                legal_name=data['legal_name'],
+                address=data['address'],
+                email=data['email'],
+                phone=data['phone'],
+                rollnumber=data['rollnumber'],
+                member_score=data['member_score'],
+                inactive_flag=data['inactive_flag'],
+                abroad_flag=data['abroad_flag'],
+                temp_password=True,
+                present=data['present'],
+                position=data['position']
+            )
+            for line, data in candidates
+        ])
+
+        # bulk_create skips the post_save handlers that maintain the search tokens, queue score updates and invalidate
+        # cached responses.
+        invalidate_responses(Member)
+        if token_index_enabled():
+            rebuild_search_tokens(Member.objects.filter(user_id__in=user_ids.values()))
+        queue_score_updates(Member.objects.filter(user_id__in=user_ids.values()).values_list('id', flat=True))
+
+        self.report['created'] += len(members)
+
+    def flatten(self, message):
+        if isinstance(message, (list, tuple)):
+            return " ".join(str(part) for part in message)
+        return str(message)
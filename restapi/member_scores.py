@@ -0,0 +1,403 @@
+import datetime
+import logging
+import re
+import threading
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q, Value
+from django.db.models.functions import Replace
+from django.utils import timezone
+
+from restapi.leaderboard import refresh_leaderboard
+from restapi.leases import LeaderLease
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.guests import Guest
+from restapi.models.member_score_scales import MemberScoreScale
+from restapi.models.member_score_updates import MemberScoreUpdate
+from restapi.models.members import Member
+from restapi.models.sober_bros import SoberBro
+from restapi.response_cache import invalidate_responses
+
+logger = logging.getLogger(__name__)
+
+NON_DIGITS = re.compile(r'\D')
+
+# Held by whatever is scoring everyone: the recompute_member_scores command, the recompute endpoint, and the
+# updater when it has to fall back to a full recompute.
+RECOMPUTE_LEASE = 'member-scores'
+
+
+def member_phone_digits():
+    """
+    A member's phone as digits, the way guests' phones are stored. Member phones are kept as xxx.xxx.xxxx.
+    """
+    return Replace('phone', Value('.'), Value(''))
+
+
+def members_for_guests(guest_ids):
+    """
+    Returns the ids of the members who share a phone number with any of the guests, in one query.
+    """
+    return list(Member.objects.annotate(digits=member_phone_digits()).filter(
+        digits__in=Guest.objects.filter(id__in=list(guest_ids)).values('phone')
+    ).values_list('id', flat=True))
+
+
+def queue_score_updates(member_ids, now=None):
+    """
+    Queues members to have their scores recomputed by the MemberScoreUpdater. A member already queued has their
+    touched_at pushed back, so a burst of changes to them is settled before anything is recomputed. Call it inside
+    the transaction making the change, so nothing is queued for a change that rolls back.
+    """
+    member_ids = set(member_ids)
+    if not member_ids:
+        return
+
+    now = now or timezone.now()
+    MemberScoreUpdate.objects.filter(member_id__in=member_ids).update(touched_at=now)
+    MemberScoreUpdate.objects.bulk_create([
+        MemberScoreUpdate(member_id=member_id, queued_at=now, touched_at=now) for member_id in member_ids
+    ], ignore_conflicts=True)
+
+
+class MemberScoreEngine:
+    """
+    Recomputes every member's member_score in one pass.
+
+    Three aggregate queries feed it: each member's chapter attendance (present), how many sober bro shifts they've
+    finished, and how many events they've checked in to, matched on phone number since events check people in as
+    guests. Those are loaded into arrays indexed by member and scored in vectorized form. Each column is scaled
+    against the highest value among active members and the weighted sum is put on a 0-100 scale. Inactive members
+    score 0. Only the scores that changed are written back, in a single bulk_update.
+
+    run() scores everyone and stores the highest values it scaled by. update() scores just the given members, with
+    the same queries limited to them, against the stored scale. If their changes would move the scale, every score
+    is out of date, so it falls back to run(). Either way, the leaderboard is refreshed once scores have changed.
+    """
+
+    weights = {
+        'present': 0.5,
+        'shifts': 0.3,
+        'events': 0.2,
+    }
+
+    def __init__(self, weights=None, now=None, batch_size=1000):
+        self.weights = dict(weights or self.weights)
+        self.now = now
+        self.batch_size = batch_size
+
+    def run(self):
+        """
+        Scores every member and saves the changes. Returns the number of members scored and updated.
+        """
+        columns = self.load()
+        scale = self.scale(columns)
+        scores = self.compute(columns, scale)
+
+        with transaction.atomic():
+            updated = self.save(columns['id'], columns['member_score'], scores)
+            self.save_scale(scale)
+            refresh_leaderboard()
+
+        logger.info(f"Scored {len(scores)} members, {updated} changed")
+
+        return {
+            'members': len(scores),
+            'updated': updated
+        }
+
+    def update(self, member_ids):
+        """
+        Scores only the given members and saves the changes, unless they've moved the scale, in which case everyone
+        is scored. Returns the number of members scored and updated, like run().
+        """
+        member_ids = sorted(set(member_ids))
+        if not member_ids:
+            return {'members': 0, 'updated': 0}
+
+        scale = self.load_scale()
+        if scale is None:
+            return self.run_exclusively()
+
+        columns = self.load(member_ids)
+        if self.scale_moved(columns, scale, member_ids):
+            logger.info(f"Scores for {len(member_ids)} members moved the scale, scoring everyone")
+            return self.run_exclusively()
+
+        scores = self.compute(columns, scale)
+        with transaction.atomic():
+            updated = self.save(columns['id'], columns['member_score'], scores)
+
+            # A queued member who's been deleted took their rank with them, leaving a gap for the ranks below.
+            if updated or len(columns['id']) < len(member_ids):
+                refresh_leaderboard()
+
+        return {
+            'members': len(scores),
+            'updated': updated
+        }
+
+    def run_exclusively(self):
+        """
+        run(), once the recompute lease is free. Two full recomputes at once would race to replace the stored scale.
+        """
+        lease = LeaderLease(RECOMPUTE_LEASE)
+
+        try:
+            lease.wait()
+            lease.start_heartbeat()
+            return self.run()
+        finally:
+            lease.release()
+
+    def check(self):
+        """
+        Scores everyone without saving anything. Returns (member id, stored score, expected score) for every member
+        whose stored score is wrong.
+        """
+        columns = self.load()
+        scores = self.compute(columns, self.scale(columns))
+        drifted = np.flatnonzero(~np.isclose(columns['member_score'], scores, rtol=0, atol=0.005))
+
+        return [(int(columns['id'][i]), float(columns['member_score'][i]), float(scores[i])) for i in drifted]
+
+    def load(self, member_ids=None):
+        """
+        Returns the scoring inputs as arrays, one entry per member in id order. With member_ids, only those members
+        are loaded.
+        """
+        members = Member.objects.order_by('id')
+        if member_ids is not None:
+            members = members.filter(id__in=member_ids)
+
+        rows = list(members.values_list('id', 'phone', 'present', 'inactive_flag', 'member_score'))
+        count = len(rows)
+
+        ids, phones, present, inactive, member_score = zip(*rows) if rows else ([], [], [], [], [])
+        columns = {
+            'id': np.array(ids, dtype=np.int64),
+            'present': np.array(present, dtype=np.float64),
+            'active': ~np.array(inactive, dtype=bool),
+            'member_score': np.array(member_score, dtype=np.float64),
+            'shifts': np.zeros(count),
+            'events': np.zeros(count),
+        }
+
+        digits = [NON_DIGITS.sub('', phone or '') for phone in phones]
+
+        shifts = self.finished_shifts()
+        events = EventAttendance.objects.all()
+        if member_ids is not None:
+            shifts = shifts.filter(member__in=member_ids)
+            events = events.filter(guest__phone__in=digits)
+
+        shifts = shifts.values('member').annotate(count=Count('id')).values_list('member', 'count')
+        self.scatter(columns['shifts'], columns['id'], shifts)
+
+        events = events.values('guest__phone').annotate(
+            count=Count('event', distinct=True)
+        ).values_list('guest__phone', 'count')
+        self.match_phones(columns['events'], digits, events)
+
+        return columns
+
+    def finished_shifts(self):
+        return SoberBro.objects.filter(shift__time_end__lte=self.now or timezone.now())
+
+    def scale(self, columns):
+        """
+        Returns the highest value of each input among the active members in the columns.
+        """
+        active = columns['active']
+        return {name: float(columns[name][active].max()) if active.any() else 0.0 for name in self.weights}
+
+    def load_scale(self):
+        """
+        Returns the scale stored by the last run(), or None if there isn't one for every input.
+        """
+        scale = dict(MemberScoreScale.objects.filter(column__in=self.weights).values_list('column', 'maximum'))
+        return scale if len(scale) == len(self.weights) else None
+
+    def save_scale(self, scale):
+        MemberScoreScale.objects.all().delete()
+        MemberScoreScale.objects.bulk_create([
+            MemberScoreScale(column=name, maximum=maximum) for name, maximum in scale.items()
+        ])
+
+    def scale_moved(self, columns, scale, member_ids):
+        """
+        Whether rescoring these members changes the scale. It has if any of them now tops an input, or if none of
+        them is at its highest value any more and nobody else reaches it either.
+        """
+        active = columns['active']
+
+        for name in self.weights:
+            values = columns[name][active]
+
+            if (values > scale[name]).any():
+                return True
+            if scale[name] == 0 or (values == scale[name]).any():
+                continue
+            if not self.others_reach(name, scale[name], member_ids):
+                return True
+
+        return False
+
+    def others_reach(self, name, maximum, member_ids):
+        """
+        Whether any active member outside member_ids has at least `maximum` of the input. Each check is one query.
+        """
+        others = Member.objects.filter(inactive_flag=False).exclude(id__in=member_ids)
+
+        if name == 'present':
+            return others.filter(present__gte=maximum).exists()
+
+        if name == 'shifts':
+            return self.finished_shifts().filter(member__in=others).values('member').annotate(
+                count=Count('id')
+            ).filter(count__gte=maximum).exists()
+
+        if name == 'events':
+            return EventAttendance.objects.filter(
+                guest__phone__in=others.annotate(digits=member_phone_digits()).values('digits')
+            ).values('guest__phone').annotate(
+                count=Count('event', distinct=True)
+            ).filter(count__gte=maximum).exists()
+
+        # There's no check for other inputs, so their scale is assumed to have moved.
+        return False
+
+    def compute(self, columns, scale=None):
+        """
+        Returns each member's score, from the arrays load() returns, against the given scale or the columns' own.
+        """
+        active = columns['active']
+        scale = scale or self.scale(columns)
+        scores = np.zeros(len(active))
+
+        for name, weight in self.weights.items():
+            if scale[name] > 0:
+                scores += weight * columns[name] / scale[name]
+
+        total = sum(self.weights.values())
+        if total > 0:
+            scores *= 100 / total
+
+        return np.round(np.where(active, scores, 0), 2)
+
+    def save(self, ids, previous, scores):
+        changed = np.flatnonzero(previous != scores)
+
+        # bulk_update doesn't fill in auto_now fields, and updated_at backs the member endpoints' ETags.
+        updated_at = timezone.now()
+        members = [Member(id=int(ids[i]), member_score=float(scores[i]), updated_at=updated_at) for i in changed]
+
+        Member.objects.bulk_update(members, ['member_score', 'updated_at'], batch_size=self.batch_size)
+        if members:
+            invalidate_responses(Member)
+
+        return len(members)
+
+    @staticmethod
+    def scatter(column, ids, counts):
+        """
+        Writes (member id, count) pairs into the column at each member's position.
+        """
+        counts = np.array(list(counts), dtype=np.int64).reshape(-1, 2)
+        positions = np.searchsorted(ids, counts[:, 0])
+
+        found = positions < len(ids)
+        found[found] = ids[positions[found]] == counts[found, 0]
+        column[positions[found]] = counts[found, 1]
+
+    @staticmethod
+    def match_phones(column, phones, counts):
+        """
+        Writes (phone, count) pairs into the column at every member with that phone number.
+        """
+        counts = list(counts)
+        if not counts or not phones:
+            return
+
+        guest_phones = np.array([phone for phone, count in counts])
+        guest_counts = np.array([count for phone, count in counts], dtype=np.float64)
+
+        order = np.argsort(guest_phones)
+        guest_phones, guest_counts = guest_phones[order], guest_counts[order]
+
+        member_phones = np.array(phones)
+        positions = np.minimum(np.searchsorted(guest_phones, member_phones), len(guest_phones) - 1)
+
+        found = (guest_phones[positions] == member_phones) & (member_phones != '')
+        column[found] = guest_counts[positions[found]]
+
+
+class MemberScoreUpdater:
+    """
+    Drains the MemberScoreUpdate queue, rescoring the queued members in one batch.
+
+    Updates are debounced: a member is picked up once nothing has touched them for `debounce`, or once they've
+    waited `max_wait` regardless, so a burst of sign-ups or check-ins is rescored once. A member touched again while
+    their batch is being scored stays queued for the next one.
+
+    A shift finishing changes its sober bros' scores without anything being saved, so each tick also queues the
+    members on shifts that ended since the last one.
+    """
+
+    def __init__(self, engine=None, debounce=datetime.timedelta(seconds=2), max_wait=datetime.timedelta(seconds=30),
+                 interval=datetime.timedelta(seconds=1), batch_size=1000):
+        self.engine = engine or MemberScoreEngine()
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.shifts_checked_at = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        """
+        Rescores everyone once, since changes may have been missed while nothing was running, then keeps the queue
+        drained until stop() is called.
+        """
+        self.shifts_checked_at = timezone.now()
+        self.engine.run_exclusively()
+
+        while not self.stopped.is_set():
+            self.tick()
+            self.stopped.wait(self.interval.total_seconds())
+
+    def stop(self):
+        self.stopped.set()
+
+    def tick(self, now=None):
+        """
+        Rescores the members whose updates are due. Returns the engine's result.
+        """
+        now = now or timezone.now()
+        self.queue_finished_shifts(now)
+
+        due = MemberScoreUpdate.objects.filter(Q(touched_at__lte=now - self.debounce) |
+                                               Q(queued_at__lte=now - self.max_wait))
+        member_ids = list(due.order_by('queued_at').values_list('member_id', flat=True)[:self.batch_size])
+
+        if not member_ids:
+            return {'members': 0, 'updated': 0}
+
+        # Not one transaction: the recompute lease a full recompute waits on has to be visible to other processes
+        # while it's held. Rescoring twice is harmless, so the queue is only cleared once the scores are saved.
+        result = self.engine.update(member_ids)
+        MemberScoreUpdate.objects.filter(member_id__in=member_ids, touched_at__lte=now).delete()
+
+        logger.info(f"Rescored {len(member_ids)} queued members, {result['updated']} changed")
+        return result
+
+    def queue_finished_shifts(self, now):
+        if self.shifts_checked_at is not None:
+            queue_score_updates(SoberBro.objects.filter(
+                shift__time_end__gt=self.shifts_checked_at,
+                shift__time_end__lte=now
+            ).values_list('member_id', flat=True), now=now)
+
+        self.shifts_checked_at = now
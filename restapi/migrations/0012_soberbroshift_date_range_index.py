@@ -0,0 +1,17 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0011_auto_20211010_2149'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='soberbroshift',
+            index=models.Index(fields=['date', 'time_start', 'id'], name='sbshift_date_start_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+def remove_duplicate_sign_ups(apps, schema_editor):
+    """
+    Keeps the earliest sign-up for every (shift, member) pair so the unique constraint can be applied.
+    """
+    SoberBro = apps.get_model('restapi', 'SoberBro')
+
+    seen = set()
+    duplicates = []
+    for sober_bro_id, shift_id, member_id in SoberBro.objects.order_by('id').values_list('id', 'shift_id', 'member_id'):
+        if (shift_id, member_id) in seen:
+            duplicates.append(sober_bro_id)
+        else:
+            seen.add((shift_id, member_id))
+
+    SoberBro.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0012_soberbroshift_date_range_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_sign_ups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='soberbro',
+            constraint=models.UniqueConstraint(fields=('shift', 'member'), name='unique_sober_bro_per_shift'),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:22
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copies of what restapi.search did when this migration was written, so later changes to search don't change
+# what this migration does.
+SEARCH_FIELDS = {
+    'name': 3,
+    'first_name': 2,
+    'last_name': 2,
+    'phone': 2,
+    'legal_name': 1,
+    'position': 1,
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+NON_DIGIT_PATTERN = re.compile(r'\D')
+
+
+def tokenize(value):
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    normalized = ''.join(character for character in decomposed if not unicodedata.combining(character)).lower()
+    return TOKEN_PATTERN.findall(normalized)
+
+
+def member_tokens(member):
+    tokens = {}
+
+    for field, weight in SEARCH_FIELDS.items():
+        value = getattr(member, field) or ''
+
+        if field == 'phone':
+            field_tokens = [NON_DIGIT_PATTERN.sub('', value)] + tokenize(value)
+        else:
+            field_tokens = tokenize(value)
+
+        for token in field_tokens:
+            if token and tokens.get(token, 0) < weight:
+                tokens[token] = weight
+
+    return tokens
+
+
+def trigram_extension_installed(connection):
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Member search on PostgreSQL is served by trigram indexes over UPPER(field), matching how icontains is compiled.
+    Servers without pg_trgm available fall back to the token table like every other database.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS member_%s_trgm_idx ON restapi_member USING gin (UPPER(%s) gin_trgm_ops)'
+            % (field, field)
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if not trigram_extension_installed(schema_editor.connection):
+        return
+
+    for field in SEARCH_FIELDS:
+        schema_editor.execute('DROP INDEX IF EXISTS member_%s_trgm_idx' % field)
+
+
+def populate_search_tokens(apps, schema_editor):
+    """
+    Everywhere else, search goes through the token table, which is backfilled here for existing members.
+    """
+    if trigram_extension_installed(schema_editor.connection):
+        return
+
+    Member = apps.get_model('restapi', 'Member')
+    MemberSearchToken = apps.get_model('restapi', 'MemberSearchToken')
+    database = schema_editor.connection.alias
+
+    MemberSearchToken.objects.using(database).bulk_create([
+        MemberSearchToken(member_id=member.id, token=token[:127], weight=weight)
+        for member in Member.objects.using(database).all()
+        for token, weight in member_tokens(member).items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0013_soberbro_unique_per_shift'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=127, verbose_name="A lowercased, unaccented word or digit string from one of the member's searchable fields.")),
+                ('weight', models.IntegerField(verbose_name="How much a match on this token counts towards the member's search rank.")),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='restapi.member', verbose_name='The member this token was taken from.')),
+            ],
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+        migrations.RunPython(populate_search_tokens, migrations.RunPython.noop),
+    ]
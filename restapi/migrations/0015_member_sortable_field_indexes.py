@@ -0,0 +1,28 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0014_member_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='member_score',
+            field=models.FloatField(db_index=True, verbose_name='The automatic value calculated by the system to assess member involvement'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='position',
+            field=models.CharField(db_index=True, max_length=255, verbose_name="Their position within the chapter. If they don't have one, just use 'Brother'."),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='rollnumber',
+            field=models.IntegerField(db_index=True, verbose_name="The member's number in the roll book"),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0015_member_sortable_field_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlackMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=127, verbose_name='The Slack channel or user ID the message is posted to.')),
+                ('text', models.TextField(verbose_name='The message text. Slack shows it in notifications and as the fallback for the blocks.')),
+                ('blocks', models.JSONField(blank=True, null=True, verbose_name='Block Kit blocks for the message, if any.')),
+                ('dedupe_key', models.CharField(blank=True, max_length=255, null=True, unique=True, verbose_name='Identifies the notification, so the same one is never queued twice.')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=15)),
+                ('attempts', models.IntegerField(default=0, verbose_name='How many times sending this message has been tried.')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='When the dispatcher may next pick this message up.')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Why the last attempt failed.')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='slackmessage',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='slackmsg_status_due_idx'),
+        ),
+    ]
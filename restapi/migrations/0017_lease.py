@@ -0,0 +1,23 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0016_slack_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lease',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='The job this lease elects a runner for.')),
+                ('holder', models.CharField(max_length=255, verbose_name='Identifies the process currently holding the lease.')),
+                ('expires_at', models.DateTimeField(verbose_name='When the lease lapses unless the holder renews it.')),
+                ('acquired_at', models.DateTimeField(verbose_name='When the current holder took the lease.')),
+            ],
+        ),
+    ]
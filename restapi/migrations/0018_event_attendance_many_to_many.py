@@ -0,0 +1,37 @@
+# Generated by Django 3.1.4 on 2026-10-18 13:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0017_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='guests',
+            field=models.ManyToManyField(related_name='events', through='restapi.EventAttendance', to='restapi.Guest', verbose_name='The guests who have checked in to this event.'),
+        ),
+        migrations.AlterField(
+            model_name='eventattendance',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='attendances', to='restapi.event'),
+        ),
+        migrations.AlterField(
+            model_name='eventattendance',
+            name='guest',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='attendances', to='restapi.guest'),
+        ),
+        migrations.AddIndex(
+            model_name='eventattendance',
+            index=models.Index(fields=['event', 'arrival_time', 'id'], name='attendance_event_arrival_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventattendance',
+            constraint=models.UniqueConstraint(fields=('event', 'guest'), name='unique_guest_per_event'),
+        ),
+    ]
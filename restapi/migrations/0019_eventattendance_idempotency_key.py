@@ -0,0 +1,18 @@
+# Generated by Django 3.1.4 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0018_event_attendance_many_to_many'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventattendance',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='The key a door device sent with this check-in, so a re-synced check-in is only recorded once.'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.4 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0019_eventattendance_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberScoreScale',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('column', models.CharField(max_length=31, unique=True, verbose_name='The scoring input, e.g. present, shifts or events.')),
+                ('maximum', models.FloatField(verbose_name='The highest value of the input among active members.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MemberScoreUpdate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_id', models.IntegerField(unique=True, verbose_name='The member whose score is out of date.')),
+                ('queued_at', models.DateTimeField(verbose_name='When the member was first queued, since their last recompute.')),
+                ('touched_at', models.DateTimeField(verbose_name='The last time something changed for this member. Updates wait for this to settle.')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='memberscoreupdate',
+            index=models.Index(fields=['touched_at'], name='scoreupdate_touched_idx'),
+        ),
+    ]
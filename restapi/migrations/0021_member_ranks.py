@@ -0,0 +1,27 @@
+# Generated by Django 3.1.4 on 2026-10-18 14:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0020_member_score_updates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberRank',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField(verbose_name='1 for the highest score. Members with the same score share a rank.')),
+                ('member_score', models.FloatField(verbose_name="The member's score when they were ranked.")),
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rank', to='restapi.member', verbose_name='The ranked member.')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='memberrank',
+            index=models.Index(fields=['rank', 'id'], name='memberrank_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.4 on 2026-10-18 16:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0021_member_ranks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name="When this record was last saved. Backs the member endpoints' ETags."),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='soberbro',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name="When this sign-up was last saved. Backs the roster's ETag."),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='soberbroshift',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name="When this shift was last saved. Backs the shift endpoints' ETags."),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.1.4 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_framework_api_key', '0004_prefix_hashed_key'),
+        ('restapi', '0022_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIKeyUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('request_count', models.BigIntegerField(default=0, verbose_name='How many requests have been made with the key.')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='When the key was last used.')),
+                ('api_key', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='rest_framework_api_key.apikey', verbose_name='The API key these requests were made with.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 3.1.4 on 2026-10-18 15:06
+
+import re
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+NON_DIGITS = re.compile(r'\D')
+
+
+def normalized(phone):
+    """
+    A frozen copy of restapi.check_in.normalize_phone. Numbers it would reject are left as they are.
+    """
+    digits = NON_DIGITS.sub('', phone)
+    return digits if 7 <= len(digits) <= 15 else phone
+
+
+def merge_duplicate_guests(apps, schema_editor):
+    """
+    Normalizes every guest's phone and folds guests sharing a number into the oldest of them, so the unique
+    constraint can be added. Check-ins move to the guest that's kept; where both had checked in to the same event,
+    the kept guest's check-in stands.
+    """
+    Guest = apps.get_model('restapi', 'Guest')
+    EventAttendance = apps.get_model('restapi', 'EventAttendance')
+    Event = apps.get_model('restapi', 'Event')
+    database = schema_editor.connection.alias
+
+    kept = {}
+    merged_events = set()
+
+    for guest in Guest.objects.using(database).order_by('id'):
+        phone = normalized(guest.phone)
+
+        if phone not in kept:
+            kept[phone] = guest
+            if guest.phone != phone:
+                Guest.objects.using(database).filter(id=guest.id).update(phone=phone)
+            continue
+
+        survivor = kept[phone]
+        attendances = EventAttendance.objects.using(database)
+        attended = attendances.filter(guest_id=survivor.id).values_list('event_id', flat=True)
+
+        merged_events.update(attendances.filter(guest_id=guest.id).values_list('event_id', flat=True))
+        attendances.filter(guest_id=guest.id, event_id__in=list(attended)).delete()
+        attendances.filter(guest_id=guest.id).update(guest_id=survivor.id)
+
+        if survivor.member_id is None and guest.member_id is not None:
+            Guest.objects.using(database).filter(id=guest.id).update(member=None)
+            Guest.objects.using(database).filter(id=survivor.id).update(member_id=guest.member_id)
+            survivor.member_id = guest.member_id
+
+        Guest.objects.using(database).filter(id=guest.id).delete()
+
+    if merged_events:
+        attendance_count = EventAttendance.objects.using(database).filter(event=OuterRef('pk')).values(
+            'event'
+        ).annotate(count=Count('id')).values('count')
+
+        Event.objects.using(database).filter(id__in=merged_events).update(
+            guest_count=Coalesce(Subquery(attendance_count), Value(0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0023_api_key_usage'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_guests, migrations.RunPython.noop),
+    ]
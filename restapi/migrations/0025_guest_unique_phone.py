@@ -0,0 +1,20 @@
+# Generated by Django 3.1.4 on 2026-10-18 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # The duplicates are merged in a migration of their own, so the merge's deferred foreign key checks have run
+    # before the table is altered.
+    dependencies = [
+        ('restapi', '0024_merge_duplicate_guests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guest',
+            name='phone',
+            field=models.CharField(max_length=15, unique=True, verbose_name='The phone number associated with this guest, as digits only.'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.4 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0025_guest_unique_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name="What the counter versions, such as a model's cached responses or a shift's Slack payloads.")),
+                ('version', models.BigIntegerField(verbose_name='The current version. Cached values built from older versions are never read again.')),
+            ],
+        ),
+    ]
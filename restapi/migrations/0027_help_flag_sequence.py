@@ -0,0 +1,56 @@
+# Generated by Django 3.1.4 on 2026-10-18 16:10
+
+from django.db import migrations, models
+
+
+def number_raised_flags(apps, schema_editor):
+    """
+    Numbers the flags already raised at each event in the order they went up, and sets each event's counter to its
+    last number.
+    """
+    Event = apps.get_model('restapi', 'Event')
+    EventAttendance = apps.get_model('restapi', 'EventAttendance')
+    database = schema_editor.connection.alias
+
+    raised = EventAttendance.objects.using(database).filter(
+        help_flag=True,
+        help_flag_raised_at__isnull=False
+    ).order_by('event_id', 'help_flag_raised_at', 'id')
+
+    numbered = []
+    counters = {}
+
+    for attendance in raised:
+        counters[attendance.event_id] = counters.get(attendance.event_id, 0) + 1
+        attendance.help_flag_sequence = counters[attendance.event_id]
+        numbered.append(attendance)
+
+    EventAttendance.objects.using(database).bulk_update(numbered, ['help_flag_sequence'], batch_size=500)
+
+    for event_id, count in counters.items():
+        Event.objects.using(database).filter(id=event_id).update(help_flag_sequence=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0026_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='help_flag_sequence',
+            field=models.PositiveIntegerField(default=0, verbose_name='How many help flags have been raised at the event. The last number given to one.'),
+        ),
+        migrations.AddField(
+            model_name='eventattendance',
+            name='help_flag_sequence',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Numbers the help flag among those raised at the event, in the order they were committed.'),
+        ),
+        migrations.RunPython(number_raised_flags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='eventattendance',
+            constraint=models.UniqueConstraint(fields=('event', 'help_flag_sequence'), name='unique_help_flag_per_event'),
+        ),
+    ]
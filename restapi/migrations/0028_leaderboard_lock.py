@@ -0,0 +1,28 @@
+# Generated by Django 3.1.4 on 2026-10-18 18:02
+
+import time
+
+from django.db import migrations
+
+
+def create_leaderboard_lock(apps, schema_editor):
+    """
+    Creates the CacheVersion row refresh_leaderboard locks, so the first refresh finds it in place like every other.
+    """
+    CacheVersion = apps.get_model('restapi', 'CacheVersion')
+    database = schema_editor.connection.alias
+
+    CacheVersion.objects.using(database).bulk_create([
+        CacheVersion(key='leaderboard', version=time.time_ns())
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restapi', '0027_help_flag_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_leaderboard_lock, migrations.RunPython.noop),
+    ]
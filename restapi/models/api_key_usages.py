@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class APIKeyUsage(models.Model):
+    """
+    How many requests an API key has made. Counted in memory by restapi.api_keys.APIKeyUsageBuffer and written
+    here in batches, so it can trail the real count by a few seconds.
+    """
+    api_key = models.OneToOneField(
+        to='rest_framework_api_key.APIKey',
+        on_delete=models.CASCADE,
+        related_name='usage',
+        verbose_name="The API key these requests were made with."
+    )
+
+    request_count = models.BigIntegerField(
+        default=0,
+        verbose_name="How many requests have been made with the key."
+    )
+
+    last_used_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="When the key was last used."
+    )
+
+    def __str__(self):
+        return str(self.request_count) + " requests with " + str(self.api_key_id)
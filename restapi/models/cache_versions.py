@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class CacheVersion(models.Model):
+    """
+    A version counter for cached data, read and bumped by restapi.cache_versions. Kept in the database, rather than
+    the cache, so every process sees a bump the moment it's made, whatever cache each of them has.
+    """
+    key = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name="What the counter versions, such as a model's cached responses or a shift's Slack payloads."
+    )
+
+    version = models.BigIntegerField(
+        verbose_name="The current version. Cached values built from older versions are never read again."
+    )
+
+    def __str__(self):
+        return self.key + " at version " + str(self.version)
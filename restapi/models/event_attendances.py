@@ -6,8 +6,8 @@ from django.db import models
 class EventAttendance(models.Model):
     # Basically, if the event or the guest associated here gets deleted,
     # we're doing nothing.
-    event = models.OneToOneField(Event, on_delete=models.DO_NOTHING)
-    guest = models.OneToOneField(Guest, on_delete=models.DO_NOTHING)
+    event = models.ForeignKey(Event, on_delete=models.DO_NOTHING, related_name='attendances')
+    guest = models.ForeignKey(Guest, on_delete=models.DO_NOTHING, related_name='attendances')
 
     arrival_time = models.DateTimeField(
         verbose_name="When this guest checked into the event.",
@@ -27,9 +27,33 @@ class EventAttendance(models.Model):
         blank=True
     )
 
+    help_flag_sequence = models.PositiveIntegerField(
+        verbose_name="Numbers the help flag among those raised at the event, in the order they were committed.",
+        null=True,
+        blank=True
+    )
+
+    idempotency_key = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name="The key a door device sent with this check-in, so a re-synced check-in is only recorded once."
+    )
+
+    class Meta:
+        constraints = [
+            # A guest checks in to any number of events, but only once to each.
+            models.UniqueConstraint(fields=['event', 'guest'], name='unique_guest_per_event'),
+            # Also backs reading an event's help flags in order, after a stream's cursor.
+            models.UniqueConstraint(fields=['event', 'help_flag_sequence'], name='unique_help_flag_per_event'),
+        ]
+        indexes = [
+            # Backs the check-in listing for an event, in arrival order.
+            models.Index(fields=['event', 'arrival_time', 'id'], name='attendance_event_arrival_idx'),
+        ]
+
     def __str__(self):
         return str(self.guest.name) + \
                " at " + \
                str(self.event.event_name)
-
-
@@ -39,7 +39,17 @@ class Event(models.Model):
         unique=True
     )
 
-    def __str__(self):
-        return str(self.event_name)
+    help_flag_sequence = models.PositiveIntegerField(
+        verbose_name="How many help flags have been raised at the event. The last number given to one.",
+        default=0
+    )
 
+    guests = models.ManyToManyField(
+        'Guest',
+        through='EventAttendance',
+        related_name='events',
+        verbose_name="The guests who have checked in to this event."
+    )
 
+    def __str__(self):
+        return str(self.event_name)
@@ -5,8 +5,8 @@ from django.db import models
 class Guest(models.Model):
     phone = models.CharField(
         max_length=15,
-        db_index=True,
-        verbose_name="The phone number associated with this guest.",
+        unique=True,
+        verbose_name="The phone number associated with this guest, as digits only.",
         blank=False,
         null=False
     )
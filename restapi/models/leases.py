@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class Lease(models.Model):
+    """
+    A named, expiring claim held by one process at a time. Used by restapi.leases to elect a single runner for jobs
+    that must not run on more than one dyno at once.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="The job this lease elects a runner for."
+    )
+
+    holder = models.CharField(
+        max_length=255,
+        verbose_name="Identifies the process currently holding the lease."
+    )
+
+    expires_at = models.DateTimeField(
+        verbose_name="When the lease lapses unless the holder renews it."
+    )
+
+    acquired_at = models.DateTimeField(
+        verbose_name="When the current holder took the lease."
+    )
+
+    def __str__(self):
+        return str(self.name) + " held by " + str(self.holder)
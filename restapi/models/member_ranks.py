@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class MemberRank(models.Model):
+    """
+    A member's place on the leaderboard, denormalized from member_score by restapi.leaderboard so a page of the
+    leaderboard, or one member's rank, is an index lookup rather than a sort of the Member table.
+    """
+    member = models.OneToOneField(
+        to='Member',
+        on_delete=models.CASCADE,
+        related_name='rank',
+        verbose_name="The ranked member."
+    )
+
+    rank = models.IntegerField(
+        verbose_name="1 for the highest score. Members with the same score share a rank."
+    )
+
+    member_score = models.FloatField(
+        verbose_name="The member's score when they were ranked."
+    )
+
+    class Meta:
+        indexes = [
+            # Backs leaderboard pages, in rank order.
+            models.Index(fields=['rank', 'id'], name='memberrank_rank_idx'),
+        ]
+
+    def __str__(self):
+        return "#" + str(self.rank) + " " + str(self.member)
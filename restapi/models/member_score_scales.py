@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class MemberScoreScale(models.Model):
+    """
+    The highest value among active members of one member_score input, as of the last full recompute. Every score
+    is measured against these, so an incremental update can only stand if they haven't moved.
+    """
+    column = models.CharField(
+        max_length=31,
+        unique=True,
+        verbose_name="The scoring input, e.g. present, shifts or events."
+    )
+
+    maximum = models.FloatField(
+        verbose_name="The highest value of the input among active members."
+    )
+
+    def __str__(self):
+        return str(self.column) + " up to " + str(self.maximum)
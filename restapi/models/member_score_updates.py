@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class MemberScoreUpdate(models.Model):
+    """
+    A member whose member_score needs recomputing because something it's based on changed. Written by the signals
+    in restapi.signals and drained by restapi.member_scores.MemberScoreUpdater.
+    """
+    # Not a foreign key, so a deleted member can still be queued. Their score is gone, but they may have set the
+    # scale everyone else's is measured against.
+    member_id = models.IntegerField(
+        unique=True,
+        verbose_name="The member whose score is out of date."
+    )
+
+    queued_at = models.DateTimeField(
+        verbose_name="When the member was first queued, since their last recompute."
+    )
+
+    touched_at = models.DateTimeField(
+        verbose_name="The last time something changed for this member. Updates wait for this to settle."
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['touched_at'], name='scoreupdate_touched_idx'),
+        ]
+
+    def __str__(self):
+        return "Score update for member " + str(self.member_id)
@@ -0,0 +1,29 @@
+from django.db import models
+
+from restapi.models.members import Member
+
+
+class MemberSearchToken(models.Model):
+    """
+    Normalized search tokens for a member, used by member search on databases without trigram indexes.
+    Kept up to date by the Member signal handlers in restapi.signals.
+    """
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name="The member this token was taken from."
+    )
+
+    token = models.CharField(
+        max_length=127,
+        db_index=True,
+        verbose_name="A lowercased, unaccented word or digit string from one of the member's searchable fields."
+    )
+
+    weight = models.IntegerField(
+        verbose_name="How much a match on this token counts towards the member's search rank."
+    )
+
+    def __str__(self):
+        return str(self.token) + " -> " + str(self.member_id)
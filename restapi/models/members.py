@@ -47,10 +47,12 @@ class Member(models.Model):
     )
 
     rollnumber = models.IntegerField(
+        db_index=True,
         verbose_name="The member's number in the roll book"
     )
 
     member_score = models.FloatField(
+        db_index=True,
         verbose_name="The automatic value calculated by the system to assess member involvement"
     )
 
@@ -73,8 +75,14 @@ class Member(models.Model):
 
     position = models.CharField(
         max_length=255,
+        db_index=True,
         verbose_name="Their position within the chapter. If they don't have one, just use 'Brother'."
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="When this record was last saved. Backs the member endpoints' ETags."
+    )
+
     # avatar = models.ImageField(upload_to='staticfiles/UserMedia/', default='/staticfiles/images/default.jpg')
 
     def __str__(self):
@@ -0,0 +1,78 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SlackMessage(models.Model):
+    """
+    A Slack message waiting to be sent. Rows are written in the same transaction as the change they announce and
+    sent afterwards by the dispatch_slack_outbox command, so requests never wait on Slack and a failed send is
+    retried rather than lost.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    channel = models.CharField(
+        max_length=127,
+        verbose_name="The Slack channel or user ID the message is posted to."
+    )
+
+    text = models.TextField(
+        verbose_name="The message text. Slack shows it in notifications and as the fallback for the blocks."
+    )
+
+    blocks = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Block Kit blocks for the message, if any."
+    )
+
+    dedupe_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name="Identifies the notification, so the same one is never queued twice."
+    )
+
+    status = models.CharField(
+        max_length=15,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+
+    attempts = models.IntegerField(
+        default=0,
+        verbose_name="How many times sending this message has been tried."
+    )
+
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="When the dispatcher may next pick this message up."
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name="Why the last attempt failed."
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Backs the dispatcher's query for messages that are due.
+            models.Index(fields=['status', 'next_attempt_at'], name='slackmsg_status_due_idx'),
+        ]
+
+    def __str__(self):
+        return "(" + self.status + ") " + str(self.channel) + ": " + str(self.text)[:50]
@@ -25,6 +25,17 @@ class SoberBroShift(models.Model):
         default=5
     )
 
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="When this shift was last saved. Backs the shift endpoints' ETags."
+    )
+
+    class Meta:
+        indexes = [
+            # Backs the date-range listing and its (date, time_start, id) keyset pagination.
+            models.Index(fields=['date', 'time_start', 'id'], name='sbshift_date_start_id_idx'),
+        ]
+
     def __str__(self):
         return "(" + self.title + \
                 ") starting on " + \
@@ -14,6 +14,16 @@ class SoberBro(models.Model):
         null=False
     )
 
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="When this sign-up was last saved. Backs the roster's ETag."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shift', 'member'], name='unique_sober_bro_per_shift'),
+        ]
+
     def __str__(self):
         return str(self.member.name) + \
                " on shift " + \
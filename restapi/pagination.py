@@ -0,0 +1,183 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite ordering key.
+
+    Rather than an OFFSET, each cursor stores the ordering values of the row it was taken from, and the next page is
+    fetched with a filter for the rows that sort after those values, expanded key by key (see keyset_filter). The
+    cost of a page therefore stays the same no matter how deep into the results it is, provided the ordering is backed
+    by an index.
+
+    The ordering comes from the view's `get_keyset_ordering(request)` if it defines one, then the view's
+    `keyset_ordering` attribute, then `ordering` below. `id` is always appended as the final tiebreaker.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.keys = self.get_ordering(request, view)
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            values, reverse = None, False
+        else:
+            values, reverse = cursor
+            values = self.parse_cursor_values(queryset, values)
+
+        # Walking backwards is the same query with every direction flipped, reversed again afterwards.
+        keys = [(field, not desc) for field, desc in self.keys] if reverse else self.keys
+
+        queryset = queryset.order_by(*[('-' if desc else '') + field for field, desc in keys])
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(keys, values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = values is not None, has_more
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_ordering(self, request, view):
+        """
+        Returns the ordering as a list of (field, descending) pairs, ending in `id`.
+        """
+        if hasattr(view, 'get_keyset_ordering'):
+            ordering = view.get_keyset_ordering(request)
+        else:
+            ordering = getattr(view, 'keyset_ordering', self.ordering)
+
+        keys = []
+        for field in ordering:
+            if field.startswith('-'):
+                keys.append((field[1:], True))
+            else:
+                keys.append((field, False))
+
+        if 'id' not in [field for field, desc in keys]:
+            keys.append(('id', False))
+
+        return keys
+
+    def keyset_filter(self, keys, values):
+        """
+        Builds (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)... for the given keys.
+        """
+        condition = Q()
+
+        for position, (field, desc) in enumerate(keys):
+            comparison = Q(**{field + ('__lt' if desc else '__gt'): values[position]})
+
+            for earlier in range(0, position):
+                comparison &= Q(**{keys[earlier][0]: values[earlier]})
+
+            condition |= comparison
+
+        return condition
+
+    def encode_cursor(self, instance, reverse):
+        values = [self.to_cursor_value(getattr(instance, field)) for field, desc in self.keys]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Returns (values, reverse) for the cursor in the request, or None if there isn't one.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values = payload['v']
+            reverse = bool(payload['r'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if type(values) is not list or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values, reverse
+
+    def parse_cursor_values(self, queryset, values):
+        """
+        Converts a cursor's values to the types of the keys they're compared with, so a cursor that's been tampered
+        with is refused rather than failing in the query.
+        """
+        parsed = []
+
+        for (field, desc), value in zip(self.keys, values):
+            if field in queryset.query.annotations:
+                model_field = queryset.query.annotations[field].output_field
+            else:
+                model_field = queryset.model._meta.get_field(field)
+
+            if value is None and not model_field.null:
+                raise NotFound(self.invalid_cursor_message)
+
+            try:
+                parsed.append(model_field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return parsed
+
+    def to_cursor_value(self, value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
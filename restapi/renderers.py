@@ -0,0 +1,16 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets a view be asked for text/event-stream. The view streams the events itself, so there's nothing to render
+    beyond error bodies.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return ("event: error\ndata: " + str(data) + "\n\n").encode(self.charset)
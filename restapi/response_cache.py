@@ -0,0 +1,82 @@
+import functools
+import hashlib
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from restapi.cache_versions import bump_versions_on_commit, current_versions, pending_bumps
+
+cache_prefix = 'responses'
+cache_timeout = 60 * 60
+
+
+def version_key(model):
+    return cache_prefix + ":version:" + model._meta.label_lower
+
+
+def model_versions(models):
+    """
+    Returns the current version of each model, in order.
+    """
+    keys = [version_key(model) for model in models]
+    versions = current_versions(keys)
+    return [versions[key] for key in keys]
+
+
+def invalidate_responses(*models, using=None):
+    """
+    Drops every cached response built from the given models, once the transaction writing to them commits. Until
+    then, the writing transaction reads around the cache.
+    """
+    bump_versions_on_commit({version_key(model) for model in models}, using=using)
+
+
+def cache_key(request, versions, vary=None):
+    """
+    A response is keyed on the endpoint, its query parameters (which carry the page), whether the staff view was
+    rendered, and the versions of the models it was built from.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    parts = [
+        request.method,
+        # Pagination links are absolute, so the host is part of the endpoint.
+        request.build_absolute_uri(request.path),
+        repr(params),
+        str(bool(request.user.is_staff)),
+        repr(versions)
+    ]
+
+    if vary is not None:
+        parts.append(str(vary(request)))
+
+    return cache_prefix + ":" + hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def cache_response(*models, timeout=cache_timeout, vary=None):
+    """
+    Caches a read-only view method's successful responses until any of `models` is written to. `vary` is called with
+    the request for anything else the response depends on, such as the current date.
+
+    Writes to the models through save() and delete() invalidate the cache through restapi.signals. Bulk writes
+    don't send signals, so the code making them calls invalidate_responses() itself.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            keys = {version_key(model) for model in models}
+            if pending_bumps() & keys:
+                return method(view, request, *args, **kwargs)
+
+            key = cache_key(request, model_versions(models), vary)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout)
+
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,160 @@
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Greatest, Upper
+
+from restapi.models.member_search_tokens import MemberSearchToken
+
+# Fields considered by ?q= searches, and how heavily a match on each counts towards the rank.
+SEARCH_FIELDS = {
+    'name': 3,
+    'first_name': 2,
+    'last_name': 2,
+    'phone': 2,
+    'legal_name': 1,
+    'position': 1,
+}
+
+# Phone numbers only match on substrings; fuzzy matching every number with a 555 in it isn't useful.
+EXACT_ONLY_FIELDS = ['phone']
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+NON_DIGIT_PATTERN = re.compile(r'\D')
+
+# Whether pg_trgm is installed, per database alias. Checked once per process.
+_trigram_support = {}
+
+
+def apply_search_query(data, query):
+    """
+    Filters a Member queryset down to the members matching a free-text query, best matches first.
+    PostgreSQL with pg_trgm uses its trigram indexes; anything else goes through the MemberSearchToken table.
+    """
+    query = query.strip()
+    if not query:
+        return data
+
+    if trigram_search_enabled(data.db):
+        return trigram_search(data, query)
+    return token_search(data, query)
+
+
+def trigram_search(data, query):
+    """
+    Substring and fuzzy matching across SEARCH_FIELDS, served by the UPPER(field) gin_trgm_ops indexes.
+    """
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    upper_query = query.upper()
+
+    condition = Q()
+    annotations = {}
+    similarities = []
+    for field, weight in SEARCH_FIELDS.items():
+        upper_field = 'search_upper_' + field
+        annotations[upper_field] = Upper(field)
+
+        condition |= Q(**{field + '__icontains': query})
+        if field not in EXACT_ONLY_FIELDS:
+            condition |= Q(**{upper_field + '__trigram_similar': upper_query})
+        similarities.append(TrigramSimilarity(upper_field, upper_query) * Value(float(weight)))
+
+    return data.annotate(**annotations).filter(condition).annotate(
+        search_rank=Greatest(*similarities)
+    ).order_by('-search_rank', 'id')
+
+
+def token_search(data, query):
+    """
+    Prefix matching of the query's tokens against the precomputed token table. Every query token has to match one
+    of the member's tokens, and members are ranked by the summed weight of their matched tokens. Each prefix match
+    is a range scan over the token index.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return data.none()
+
+    condition = Q()
+    matches = {}
+    for position, token in enumerate(tokens):
+        prefix = Q(search_tokens__token__gte=token, search_tokens__token__lt=token + '\uffff')
+
+        condition |= prefix
+        matches['search_match_' + str(position)] = Count('search_tokens', filter=prefix)
+
+    return data.filter(condition).annotate(
+        search_rank=Sum('search_tokens__weight'),
+        **matches
+    ).filter(
+        **{name + '__gt': 0 for name in matches}
+    ).order_by('-search_rank', 'id')
+
+
+def normalize(value):
+    """
+    Lowercases a value and strips its accents, so 'José' and 'jose' produce the same tokens.
+    """
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(character for character in decomposed if not unicodedata.combining(character)).lower()
+
+
+def tokenize(value):
+    return TOKEN_PATTERN.findall(normalize(value))
+
+
+def member_tokens(member):
+    """
+    Returns {token: weight} for a member, keeping the heaviest weight when a token appears in several fields.
+    """
+    tokens = {}
+
+    for field, weight in SEARCH_FIELDS.items():
+        value = getattr(member, field) or ''
+
+        if field == 'phone':
+            # Phone numbers are searched by their digits, whatever separators the caller uses.
+            field_tokens = [NON_DIGIT_PATTERN.sub('', value)] + tokenize(value)
+        else:
+            field_tokens = tokenize(value)
+
+        for token in field_tokens:
+            if token and tokens.get(token, 0) < weight:
+                tokens[token] = weight
+
+    return tokens
+
+
+def trigram_search_enabled(using='default'):
+    if using not in _trigram_support:
+        _trigram_support[using] = trigram_extension_installed(connections[using])
+    return _trigram_support[using]
+
+
+def trigram_extension_installed(connection):
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def token_index_enabled(using='default'):
+    return not trigram_search_enabled(using)
+
+
+def rebuild_search_tokens(members, using='default'):
+    """
+    Replaces the search tokens for the given members.
+    """
+    members = list(members)
+
+    MemberSearchToken.objects.using(using).filter(member_id__in=[member.id for member in members]).delete()
+
+    MemberSearchToken.objects.using(using).bulk_create([
+        MemberSearchToken(member_id=member.id, token=token[:127], weight=weight)
+        for member in members
+        for token, weight in member_tokens(member).items()
+    ])
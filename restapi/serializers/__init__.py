@@ -1,4 +1,7 @@
 from .member_serializers import *
 from .sober_bro_shift_serializers import *
-from .sober_bro_serializer import *
 from .next_shift_serializer import *
+from .sober_bro_roster_serializers import *
+from .event_serializers import *
+from .leaderboard_serializers import *
+from .token_serializers import *
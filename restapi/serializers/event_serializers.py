@@ -0,0 +1,70 @@
+from rest_framework import serializers
+
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+
+
+class EventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ['id', 'event_name', 'location', 'comments', 'time_start', 'time_end', 'guest_count']
+        read_only_fields = ['guest_count']
+
+    def validate(self, data):
+        time_start = data.get('time_start', getattr(self.instance, 'time_start', None))
+        time_end = data.get('time_end', getattr(self.instance, 'time_end', None))
+
+        if time_start is not None and time_end is not None and time_end <= time_start:
+            raise serializers.ValidationError(
+                {
+                    "time_end": "An event must end after it starts."
+                }
+            )
+
+        return data
+
+
+class GuestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Guest
+        fields = ['id', 'name', 'phone']
+
+
+class EventAttendanceSerializer(serializers.ModelSerializer):
+    """
+    A guest's check-in to an event. Expects the guest to be select_related.
+    """
+    guest = GuestSerializer(read_only=True)
+
+    class Meta:
+        model = EventAttendance
+        fields = ['id', 'event', 'guest', 'arrival_time', 'help_flag', 'help_flag_raised_at']
+
+
+class CheckInSerializer(serializers.Serializer):
+    """
+    Validates a check-in at the door. The name is only needed for a guest's first visit.
+    """
+    phone = serializers.CharField(max_length=31)
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    arrival_time = serializers.DateTimeField(required=False)
+
+
+class CheckInRecordSerializer(serializers.Serializer):
+    """
+    A check-in recorded by a door device while it was offline, synced later as part of a batch.
+    """
+    idempotency_key = serializers.CharField(max_length=64)
+    phone = serializers.CharField(max_length=31)
+    name = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    arrival_time = serializers.DateTimeField()
+    help_flag = serializers.BooleanField(required=False, default=False)
+
+
+class HelpFlagSerializer(serializers.Serializer):
+    """
+    Raises the help flag for a guest at an event. The note is passed on to the sober bros, not stored.
+    """
+    phone = serializers.CharField(max_length=31)
+    note = serializers.CharField(max_length=500, required=False, allow_blank=True)
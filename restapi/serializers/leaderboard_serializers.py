@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from restapi.models.member_ranks import MemberRank
+from restapi.serializers.member_serializers import ProjectedFieldsMixin
+
+
+class LeaderboardSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
+    """
+    A member's place on the leaderboard. Expects the member to be select_related.
+    """
+    member = serializers.IntegerField(source='member_id', read_only=True)
+    name = serializers.CharField(source='member.name', read_only=True)
+    position = serializers.CharField(source='member.position', read_only=True)
+
+    class Meta:
+        model = MemberRank
+        fields = ['rank', 'member', 'name', 'position', 'member_score']
@@ -4,13 +4,26 @@ from django.contrib.auth.models import User
 import re
 
 
-class MemberSerializerAdmin(serializers.ModelSerializer):
+class ProjectedFieldsMixin(object):
+    """
+    Lets callers pass `fields=[...]` to render only a subset of the serializer's fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(ProjectedFieldsMixin, self).__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class MemberSerializerAdmin(ProjectedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Member
         # fields = '__all__'
         exclude = ('user',)
 
-    # TODO: Ensure this operation triggers a re-calculation of membership scores for this entry.
     def create(self, validated_data):
         if not validated_data['phone']:
             raise serializers.ValidationError(
@@ -50,8 +63,8 @@ class MemberSerializerAdmin(serializers.ModelSerializer):
 
         return member
 
-    # TODO: Ensure this triggers a re-calculation of membership scores for this entry.
-    # TODO: Determine when a global membership_score update should occur.
+    # Saving a member queues their score to be recalculated, through restapi.signals. Global recalculation is done
+    # by the recompute_member_scores command or POST member/scores/recompute.
     def update(self, member_acct, new_data):
         for field in new_data:
             setattr(member_acct, field, new_data[field])
@@ -97,7 +110,7 @@ class MemberSerializerAdmin(serializers.ModelSerializer):
 
 
 # TODO Determine how these are different.
-class MemberSerializerNonAdmin(serializers.ModelSerializer):
+class MemberSerializerNonAdmin(ProjectedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Member
         fields = ['name',
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
 from restapi.models.members import Member
+from restapi.models.sober_bros import SoberBro
+from restapi.models.sober_bro_shifts import SoberBroShift
 
 
 class UpcomingSoberBroSerializer(serializers.ModelSerializer):
@@ -8,3 +10,26 @@ class UpcomingSoberBroSerializer(serializers.ModelSerializer):
         model = Member
         fields = ['name', "phone"]
         depth = 1
+
+
+class UpcomingShiftBrotherSerializer(serializers.ModelSerializer):
+    """
+    A single roster entry for an upcoming shift, read through the already-joined member.
+    """
+    name = serializers.CharField(source='member.name', read_only=True)
+    phone = serializers.CharField(source='member.phone', read_only=True)
+
+    class Meta:
+        model = SoberBro
+        fields = ['name', 'phone']
+
+
+class UpcomingSoberBroShiftSerializer(serializers.ModelSerializer):
+    """
+    An upcoming shift along with its roster. Expects the roster to be prefetched through `soberbro_set`.
+    """
+    brothers = UpcomingShiftBrotherSerializer(source='soberbro_set', many=True, read_only=True)
+
+    class Meta:
+        model = SoberBroShift
+        fields = ['id', 'date', 'title', 'time_start', 'time_end', 'capacity', 'brothers']
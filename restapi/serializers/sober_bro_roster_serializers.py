@@ -0,0 +1,45 @@
+from rest_framework import serializers
+
+from restapi.models.members import Member
+from restapi.models.sober_bros import SoberBro
+from restapi.models.sober_bro_shifts import SoberBroShift
+
+
+class RosterShiftSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SoberBroShift
+        fields = ['id', 'title']
+
+
+class RosterMemberSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Member
+        fields = ['id', 'name']
+
+
+class SoberBroRosterSerializer(serializers.ModelSerializer):
+    """
+    A roster entry trimmed down to the shift's id and title and the member's id and name.
+    Pair it with `roster_columns` so only those columns are loaded in the first place.
+    """
+    shift = RosterShiftSerializer(read_only=True)
+    member = RosterMemberSerializer(read_only=True)
+
+    class Meta:
+        model = SoberBro
+        fields = ['shift', 'member']
+
+    @staticmethod
+    def roster_columns(queryset):
+        """
+        Restricts a SoberBro queryset to a single joined query over the columns this serializer reads.
+        """
+        return queryset.select_related('shift', 'member').only(
+            'id',
+            'shift',
+            'shift__id',
+            'shift__title',
+            'member',
+            'member__id',
+            'member__name'
+        )
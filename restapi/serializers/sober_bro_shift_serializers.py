@@ -158,3 +158,14 @@ class SoberBroShiftSerializer(serializers.ModelSerializer):
 
             data[field] = temp
         return data
+
+
+class SoberBroShiftListSerializer(serializers.ModelSerializer):
+    """
+    Read-only listing of shifts. Expects `filled` to be annotated onto the queryset.
+    """
+    filled = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = SoberBroShift
+        fields = ['id', 'date', 'title', 'time_start', 'time_end', 'capacity', 'filled']
@@ -0,0 +1,19 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from restapi.models.members import Member
+
+
+class MemberTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issues token pairs carrying the user's member id and whether they're staff. Access tokens made from the refresh
+    token carry them too.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        token['member_id'] = Member.objects.filter(user=user).values_list('id', flat=True).first()
+        token['is_staff'] = user.is_staff
+
+        return token
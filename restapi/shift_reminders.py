@@ -0,0 +1,124 @@
+import datetime
+import heapq
+import logging
+import threading
+
+from django.utils import timezone
+
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.slack_outbox import enqueue_slack_message
+from restapi.util.messaging.slack_block_builder import SlackBlockBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class ShiftReminderScheduler:
+    """
+    Sends a Slack reminder `lead` before each sober bro shift starts.
+
+    Upcoming shifts are kept in a min-heap keyed on when their reminder is due, and the scheduler sleeps until
+    either the top of the heap is due or it's time to look for changes. A reload only fetches the id and start of
+    the shifts inside the horizon, and diffs them against what's already scheduled. New and moved shifts are pushed
+    onto the heap, while entries for shifts that moved or were deleted are left in place and skipped when they
+    surface.
+
+    Everything works on absolute start times, so a shift starting just after midnight is reminded about the
+    evening before, like any other.
+
+    Reminders go through the Slack outbox with a dedupe key per shift and start time. Restarting the scheduler, or
+    running it twice, therefore never reminds about the same shift twice.
+    """
+
+    def __init__(self, channel, lead=datetime.timedelta(minutes=15), horizon=datetime.timedelta(hours=24),
+                 reload_interval=datetime.timedelta(minutes=1), dispatcher=None, builder=None):
+        self.channel = channel
+        self.lead = lead
+        self.horizon = horizon
+        self.reload_interval = reload_interval
+        self.dispatcher = dispatcher
+        self.builder = builder or SlackBlockBuilder()
+
+        self.heap = []
+        self.scheduled = {}
+        self.next_reload = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        """
+        Sends reminders as they come due until stop() is called.
+        """
+        while not self.stopped.is_set():
+            wake_at = self.tick()
+            delay = (wake_at - timezone.now()).total_seconds()
+            if delay > 0:
+                self.stopped.wait(delay)
+
+    def stop(self):
+        self.stopped.set()
+
+    def tick(self, now=None):
+        """
+        Reloads if one is due, then sends every reminder that's due. Returns when the scheduler next needs to wake.
+        """
+        now = now or timezone.now()
+
+        if self.next_reload is None or now >= self.next_reload:
+            self.reload(now)
+
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            remind_at, shift_id, time_start = heapq.heappop(self.heap)
+
+            # Skip entries for shifts that have since moved or been deleted, and shifts that already started.
+            if self.scheduled.get(shift_id) != time_start or time_start <= now:
+                continue
+
+            due.append((shift_id, time_start))
+
+        if due:
+            self.send(due)
+
+        wake_at = self.next_reload
+        if self.heap:
+            wake_at = min(wake_at, self.heap[0][0])
+        return wake_at
+
+    def reload(self, now):
+        upcoming = dict(SoberBroShift.objects.filter(
+            # The date filter is redundant with time_start, but it lets the query use the shift date index.
+            date__gte=(now - datetime.timedelta(days=1)).date(),
+            date__lte=(now + self.horizon + datetime.timedelta(days=1)).date(),
+            time_start__gt=now,
+            time_start__lte=now + self.horizon
+        ).values_list('id', 'time_start'))
+
+        for shift_id, time_start in upcoming.items():
+            if self.scheduled.get(shift_id) != time_start:
+                heapq.heappush(self.heap, (time_start - self.lead, shift_id, time_start))
+
+        self.scheduled = upcoming
+        self.next_reload = now + self.reload_interval
+
+        # Entries for shifts that are gone pile up until they surface, so the heap is rebuilt once they dominate.
+        if len(self.heap) > 2 * len(self.scheduled) + 64:
+            self.heap = [(start - self.lead, shift_id, start) for shift_id, start in self.scheduled.items()]
+            heapq.heapify(self.heap)
+
+    def send(self, due):
+        payloads = self.builder.render_many('shift_reminder', [shift_id for shift_id, time_start in due])
+
+        for (shift_id, time_start), payload in zip(due, payloads):
+            if payload is None:
+                continue
+
+            enqueue_slack_message(
+                self.channel,
+                payload['text'],
+                blocks=payload['blocks'],
+                dedupe_key="shift-reminder:" + str(shift_id) + ":" + time_start.isoformat()
+            )
+
+        logger.info(f"Queued reminders for {len(due)} shifts")
+
+        if self.dispatcher is not None:
+            self.dispatcher.run()
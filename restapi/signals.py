@@ -0,0 +1,148 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_api_key.models import APIKey
+
+from restapi.api_keys import api_key_verifier
+from restapi.authentication import user_cache
+
+from restapi.member_scores import members_for_guests, queue_score_updates
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.members import Member
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+from restapi.response_cache import invalidate_responses
+from restapi.search import rebuild_search_tokens, token_index_enabled
+from restapi.util.messaging.slack_block_builder import SlackBlockBuilder
+
+
+@receiver(post_save, sender=Member)
+def refresh_member_search_tokens(sender, instance, raw=False, using='default', **kwargs):
+    """
+    Keeps a member's search tokens in step with their record. Deletes cascade to the tokens on their own.
+    """
+    if raw or not token_index_enabled(using):
+        return
+
+    rebuild_search_tokens([instance], using=using)
+
+
+@receiver(post_save, sender=SoberBro)
+@receiver(post_delete, sender=SoberBro)
+def invalidate_roster_blocks(sender, instance, using='default', **kwargs):
+    """
+    Drops the cached Slack payloads for a shift whenever someone joins or leaves its roster.
+    """
+    SlackBlockBuilder.invalidate([instance.shift_id], using=using)
+
+
+@receiver(post_save, sender=SoberBroShift)
+def invalidate_shift_blocks(sender, instance, using='default', **kwargs):
+    SlackBlockBuilder.invalidate([instance.id], using=using)
+
+
+@receiver(post_delete, sender=SoberBroShift)
+def forget_shift_blocks(sender, instance, using='default', **kwargs):
+    """
+    A deleted shift's payloads are never rendered again, so its version counter goes too.
+    """
+    SlackBlockBuilder.forget([instance.id], using=using)
+
+
+@receiver(post_save, sender=Member)
+def invalidate_member_shift_blocks(sender, instance, raw=False, using='default', **kwargs):
+    """
+    Roster payloads show members' names and phone numbers, so they're dropped for every shift the member is on.
+    """
+    if raw or kwargs.get('created'):
+        return
+
+    SlackBlockBuilder.invalidate(
+        SoberBro.objects.using(using).filter(member=instance).values_list('shift_id', flat=True),
+        using=using
+    )
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=SoberBroShift)
+@receiver(post_delete, sender=SoberBroShift)
+@receiver(post_save, sender=SoberBro)
+@receiver(post_delete, sender=SoberBro)
+def invalidate_cached_responses(sender, using='default', **kwargs):
+    """
+    Drops the cached API responses built from the model once the write commits.
+    """
+    invalidate_responses(sender, using=using)
+
+
+# Member score inputs. Bulk writes don't send signals, so CheckInSync and AttendanceBuffer queue their own updates.
+score_fields = {'present', 'inactive_flag', 'phone'}
+
+
+@receiver(post_save, sender=SoberBro)
+@receiver(post_delete, sender=SoberBro)
+def queue_sober_bro_score_update(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    queue_score_updates([instance.member_id])
+
+
+@receiver(post_save, sender=EventAttendance)
+@receiver(post_delete, sender=EventAttendance)
+def queue_attendance_score_update(sender, instance, raw=False, **kwargs):
+    """
+    Event check-ins count towards the score of the member with the guest's phone number, if there is one.
+    """
+    if raw or kwargs.get('created') is False:
+        return
+
+    queue_score_updates(members_for_guests([instance.guest_id]))
+
+
+@receiver(post_save, sender=Member)
+def queue_member_score_update(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    if raw:
+        return
+
+    if created or update_fields is None or score_fields & set(update_fields):
+        queue_score_updates([instance.id])
+
+
+@receiver(post_delete, sender=Member)
+def queue_deleted_member_score_update(sender, instance, **kwargs):
+    """
+    A deleted member may have set the scale everyone else is scored against.
+    """
+    queue_score_updates([instance.id])
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def forget_api_key(sender, instance, **kwargs):
+    """
+    A revoked, expired or deleted key stops working at once, rather than when its cached verification runs out. It's
+    forgotten again when the change commits, in case a request checked it against the database in between.
+    """
+    api_key_verifier.forget(instance.id)
+    transaction.on_commit(lambda: api_key_verifier.forget(instance.id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """
+    A changed or deleted user is loaded again on their next request. Like API keys, they're forgotten again when the
+    change commits.
+    """
+    user_cache.forget(instance.id)
+    transaction.on_commit(lambda: user_cache.forget(instance.id))
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def forget_cached_member(sender, instance, **kwargs):
+    user_cache.forget(instance.user_id)
+    transaction.on_commit(lambda: user_cache.forget(instance.user_id))
@@ -0,0 +1,175 @@
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.db import connection, transaction
+from django.utils import timezone
+
+from restapi.models.slack_messages import SlackMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_slack_message(channel, text, blocks=None, dedupe_key=None, send_at=None):
+    """
+    Queues a Slack message for the dispatcher. Call it inside the transaction that makes the change being announced,
+    so the message is only ever sent if that change commits. A message with the dedupe_key of one already queued
+    isn't queued again; the existing one is returned instead.
+    """
+    fields = {
+        'channel': channel,
+        'text': text,
+        'blocks': blocks,
+        'next_attempt_at': send_at or timezone.now(),
+    }
+
+    if dedupe_key is None:
+        return SlackMessage.objects.create(**fields)
+
+    message, created = SlackMessage.objects.get_or_create(dedupe_key=dedupe_key, defaults=fields)
+    return message
+
+
+def enqueue_slack_messages(messages):
+    """
+    Queues several Slack messages with one insert. Each message is a dict of enqueue_slack_message's arguments. As
+    there, call it inside the transaction making the change, and a message with the dedupe_key of one already queued
+    isn't queued again.
+    """
+    now = timezone.now()
+
+    SlackMessage.objects.bulk_create([
+        SlackMessage(
+            channel=message['channel'],
+            text=message['text'],
+            blocks=message.get('blocks'),
+            dedupe_key=message.get('dedupe_key'),
+            next_attempt_at=message.get('send_at') or now
+        ) for message in messages
+    ], ignore_conflicts=True)
+
+
+class SlackOutboxDispatcher:
+    """
+    Sends queued Slack messages in batches.
+
+    A batch is claimed by marking its rows as sending, with a lease that expires after claim_timeout, then sent
+    concurrently through the client's pooled session. By default the lease outlasts one attempt at a message, and
+    it's renewed for the rows still in flight every third of claim_timeout, so a message the client is still
+    retrying isn't reclaimed. Sent rows are marked sent. Failed rows go back to pending with an exponential delay,
+    until max_attempts is reached and they're marked failed. If a dispatcher dies mid-batch, its rows are picked up
+    again once the lease runs out, within a couple of minutes. Where the database supports SKIP LOCKED,
+    several dispatchers can drain the outbox at once without claiming the same rows.
+    """
+
+    def __init__(self, client, batch_size=100, concurrency=8, max_attempts=5,
+                 retry_delay=datetime.timedelta(seconds=30), max_retry_delay=datetime.timedelta(hours=1),
+                 claim_timeout=None):
+        self.client = client
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.claim_timeout = claim_timeout or self.default_claim_timeout()
+
+    def default_claim_timeout(self):
+        return datetime.timedelta(seconds=self.client.max_attempt_time()) + datetime.timedelta(minutes=1)
+
+    def run(self):
+        """
+        Sends everything that's due, a batch at a time. Returns counts of the messages sent, rescheduled and
+        given up on.
+        """
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+
+        batch = self.claim_batch()
+        while batch:
+            for outcome, count in self.dispatch(batch).items():
+                totals[outcome] += count
+            batch = self.claim_batch()
+
+        return totals
+
+    def claim_batch(self):
+        now = timezone.now()
+
+        with transaction.atomic():
+            due = SlackMessage.objects.filter(
+                status__in=[SlackMessage.PENDING, SlackMessage.SENDING],
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id')
+
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+
+            batch = list(due[:self.batch_size])
+            SlackMessage.objects.filter(id__in=[message.id for message in batch]).update(
+                status=SlackMessage.SENDING,
+                next_attempt_at=now + self.claim_timeout
+            )
+
+        return batch
+
+    def dispatch(self, batch):
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batch))) as pool:
+            futures = [pool.submit(self.deliver, message) for message in batch]
+
+            in_flight = set(futures)
+            while in_flight:
+                done, in_flight = wait(in_flight, timeout=self.claim_timeout.total_seconds() / 3)
+                if in_flight:
+                    self.renew_claim([message for message, future in zip(batch, futures) if future in in_flight])
+
+            results = [future.result() for future in futures]
+
+        now = timezone.now()
+        counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+
+        for message, error in zip(batch, results):
+            message.attempts += 1
+
+            if error is None:
+                message.status = SlackMessage.SENT
+                message.sent_at = now
+                message.last_error = ''
+                counts['sent'] += 1
+            elif message.attempts >= self.max_attempts:
+                message.status = SlackMessage.FAILED
+                message.last_error = error
+                counts['failed'] += 1
+                logger.error(f"Giving up on Slack message {message.id} after {message.attempts} attempts: {error}")
+            else:
+                message.status = SlackMessage.PENDING
+                message.next_attempt_at = now + min(self.retry_delay * 2 ** (message.attempts - 1),
+                                                    self.max_retry_delay)
+                message.last_error = error
+                counts['retrying'] += 1
+
+        SlackMessage.objects.bulk_update(batch, ['status', 'attempts', 'sent_at', 'next_attempt_at', 'last_error'])
+        return counts
+
+    def renew_claim(self, messages):
+        """
+        Extends the lease on messages that are still being sent.
+        """
+        SlackMessage.objects.filter(id__in=[message.id for message in messages], status=SlackMessage.SENDING).update(
+            next_attempt_at=timezone.now() + self.claim_timeout
+        )
+
+    def deliver(self, message):
+        """
+        Sends one message. Returns None if Slack accepted it, otherwise why it didn't.
+        """
+        try:
+            is_ok, response = self.client.send_message(message.text, message.channel, message.blocks)
+        except requests.RequestException as e:
+            return "Unable to reach Slack: " + str(e)
+
+        if is_ok and (not isinstance(response, dict) or response.get('ok', True)):
+            return None
+
+        if isinstance(response, dict) and response.get('error'):
+            return "Slack rejected the message: " + str(response['error'])
+        return "Slack rejected the message."
@@ -0,0 +1,158 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.db import OperationalError
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_api_key.models import APIKey
+
+from restapi.api_keys import APIKeyUsageBuffer, APIKeyVerifier, api_key_usage, api_key_verifier
+from restapi.models.api_key_usages import APIKeyUsage
+
+NEXT_SHIFT_URL = '/api/v1/next-sb-shift/'
+
+
+def api_key_client(key):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Api-Key " + key)
+    return client
+
+
+class CachedAPIKeyTests(APITestCase):
+    def setUp(self):
+        api_key_verifier.clear()
+        api_key_usage.pending.clear()
+
+        # Usage is flushed by hand here, rather than from the buffer's timer thread.
+        patcher = mock.patch.object(api_key_usage, 'start_timer')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.api_key, self.key = APIKey.objects.create_key(name="Testing key")
+        self.client = api_key_client(self.key)
+
+    def test_key_is_hashed_once(self):
+        with mock.patch('rest_framework_api_key.crypto.check_password', wraps=check_password) as checked:
+            for x in range(0, 3):
+                self.assertEqual(self.client.get(NEXT_SHIFT_URL).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(checked.call_count, 1)
+
+    def test_invalid_keys(self):
+        prefix = self.key.partition('.')[0]
+
+        self.assertEqual(api_key_client(prefix + '.wrong').get(NEXT_SHIFT_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(APIClient().get(NEXT_SHIFT_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_key_stops_working_at_once(self):
+        self.assertEqual(self.client.get(NEXT_SHIFT_URL).status_code, status.HTTP_200_OK)
+
+        self.api_key.revoked = True
+        self.api_key.save()
+
+        self.assertEqual(self.client.get(NEXT_SHIFT_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_key_stops_working_at_once(self):
+        self.client.get(NEXT_SHIFT_URL)
+        self.api_key.delete()
+
+        self.assertEqual(self.client.get(NEXT_SHIFT_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_key_stops_working(self):
+        verifier = APIKeyVerifier()
+        self.api_key.expiry_date = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+        self.api_key.save()
+        self.assertEqual(verifier.verify(self.key), self.api_key.id)
+
+        # Expired without being saved again, so only the remembered expiry date can catch it.
+        later = self.api_key.expiry_date + datetime.timedelta(seconds=1)
+        with mock.patch('restapi.api_keys.timezone.now', return_value=later):
+            with mock.patch.object(APIKey, '_has_expired', return_value=True):
+                self.assertIsNone(verifier.verify(self.key))
+
+    def test_verifications_run_out(self):
+        verifier = APIKeyVerifier(ttl=datetime.timedelta(0))
+        verifier.verify(self.key)
+
+        with mock.patch('rest_framework_api_key.crypto.check_password', wraps=check_password) as checked:
+            verifier.verify(self.key)
+        self.assertEqual(checked.call_count, 1)
+
+    def test_least_recently_used_keys_are_dropped(self):
+        verifier = APIKeyVerifier(max_size=2)
+        keys = [self.key] + [APIKey.objects.create_key(name="Key " + str(x))[1] for x in range(0, 2)]
+
+        for key in keys:
+            verifier.verify(key)
+
+        self.assertEqual(len(verifier.entries), 2)
+        with mock.patch('rest_framework_api_key.crypto.check_password', wraps=check_password) as checked:
+            verifier.verify(keys[2])
+            verifier.verify(keys[0])
+        self.assertEqual(checked.call_count, 1)
+
+    def test_key_forgotten_while_checking_is_not_remembered(self):
+        verifier = APIKeyVerifier()
+        get_from_key = APIKey.objects.get_from_key
+
+        def revoked_during_check(key):
+            api_key = get_from_key(key)
+            verifier.forget(api_key.id)
+            return api_key
+
+        with mock.patch.object(APIKey.objects, 'get_from_key', side_effect=revoked_during_check):
+            verifier.verify(self.key)
+
+        self.assertEqual(len(verifier.entries), 0)
+
+    def test_usage_is_counted_in_batches(self):
+        for x in range(0, 3):
+            self.client.get(NEXT_SHIFT_URL)
+
+        self.assertFalse(APIKeyUsage.objects.exists())
+        self.assertEqual(api_key_usage.flush(), 3)
+
+        for x in range(0, 2):
+            self.client.get(NEXT_SHIFT_URL)
+        api_key_usage.flush()
+
+        usage = APIKeyUsage.objects.get(api_key=self.api_key)
+        self.assertEqual(usage.request_count, 5)
+        self.assertIsNotNone(usage.last_used_at)
+
+    def test_full_batch_is_flushed(self):
+        buffer = APIKeyUsageBuffer(max_batch=2)
+
+        with mock.patch.object(buffer, 'start_timer'):
+            buffer.add(self.api_key.id)
+            buffer.add(self.api_key.id)
+
+        self.assertEqual(APIKeyUsage.objects.get(api_key=self.api_key).request_count, 2)
+
+    def test_failed_batch_is_queued_again(self):
+        buffer = APIKeyUsageBuffer()
+
+        with mock.patch.object(buffer, 'start_timer'):
+            buffer.add(self.api_key.id)
+            buffer.add(self.api_key.id)
+
+            with mock.patch.object(APIKeyUsage.objects, 'bulk_create', side_effect=OperationalError), \
+                    self.assertLogs('restapi.batching', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+
+            buffer.add(self.api_key.id)
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(APIKeyUsage.objects.get(api_key=self.api_key).request_count, 3)
+
+    def test_usage_for_deleted_keys_is_dropped(self):
+        buffer = APIKeyUsageBuffer()
+
+        with mock.patch.object(buffer, 'start_timer'):
+            buffer.add(self.api_key.id)
+        self.api_key.delete()
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertFalse(APIKeyUsage.objects.exists())
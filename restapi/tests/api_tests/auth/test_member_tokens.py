@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from restapi.authentication import user_cache
+from restapi.tests.testing_utilities import *
+
+
+def bearer_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(token))
+    return client
+
+
+class MemberTokenTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+
+        self.member = generate_fake_new_user()
+        self.other = generate_fake_new_user()
+        self.shift = create_sober_shift()
+
+        self.tokens = get_tokens(self.member.name, 'fake_password')
+        self.client = bearer_client(self.tokens['access'])
+
+    def brothers_url(self):
+        return '/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/'
+
+    def test_tokens_carry_member_claims(self):
+        access = AccessToken(self.tokens['access'])
+        self.assertEqual(access['member_id'], self.member.id)
+        self.assertFalse(access['is_staff'])
+
+        response = APIClient().post('/api/token/refresh/', {'refresh': self.tokens['refresh']}, format='json')
+        refreshed = AccessToken(get_response_content(response)['access'])
+        self.assertEqual(refreshed['member_id'], self.member.id)
+
+    def test_user_is_loaded_once(self):
+        self.client.get('/api/v1/member/' + str(self.member.id) + '/')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/member/' + str(self.member.id) + '/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('auth_user' in query['sql'] for query in queries.captured_queries))
+
+    def test_sign_up_uses_the_requesting_member(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.brothers_url(), {'member': self.member.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(any('WHERE "restapi_member"."email"' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.post(self.brothers_url(), {'member': self.other.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_without_a_member(self):
+        User.objects.create_user('no-member', 'no-member@example.com', 'fake_password')
+        client = bearer_client(get_tokens('no-member', 'fake_password')['access'])
+
+        self.assertIsNone(AccessToken(get_tokens('no-member', 'fake_password')['access'])['member_id'])
+        self.assertEqual(client.post(self.brothers_url(), {'member': self.member.id}, format='json').status_code,
+                         status.HTTP_403_FORBIDDEN)
+        self.assertEqual(client.get('/api/v1/leaderboard/me/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_role_change_retires_old_tokens(self):
+        self.assertEqual(self.client.get('/api/v1/member/').status_code, status.HTTP_200_OK)
+
+        self.member.user.is_staff = True
+        self.member.user.save()
+
+        response = self.client.get('/api/v1/member/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(get_response_content(response)['code'], 'token_out_of_date')
+
+        client = bearer_client(get_tokens(self.member.name, 'fake_password')['access'])
+        self.assertEqual(client.get('/api/v1/member/').status_code, status.HTTP_200_OK)
+
+    def test_tokens_without_claims_are_accepted(self):
+        client = bearer_client(RefreshToken.for_user(self.member.user).access_token)
+        self.assertEqual(client.get('/api/v1/member/').status_code, status.HTTP_200_OK)
+
+    def test_deactivated_and_deleted_users(self):
+        self.client.get('/api/v1/member/')
+
+        self.member.user.is_active = False
+        self.member.user.save()
+        self.assertEqual(self.client.get('/api/v1/member/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        User.objects.filter(id=self.member.user.id).delete()
+        self.assertEqual(self.client.get('/api/v1/member/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_requests_get_their_own_copies(self):
+        first_user, first_member = user_cache.get(self.member.user.id)
+        first_member.name = 'Changed in one request'
+
+        second_user, second_member = user_cache.get(self.member.user.id)
+        self.assertEqual(second_member.name, self.member.name)
+        self.assertIsNot(second_user, first_user)
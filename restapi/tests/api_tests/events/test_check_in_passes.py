@@ -0,0 +1,216 @@
+import time
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from restapi.check_in import CheckInError
+from restapi.check_in_passes import AttendanceBuffer, CheckInPassSigner, attendance_buffer
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+
+
+def pass_url(event, guest):
+    return '/api/v1/event/' + str(event.id) + '/pass/?guest=' + str(guest.id)
+
+
+def scan_url(event):
+    return '/api/v1/event/' + str(event.id) + '/scan/'
+
+
+class CheckInPassSignerTests(APITestCase):
+    def setUp(self):
+        self.signer = CheckInPassSigner()
+        self.expires_at = time.time() + 3600
+
+    def test_round_trip(self):
+        token = self.signer.sign(12, 34, self.expires_at)
+        self.assertEqual(self.signer.verify(token), (12, 34))
+
+    def test_tampered_pass(self):
+        token = self.signer.sign(12, 34, self.expires_at)
+
+        for tampered in [token.replace('.34.', '.35.'), token[:-2], token + 'A', 'p2' + token[2:], 'garbage']:
+            with self.assertRaises(CheckInError) as raised:
+                self.signer.verify(tampered)
+            self.assertEqual(raised.exception.field, 'pass')
+
+    def test_other_secret(self):
+        token = CheckInPassSigner(secret='some other secret').sign(12, 34, self.expires_at)
+
+        with self.assertRaises(CheckInError):
+            self.signer.verify(token)
+
+    def test_expired_pass(self):
+        token = self.signer.sign(12, 34, self.expires_at)
+
+        with self.assertRaises(CheckInError):
+            self.signer.verify(token, now=self.expires_at + 1)
+
+
+class CheckInPassTests(APITestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.guest = Guest.objects.create(phone='3035550142', name='Jamie Guest')
+        self.member = generate_fake_new_user()
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+        attendance_buffer.pending.clear()
+        attendance_buffer.written.clear()
+
+        # Batches are flushed by hand here, rather than from the buffer's timer thread.
+        patcher = mock.patch.object(attendance_buffer, 'start_timer')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def issue_pass(self, event=None, guest=None):
+        response = self.client.get(pass_url(event or self.event, guest or self.guest), format='json')
+        return get_response_content(response)['pass']
+
+    def scan(self, token, event=None):
+        return self.client.post(scan_url(event or self.event), data={'pass': token}, format='json')
+
+    def test_issue_pass(self):
+        response = self.client.get(pass_url(self.event, self.guest), format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CheckInPassSigner().verify(content['pass']), (self.event.id, self.guest.id))
+        self.assertTrue(content['qr_code'].startswith('<?xml'))
+
+    def test_issue_pass_for_missing_guest(self):
+        self.guest.id = 999999
+        response = self.client.get(pass_url(self.event, self.guest), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_scan_is_written_in_a_batch(self):
+        other = Guest.objects.create(phone='3035550143', name='Other Guest')
+
+        self.assertEqual(self.scan(self.issue_pass()).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.scan(self.issue_pass(guest=other)).status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(EventAttendance.objects.count(), 0)
+
+        self.assertEqual(attendance_buffer.flush(), 2)
+        self.assertEqual(EventAttendance.objects.filter(event=self.event).count(), 2)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 2)
+
+    def test_scan_does_not_touch_the_database(self):
+        token = self.issue_pass()
+
+        client = APIClient()
+        client.force_authenticate(user=self.member.user)
+
+        with self.assertNumQueries(0):
+            response = client.post(scan_url(self.event), data={'pass': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_second_scan_is_reported(self):
+        token = self.issue_pass()
+
+        self.assertFalse(get_response_content(self.scan(token))['already_checked_in'])
+        self.assertTrue(get_response_content(self.scan(token))['already_checked_in'])
+
+        attendance_buffer.flush()
+        self.assertTrue(get_response_content(self.scan(token))['already_checked_in'])
+        self.assertEqual(EventAttendance.objects.count(), 1)
+
+    def test_guest_checked_in_at_the_door_is_not_duplicated(self):
+        EventAttendance.objects.create(event=self.event, guest=self.guest, arrival_time=self.event.time_start)
+
+        self.scan(self.issue_pass())
+        attendance_buffer.flush()
+
+        self.assertEqual(EventAttendance.objects.count(), 1)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 1)
+
+    def test_tampered_pass_is_rejected(self):
+        token = self.issue_pass().replace('.' + str(self.guest.id) + '.', '.' + str(self.guest.id + 1) + '.')
+        response = self.scan(token)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('pass' in get_response_content(response))
+        self.assertEqual(len(attendance_buffer.pending), 0)
+
+    def test_pass_for_another_event_is_rejected(self):
+        other_event = create_event(hours_from_now=24)
+        response = self.scan(self.issue_pass(), event=other_event)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unauthed_scan(self):
+        response = APIClient().post(scan_url(self.event), data={'pass': self.issue_pass()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AttendanceBufferTests(APITestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.guests = [Guest.objects.create(phone='30355501' + str(x).zfill(2), name='Guest ' + str(x))
+                       for x in range(0, 5)]
+
+    def test_full_batch_flushes(self):
+        buffer = AttendanceBuffer(max_batch=3)
+
+        with mock.patch.object(buffer, 'start_timer'):
+            for guest in self.guests:
+                buffer.add(self.event.id, guest.id, self.event.time_start)
+
+        self.assertEqual(EventAttendance.objects.count(), 3)
+        self.assertEqual(len(buffer.pending), 2)
+
+    def test_remembers_a_bounded_number_of_check_ins(self):
+        buffer = AttendanceBuffer(remembered=2)
+
+        with mock.patch.object(buffer, 'start_timer'):
+            for guest in self.guests:
+                buffer.add(self.event.id, guest.id, self.event.time_start)
+            buffer.flush()
+
+        self.assertEqual(list(buffer.written), [(self.event.id, guest.id) for guest in self.guests[3:]])
+
+
+# Foreign keys are checked as the batch's transaction commits, so these run outside a test transaction.
+class AttendanceBufferFailureTests(TransactionTestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.guests = [Guest.objects.create(phone='30355501' + str(x).zfill(2), name='Guest ' + str(x))
+                       for x in range(0, 5)]
+        self.buffer = AttendanceBuffer()
+
+        patcher = mock.patch.object(self.buffer, 'start_timer')
+        self.start_timer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rejected_check_in_is_dropped_and_the_rest_written(self):
+        for guest in self.guests:
+            self.buffer.add(self.event.id, guest.id, self.event.time_start)
+        deleted = self.guests[2].id
+        Guest.objects.filter(id=deleted).delete()
+
+        with self.assertLogs('restapi.check_in_passes', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 4)
+
+        self.assertEqual(set(EventAttendance.objects.values_list('guest_id', flat=True)),
+                         {guest.id for guest in self.guests} - {deleted})
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 4)
+        self.assertEqual(self.buffer.pending, {})
+
+    def test_batch_is_queued_again_when_the_database_is_unavailable(self):
+        for guest in self.guests:
+            self.buffer.add(self.event.id, guest.id, self.event.time_start)
+        self.start_timer.reset_mock()
+
+        with mock.patch.object(EventAttendance.objects, 'bulk_create', side_effect=OperationalError), \
+                self.assertLogs('restapi.check_in_passes', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+
+        self.assertEqual(len(self.buffer.pending), 5)
+        self.start_timer.assert_called_once()
+
+        self.assertEqual(self.buffer.flush(), 5)
+        self.assertEqual(EventAttendance.objects.count(), 5)
@@ -0,0 +1,172 @@
+import datetime
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.check_in import CheckInSync
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+
+
+def sync_url(event):
+    return '/api/v1/event/' + str(event.id) + '/check-in/sync/'
+
+
+class CheckInSyncTests(APITestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.start = self.event.time_start
+        self.member = generate_fake_new_user()
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+    def record(self, number, minutes=0, **overrides):
+        record = {
+            'idempotency_key': 'door-1-' + str(number),
+            'phone': '303555' + str(1000 + number),
+            'name': 'Guest ' + str(number),
+            'arrival_time': (self.start + datetime.timedelta(minutes=minutes)).isoformat(),
+        }
+        record.update(overrides)
+        return record
+
+    def sync(self, records, event=None):
+        return self.client.post(sync_url(event or self.event), data={'records': records}, format='json')
+
+    def test_sync_creates_guests_and_attendance(self):
+        response = self.sync([self.record(x, minutes=x) for x in range(0, 5)])
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in content['results']], ['created'] * 5)
+        self.assertEqual([result['index'] for result in content['results']], list(range(0, 5)))
+        self.assertEqual(content['guest_count'], 5)
+        self.assertEqual(Guest.objects.count(), 5)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 5)
+
+        attendance = EventAttendance.objects.get(id=content['results'][2]['attendance'])
+        self.assertEqual(attendance.guest.name, 'Guest 2')
+
+    def test_resync_is_idempotent(self):
+        records = [self.record(x) for x in range(0, 3)]
+        first = get_response_content(self.sync(records))
+        second = get_response_content(self.sync(records))
+
+        self.assertEqual([result['status'] for result in second['results']], ['duplicate'] * 3)
+        self.assertEqual([result['attendance'] for result in second['results']],
+                         [result['attendance'] for result in first['results']])
+        self.assertEqual(second['guest_count'], 3)
+        self.assertEqual(EventAttendance.objects.count(), 3)
+
+    def test_guest_already_checked_in_is_merged(self):
+        guest = Guest.objects.create(phone='3035551000', name='Guest 0')
+        EventAttendance.objects.create(event=self.event, guest=guest, arrival_time=self.start)
+        Event.objects.filter(id=self.event.id).update(guest_count=1)
+
+        response = self.sync([self.record(0, minutes=-10, help_flag=True)])
+        content = get_response_content(response)
+
+        self.assertEqual(content['results'][0]['status'], 'updated')
+        self.assertEqual(content['guest_count'], 1)
+
+        attendance = EventAttendance.objects.get()
+        self.assertEqual(attendance.arrival_time, self.start - datetime.timedelta(minutes=10))
+        self.assertTrue(attendance.help_flag)
+        self.assertIsNotNone(attendance.help_flag_raised_at)
+
+    def test_same_guest_twice_in_a_batch(self):
+        records = [self.record(0, minutes=5), self.record(0, minutes=1, idempotency_key='door-2-0')]
+        content = get_response_content(self.sync(records))
+
+        self.assertEqual([result['status'] for result in content['results']], ['created', 'updated'])
+        self.assertEqual(content['results'][0]['attendance'], content['results'][1]['attendance'])
+        self.assertEqual(EventAttendance.objects.get().arrival_time, self.start + datetime.timedelta(minutes=1))
+
+    def test_repeated_key_in_a_batch(self):
+        content = get_response_content(self.sync([self.record(0), self.record(0)]))
+
+        self.assertEqual([result['status'] for result in content['results']], ['created', 'duplicate'])
+        self.assertEqual(EventAttendance.objects.count(), 1)
+
+    def test_invalid_records_do_not_block_the_batch(self):
+        records = [
+            self.record(0),
+            self.record(1, phone='12'),
+            self.record(2, name=''),
+            self.record(3, arrival_time='not a time'),
+            'not a record',
+            self.record(5),
+        ]
+        content = get_response_content(self.sync(records))
+
+        self.assertEqual([result['status'] for result in content['results']],
+                         ['created', 'error', 'error', 'error', 'error', 'created'])
+        self.assertTrue('phone' in content['results'][1]['errors'])
+        self.assertTrue('name' in content['results'][2]['errors'])
+        self.assertTrue('arrival_time' in content['results'][3]['errors'])
+        self.assertEqual(content['guest_count'], 2)
+
+    def test_key_from_another_event(self):
+        self.sync([self.record(0)])
+        other_event = create_event(hours_from_now=24)
+
+        content = get_response_content(self.sync([self.record(0)], event=other_event))
+
+        self.assertEqual(content['results'][0]['status'], 'error')
+        self.assertTrue('idempotency_key' in content['results'][0]['errors'])
+
+    def test_key_taken_by_another_event_during_the_sync(self):
+        other_event = create_event(hours_from_now=24)
+        guest = Guest.objects.create(phone='3035559999', name='Other Guest')
+        EventAttendance.objects.create(event=other_event, guest=guest, arrival_time=other_event.time_start,
+                                       idempotency_key='door-1-0')
+
+        # As if the other event's check-in committed just after the keys were looked up.
+        def drop_nothing(sync, valid):
+            sync.repeats = []
+            return valid
+
+        with mock.patch.object(CheckInSync, 'drop_synced', drop_nothing):
+            response = self.sync([self.record(0), self.record(1)])
+
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in content['results']], ['error', 'created'])
+        self.assertTrue('idempotency_key' in content['results'][0]['errors'])
+        self.assertEqual(content['guest_count'], 1)
+
+    def test_sync_recounts_guest_count(self):
+        Event.objects.filter(id=self.event.id).update(guest_count=40)
+
+        content = get_response_content(self.sync([self.record(0)]))
+        self.assertEqual(content['guest_count'], 1)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # The requesting user is loaded once and remembered after that, so that's done up front.
+        self.sync([])
+
+        with CaptureQueriesContext(connection) as small:
+            self.sync([self.record(x) for x in range(0, 2)])
+
+        with CaptureQueriesContext(connection) as large:
+            self.sync([self.record(x) for x in range(100, 200)])
+
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_batch_limits(self):
+        response = self.sync([])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.sync([self.record(x) for x in range(0, 501)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_event(self):
+        self.event.id = 999999
+        response = self.sync([self.record(0)])
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,214 @@
+import threading
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from restapi.check_in import find_or_create_guest
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+
+
+def check_in_url(event):
+    return '/api/v1/event/' + str(event.id) + '/check-in/'
+
+
+class CheckInTests(APITestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.member = generate_fake_new_user()
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+    def check_in(self, event=None, **data):
+        return self.client.post(check_in_url(event or self.event), data=data, format='json')
+
+    def test_first_visit_creates_guest(self):
+        response = self.check_in(phone='(303) 555-0142', name='Jamie Guest')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content['guest']['name'], 'Jamie Guest')
+        self.assertEqual(content['guest']['phone'], '3035550142')
+        self.assertEqual(content['guest_count'], 1)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 1)
+
+    def test_returning_guest_found_by_phone(self):
+        self.check_in(phone='303.555.0142', name='Jamie Guest')
+        other_event = create_event(hours_from_now=24)
+
+        response = self.check_in(event=other_event, phone='303-555-0142')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Guest.objects.count(), 1)
+        self.assertEqual(list(Guest.objects.get().events.order_by('id')), [self.event, other_event])
+
+    def test_duplicate_check_in_is_rejected(self):
+        self.check_in(phone='3035550142', name='Jamie Guest')
+        response = self.check_in(phone='3035550142')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('guest' in get_response_content(response))
+        self.assertEqual(EventAttendance.objects.count(), 1)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 1)
+
+    def test_guest_created_since_lookup_is_reused(self):
+        guest = Guest.objects.create(phone='3035550142', name='Jamie Guest')
+
+        # Another first visit creates the guest between this one's lookup and its insert.
+        with mock.patch.object(Guest.objects, 'filter', return_value=Guest.objects.none()):
+            found = find_or_create_guest('3035550142', 'Jamie Again')
+
+        self.assertEqual(found, guest)
+        self.assertEqual(Guest.objects.filter(phone='3035550142').count(), 1)
+
+    def test_new_guest_needs_name(self):
+        response = self.check_in(phone='3035550142')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('name' in get_response_content(response))
+        self.assertEqual(Guest.objects.count(), 0)
+
+    def test_invalid_phone(self):
+        response = self.check_in(phone='12', name='Jamie Guest')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('phone' in get_response_content(response))
+
+    def test_missing_event(self):
+        self.event.id = 999999
+        response = self.check_in(phone='3035550142', name='Jamie Guest')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_check_ins_in_arrival_order(self):
+        for x in range(0, 3):
+            self.check_in(phone='303555014' + str(x), name='Guest ' + str(x))
+
+        response = self.client.get(check_in_url(self.event), format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['guest']['name'] for row in content['results']], ['Guest 0', 'Guest 1', 'Guest 2'])
+
+    def test_check_in_is_constant_queries(self):
+        Guest.objects.create(phone='3035550142', name='Jamie Guest')
+
+        # Authentication, the event and guest lookups, then the attendance insert, the member lookup for score
+        # updates, increment and count read inside a savepoint.
+        with self.assertNumQueries(9):
+            response = self.check_in(phone='3035550142')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_unauthed_check_in(self):
+        response = APIClient().post(check_in_url(self.event), data={'phone': '3035550142'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class EventTests(APITestCase):
+    def event_data(self):
+        return {
+            'event_name': 'Spring Formal',
+            'location': 'The House',
+            'comments': 'Formal attire.',
+            'time_start': '2031-04-01T20:00:00-06:00',
+            'time_end': '2031-04-02T01:00:00-06:00',
+        }
+
+    def test_admin_creates_event(self):
+        staff = generate_fake_new_user(True)
+        client = get_authed_client(staff.name, 'fake_password')
+
+        response = client.post('/api/v1/event/', data=self.event_data(), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_response_content(response)['guest_count'], 0)
+
+    def test_event_must_end_after_start(self):
+        staff = generate_fake_new_user(True)
+        client = get_authed_client(staff.name, 'fake_password')
+
+        data = self.event_data()
+        data['time_end'] = data['time_start']
+        response = client.post('/api/v1/event/', data=data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_non_admin_cannot_create_event(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        response = client.post('/api/v1/event/', data=self.event_data(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_list_events(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+        create_event()
+        create_event(hours_from_now=48)
+
+        response = client.get('/api/v1/event/', format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(get_response_content(response)['results']), 2)
+
+
+# Concurrent increments only race on databases that actually run the transactions side by side.
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentCheckInTests(TransactionTestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.member = generate_fake_new_user()
+
+    def test_parallel_check_ins_keep_count(self):
+        guests = [Guest.objects.create(phone='30355501' + str(x).zfill(2), name='Guest ' + str(x))
+                  for x in range(0, 20)]
+        barrier = threading.Barrier(len(guests))
+
+        def arrive(guest):
+            client = APIClient()
+            client.force_authenticate(user=self.member.user)
+
+            try:
+                barrier.wait()
+                client.post(check_in_url(self.event), data={'phone': guest.phone}, format='json')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=arrive, args=(guest,)) for guest in guests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(EventAttendance.objects.filter(event=self.event).count(), 20)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 20)
+
+    def test_parallel_first_visits_share_a_guest(self):
+        barrier = threading.Barrier(10)
+        responses = []
+
+        def arrive():
+            client = APIClient()
+            client.force_authenticate(user=self.member.user)
+
+            try:
+                barrier.wait()
+                responses.append(client.post(check_in_url(self.event),
+                                             data={'phone': '3035550142', 'name': 'Jamie Guest'}, format='json'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=arrive) for x in range(0, 10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(response.status_code for response in responses),
+                         [status.HTTP_201_CREATED] + [status.HTTP_400_BAD_REQUEST] * 9)
+        self.assertEqual(Guest.objects.count(), 1)
+        self.assertEqual(Event.objects.get(id=self.event.id).guest_count, 1)
@@ -0,0 +1,431 @@
+import datetime
+import os
+import threading
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from restapi.help_flags import HelpFlagBroker, decode_cursor, help_flag_broker, load_alerts
+from restapi.views.event_views import EventViewSet
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+from restapi.models.slack_messages import SlackMessage
+from restapi.models.sober_bros import SoberBro
+
+
+def help_url(event):
+    return '/api/v1/event/' + str(event.id) + '/help/'
+
+
+class HelpFlagTests(APITestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.guest = Guest.objects.create(phone='3035550142', name='Jamie Guest')
+        self.attendance = EventAttendance.objects.create(
+            event=self.event,
+            guest=self.guest,
+            arrival_time=self.event.time_start
+        )
+        self.member = generate_fake_new_user()
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+        help_flag_broker.alerts.clear()
+        help_flag_broker.settled.clear()
+        help_flag_broker.trimmed.clear()
+        help_flag_broker.checked_at.clear()
+
+        environ = mock.patch.dict(os.environ, {'SLACK_SOBER_BRO_CHANNEL': '#sober-bros'})
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def raise_flag(self, **data):
+        data.setdefault('phone', self.guest.phone)
+        return self.client.post(help_url(self.event), data=data, format='json')
+
+    def poll(self, cursor=None, timeout=0):
+        params = {'timeout': timeout}
+        if cursor is not None:
+            params['cursor'] = cursor
+        return get_response_content(self.client.get(help_url(self.event), params))
+
+    def test_raise_flag(self):
+        response = self.raise_flag(note='Needs a ride home')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(get_response_content(response)['help_flag'])
+
+        attendance = EventAttendance.objects.get(id=self.attendance.id)
+        self.assertTrue(attendance.help_flag)
+        self.assertIsNotNone(attendance.help_flag_raised_at)
+
+        message = SlackMessage.objects.get()
+        self.assertEqual(message.channel, '#sober-bros')
+        self.assertIn('Jamie Guest', message.text)
+        self.assertIn('Needs a ride home', str(message.blocks))
+
+    def test_raise_flag_twice(self):
+        self.raise_flag()
+        response = self.raise_flag()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(SlackMessage.objects.count(), 1)
+
+    def test_on_duty_sober_bros_are_named(self):
+        shift = create_sober_shift()
+        shift.time_start = timezone.now() - datetime.timedelta(hours=1)
+        shift.time_end = timezone.now() + datetime.timedelta(hours=1)
+        shift.save()
+
+        later_shift = create_sober_shift()
+        SoberBro.objects.create(shift=shift, member=self.member)
+        SoberBro.objects.create(shift=later_shift, member=generate_fake_new_user())
+
+        self.raise_flag()
+
+        blocks = str(SlackMessage.objects.get().blocks)
+        self.assertIn('On duty: ' + self.member.name, blocks)
+
+    def test_synced_flag_alerts_on_duty(self):
+        record = {
+            'idempotency_key': 'door-1-0',
+            'phone': self.guest.phone,
+            'arrival_time': (timezone.now() - datetime.timedelta(minutes=10)).isoformat(),
+            'help_flag': True,
+        }
+        for x in range(0, 2):
+            response = self.client.post('/api/v1/event/' + str(self.event.id) + '/check-in/sync/',
+                                        data={'records': [record]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        message = SlackMessage.objects.get()
+        self.assertIn('Jamie Guest', message.text)
+
+        # Taken offline ten minutes ago, but raised as of the sync, so other processes' streams still catch it.
+        help_flag_broker.check(self.event.id)
+        self.assertEqual([alert['attendance'] for alert in help_flag_broker.since(self.event.id, None)],
+                         [self.attendance.id])
+
+    def test_synced_flags_are_announced_in_a_fixed_number_of_queries(self):
+        def sync(first, count):
+            records = [{
+                'idempotency_key': 'door-1-' + str(x),
+                'phone': '303555' + str(1000 + x),
+                'name': 'Guest ' + str(x),
+                'arrival_time': self.event.time_start.isoformat(),
+                'help_flag': True,
+            } for x in range(first, first + count)]
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/v1/event/' + str(self.event.id) + '/check-in/sync/',
+                                            data={'records': records}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        # The first request also loads the member who's making it.
+        sync(0, 1)
+
+        self.assertEqual(sync(1, 2), sync(3, 20))
+        self.assertEqual(SlackMessage.objects.count(), 23)
+
+    def test_guest_not_checked_in(self):
+        Guest.objects.create(phone='3035550143', name='Other Guest')
+        response = self.raise_flag(phone='3035550143')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue('guest' in get_response_content(response))
+
+    def test_missing_event(self):
+        self.event.id = 999999
+
+        self.assertEqual(self.raise_flag().status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(help_url(self.event)).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_poll_returns_raised_flags(self):
+        self.raise_flag()
+        content = self.poll()
+
+        self.assertEqual([alert['attendance'] for alert in content['alerts']], [self.attendance.id])
+        self.assertEqual(content['alerts'][0]['guest']['name'], 'Jamie Guest')
+        self.assertEqual(content['cursor'], content['alerts'][0]['cursor'])
+
+    def test_poll_pages_through_flags_raised_together(self):
+        # A sync raises every flag in it at the same moment.
+        raised_at = timezone.now()
+        for x in range(0, 5):
+            guest = Guest.objects.create(phone='303555' + str(1000 + x), name='Guest ' + str(x))
+            EventAttendance.objects.create(event=self.event, guest=guest, arrival_time=self.event.time_start,
+                                           help_flag=True, help_flag_raised_at=raised_at, help_flag_sequence=x + 1)
+
+        seen = []
+        cursor = None
+        for x in range(0, 3):
+            alerts = load_alerts(self.event.id, after=decode_cursor(cursor), limit=2)
+            seen.extend(alert['guest']['name'] for alert in alerts)
+            cursor = alerts[-1]['cursor'] if alerts else cursor
+
+        self.assertEqual(seen, ['Guest ' + str(x) for x in range(0, 5)])
+
+    def test_flags_are_numbered_in_order(self):
+        other = Guest.objects.create(phone='3035550143', name='Other Guest')
+        EventAttendance.objects.create(event=self.event, guest=other, arrival_time=self.event.time_start)
+
+        self.raise_flag()
+        self.raise_flag(phone=other.phone)
+
+        self.assertEqual([alert['cursor'] for alert in self.poll()['alerts']], ['1', '2'])
+        self.assertEqual(Event.objects.get(id=self.event.id).help_flag_sequence, 2)
+
+    def test_poll_times_out_empty(self):
+        self.raise_flag()
+        cursor = self.poll()['cursor']
+
+        content = self.poll(cursor=cursor, timeout=0.1)
+        self.assertEqual(content['alerts'], [])
+        self.assertEqual(content['cursor'], cursor)
+
+    def test_poll_wakes_on_publish(self):
+        self.raise_flag()
+        cursor = self.poll()['cursor']
+
+        other = Guest.objects.create(phone='3035550143', name='Other Guest')
+        EventAttendance.objects.create(event=self.event, guest=other, arrival_time=self.event.time_start)
+
+        # Another request raising a flag, which publishes once it commits.
+        def raise_other():
+            time.sleep(0.1)
+            help_flag_broker.publish(self.event.id, [{'cursor': str(int(cursor) + 1), 'attendance': 999}])
+
+        started = time.monotonic()
+        threading.Thread(target=raise_other).start()
+        content = self.poll(cursor=cursor, timeout=5)
+
+        self.assertEqual([alert['attendance'] for alert in content['alerts']], [999])
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_poll_falls_back_to_the_database(self):
+        self.raise_flag()
+        cursor = self.poll()['cursor']
+
+        # Raised by another process, so nothing is published here.
+        other = Guest.objects.create(phone='3035550143', name='Other Guest')
+        EventAttendance.objects.create(
+            event=self.event,
+            guest=other,
+            arrival_time=self.event.time_start,
+            help_flag=True,
+            help_flag_raised_at=timezone.now(),
+            help_flag_sequence=int(cursor) + 1
+        )
+        help_flag_broker.alerts.clear()
+        help_flag_broker.checked_at[self.event.id] = time.monotonic()
+
+        # Skip the up-front read, as if the flag were raised just after it, so only the fallback can find it.
+        reads = []
+
+        def load_after_first(*args, **kwargs):
+            reads.append(args)
+            return [] if len(reads) == 1 else load_alerts(*args, **kwargs)
+
+        started = time.monotonic()
+        with mock.patch('restapi.help_flags.load_alerts', side_effect=load_after_first):
+            content = self.poll(cursor=cursor, timeout=5)
+
+        self.assertEqual([alert['guest']['name'] for alert in content['alerts']], ['Other Guest'])
+        self.assertEqual(len(reads), 2)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_stream(self):
+        self.raise_flag()
+
+        response = self.client.get(help_url(self.event) + 'stream/', {'timeout': 0},
+                                   HTTP_ACCEPT='text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: help_flag', body)
+        self.assertIn('Jamie Guest', body)
+
+    def test_stream_resumes_from_last_event_id(self):
+        self.raise_flag()
+        cursor = self.poll()['cursor']
+
+        response = self.client.get(help_url(self.event) + 'stream/', {'timeout': 0},
+                                   HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=cursor)
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertNotIn('event: help_flag', body)
+        self.assertIn(': keep-alive', body)
+
+    def test_busy_poll_answers_straight_away(self):
+        self.raise_flag()
+        cursor = self.poll()['cursor']
+
+        started = time.monotonic()
+        with mock.patch.object(EventViewSet, 'waiting', threading.BoundedSemaphore(1)) as waiting:
+            waiting.acquire()
+            content = self.poll(cursor=cursor, timeout=5)
+
+        self.assertEqual(content['alerts'], [])
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_busy_stream_asks_the_client_to_reconnect(self):
+        self.raise_flag()
+
+        started = time.monotonic()
+        with mock.patch.object(EventViewSet, 'waiting', threading.BoundedSemaphore(1)) as waiting:
+            waiting.acquire()
+            response = self.client.get(help_url(self.event) + 'stream/', HTTP_ACCEPT='text/event-stream')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertTrue(body.startswith('retry: 5000\n\n'))
+        self.assertIn('Jamie Guest', body)
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_stream_gives_back_its_slot(self):
+        with mock.patch.object(EventViewSet, 'waiting', threading.BoundedSemaphore(1)) as waiting:
+            response = self.client.get(help_url(self.event) + 'stream/', {'timeout': 0},
+                                       HTTP_ACCEPT='text/event-stream')
+            body = b''.join(response.streaming_content).decode()
+
+            self.assertFalse(body.startswith('retry:'))
+            self.assertTrue(waiting.acquire(blocking=False))
+
+    def test_unauthed_poll(self):
+        response = APIClient().get(help_url(self.event))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# Flags are published as they commit, so this runs outside a test transaction.
+class HelpFlagPublishTests(APITransactionTestCase):
+    def setUp(self):
+        self.event = create_event()
+        self.guest = Guest.objects.create(phone='3035550142', name='Jamie Guest')
+        self.member = generate_fake_new_user()
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+        help_flag_broker.alerts.clear()
+        help_flag_broker.settled.clear()
+        help_flag_broker.trimmed.clear()
+
+        # Holds off the database fallback, so only a publish can wake a waiter.
+        help_flag_broker.checked_at[self.event.id] = time.monotonic() + 60
+        self.addCleanup(help_flag_broker.checked_at.clear)
+
+    def wait_while(self, raise_flags):
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(help_flag_broker.wait(self.event.id, None, 5)))
+        waiter.start()
+
+        time.sleep(0.1)
+        started = time.monotonic()
+        raise_flags()
+        waiter.join()
+
+        self.assertLess(time.monotonic() - started, 1)
+        return [alert['attendance'] for alert in results[0]]
+
+    def test_raised_flag_wakes_waiters(self):
+        attendance = EventAttendance.objects.create(
+            event=self.event,
+            guest=self.guest,
+            arrival_time=self.event.time_start
+        )
+
+        def raise_flag():
+            response = self.client.post(help_url(self.event), data={'phone': self.guest.phone}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.wait_while(raise_flag), [attendance.id])
+
+    def test_synced_flag_wakes_waiters(self):
+        record = {
+            'idempotency_key': 'door-1-0',
+            'phone': self.guest.phone,
+            'arrival_time': self.event.time_start.isoformat(),
+            'help_flag': True,
+        }
+
+        def sync():
+            response = self.client.post('/api/v1/event/' + str(self.event.id) + '/check-in/sync/',
+                                        data={'records': [record]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.wait_while(sync), [EventAttendance.objects.get(guest=self.guest).id])
+
+
+class HelpFlagBrokerTests(APITestCase):
+    def alert(self, attendance_id):
+        return {'cursor': str(attendance_id), 'attendance': attendance_id}
+
+    def test_publish_wakes_every_waiter(self):
+        broker = HelpFlagBroker(fallback_interval=60)
+        broker.checked_at[1] = time.monotonic()
+        results = []
+
+        def wait():
+            results.append(broker.wait(1, None, 5))
+
+        waiters = [threading.Thread(target=wait) for x in range(0, 5)]
+        for waiter in waiters:
+            waiter.start()
+
+        time.sleep(0.1)
+        broker.publish(1, [self.alert(1)])
+
+        for waiter in waiters:
+            waiter.join()
+        self.assertEqual(results, [[self.alert(1)]] * 5)
+
+    def test_fallback_checks_are_shared(self):
+        broker = HelpFlagBroker(fallback_interval=0.2)
+        checks = []
+
+        def check(event_id):
+            checks.append(event_id)
+            time.sleep(0.05)
+            with broker.condition:
+                broker.checked_at[event_id] = time.monotonic()
+                broker.checking.discard(event_id)
+
+        with mock.patch.object(broker, 'check', side_effect=check):
+            waiters = [threading.Thread(target=broker.wait, args=(1, None, 0.5)) for x in range(0, 10)]
+            for waiter in waiters:
+                waiter.start()
+            for waiter in waiters:
+                waiter.join()
+
+        # One check up front and one per interval after it, however many are waiting.
+        self.assertLessEqual(len(checks), 4)
+
+    def test_backlog_is_bounded(self):
+        broker = HelpFlagBroker(backlog=2)
+        broker.publish(1, [self.alert(x) for x in range(1, 6)])
+
+        self.assertEqual(broker.since(1, 3), [self.alert(4), self.alert(5)])
+        self.assertEqual(broker.since(1, 4), [self.alert(5)])
+        self.assertIsNone(broker.since(1, 1))
+
+    def test_waits_for_a_flag_still_committing(self):
+        broker = HelpFlagBroker()
+        broker.publish(1, [self.alert(1)], settled=1)
+
+        # Flag 3 committed in this process before flag 2, raised in another, has been read.
+        broker.publish(1, [self.alert(3)])
+        self.assertEqual(broker.since(1, 1), [])
+
+        broker.publish(1, [self.alert(2)], settled=2)
+        self.assertEqual(broker.since(1, 1), [self.alert(2), self.alert(3)])
+
+    def test_skips_numbers_the_database_has_read_past(self):
+        broker = HelpFlagBroker()
+        broker.publish(1, [self.alert(1), self.alert(3)], settled=3)
+
+        self.assertEqual(broker.since(1, None), [self.alert(1), self.alert(3)])
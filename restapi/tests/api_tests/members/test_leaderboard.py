@@ -0,0 +1,114 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from restapi.leaderboard import refresh_leaderboard
+from restapi.tests.testing_utilities import *
+from restapi.models.member_ranks import MemberRank
+from restapi.models.members import Member
+
+LEADERBOARD_URL = '/api/v1/leaderboard/'
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        self.members = [generate_fake_new_user() for x in range(0, 4)]
+        self.set_scores([90, 80, 80, 70])
+
+        self.client = get_authed_client(self.members[3].name, 'fake_password')
+
+    def set_scores(self, scores):
+        for member, score in zip(self.members, scores):
+            Member.objects.filter(id=member.id).update(member_score=score)
+        refresh_leaderboard()
+
+    def ranks(self):
+        return dict(MemberRank.objects.values_list('member_id', 'rank'))
+
+    def test_competition_ranking(self):
+        self.assertEqual([self.ranks()[member.id] for member in self.members], [1, 2, 2, 4])
+
+    def test_list_in_rank_order(self):
+        response = self.client.get(LEADERBOARD_URL, format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['rank'] for row in content['results']], [1, 2, 2, 4])
+        self.assertEqual(content['results'][0]['name'], self.members[0].name)
+
+    def test_scores_hidden_from_non_staff(self):
+        content = get_response_content(self.client.get(LEADERBOARD_URL, format='json'))
+        self.assertNotIn('member_score', content['results'][0])
+
+        content = get_response_content(self.client.get(LEADERBOARD_URL + 'me/', format='json'))
+        self.assertNotIn('member_score', content)
+
+    def test_staff_see_scores(self):
+        staff = generate_fake_new_user(True)
+        client = get_authed_client(staff.name, 'fake_password')
+
+        content = get_response_content(client.get(LEADERBOARD_URL, format='json'))
+        self.assertEqual(content['results'][0]['member_score'], 90)
+
+    def test_my_rank(self):
+        response = self.client.get(LEADERBOARD_URL + 'me/', format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['rank'], 4)
+        self.assertEqual(content['member'], self.members[3].id)
+
+    def test_my_rank_without_a_token(self):
+        client = APIClient()
+        client.force_authenticate(user=self.members[3].user)
+
+        response = client.get(LEADERBOARD_URL + 'me/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_response_content(response)['rank'], 4)
+
+    def test_unranked_member(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        response = client.get(LEADERBOARD_URL + 'me/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pages_read_the_rank_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(LEADERBOARD_URL, format='json')
+
+        page = [query['sql'] for query in queries.captured_queries if 'restapi_memberrank' in query['sql']]
+        self.assertEqual(len(page), 1)
+        self.assertIn('ORDER BY "restapi_memberrank"."rank" ASC', page[0])
+
+    def test_only_moved_ranks_are_written(self):
+        self.set_scores([90, 80, 80, 85])
+
+        self.assertEqual([self.ranks()[member.id] for member in self.members], [1, 3, 3, 2])
+
+        Member.objects.filter(id=self.members[0].id).update(member_score=91)
+        self.assertEqual(refresh_leaderboard(), {'created': 0, 'updated': 1, 'removed': 0})
+
+    def test_refresh_is_constant_queries(self):
+        for x in range(0, 20):
+            Member.objects.filter(id=generate_fake_new_user().id).update(member_score=x)
+        Member.objects.filter(id=self.members[0].id).update(inactive_flag=True)
+        Member.objects.filter(id=self.members[1].id).update(member_score=10.5)
+
+        # The leaderboard lock, the scores, then the stored ranks, one insert, one update and one delete inside a
+        # savepoint.
+        with self.assertNumQueries(8):
+            result = refresh_leaderboard()
+        self.assertEqual(result, {'created': 20, 'updated': 3, 'removed': 1})
+
+    def test_inactive_and_unscored_members_are_left_off(self):
+        Member.objects.filter(id=self.members[0].id).update(inactive_flag=True)
+        Member.objects.filter(id=self.members[1].id).update(member_score=-1)
+
+        self.assertEqual(refresh_leaderboard()['removed'], 2)
+        self.assertEqual(sorted(self.ranks().values()), [1, 2])
+
+    def test_unauthed_leaderboard(self):
+        response = APIClient().get(LEADERBOARD_URL, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,171 @@
+import csv
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.member_import import MemberImport
+from restapi.models.members import Member
+
+HEADER = ['name', 'first_name', 'last_name', 'legal_name', 'address', 'email', 'phone', 'rollnumber', 'position',
+          'inactive_flag', 'abroad_flag', 'present', 'password']
+
+
+def roster_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HEADER)
+    for row in rows:
+        writer.writerow(row)
+    return output.getvalue()
+
+
+def roster_row(number, **overrides):
+    row = {
+        'name': 'Pledge Number' + str(number),
+        'first_name': 'Pledge',
+        'last_name': 'Number' + str(number),
+        'legal_name': 'Pledge Number' + str(number),
+        'address': str(number) + ' Pledge Street',
+        'email': 'pledge' + str(number) + '@example.com',
+        'phone': '303.555.' + str(1000 + number),
+        'rollnumber': str(500 + number),
+        'position': '',
+        'inactive_flag': 'FALSE',
+        'abroad_flag': 'FALSE',
+        'present': '',
+        'password': '',
+    }
+    row.update(overrides)
+    return [row[column] for column in HEADER]
+
+
+class ApiTests(APITestCase):
+    def setUp(self):
+        self.staff = generate_fake_new_user(True)
+
+    def upload(self, client, content):
+        upload = io.BytesIO(content.encode())
+        upload.name = 'roster.csv'
+        return client.post('/api/v1/member/bulk/', data={'file': upload}, format='multipart')
+
+    def test_bulk_import(self):
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        content = roster_csv([
+            roster_row(1, password='pledgePassword1'),
+            roster_row(2, position='Rush Chair', abroad_flag='TRUE'),
+            roster_row(3),
+        ])
+        response = self.upload(client, content)
+        report = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(report['created'], 3)
+        self.assertEqual(report['errors'], [])
+
+        member = Member.objects.get(phone='303.555.1002')
+        self.assertEqual(member.position, 'Rush Chair')
+        self.assertTrue(member.abroad_flag)
+        self.assertTrue(member.temp_password)
+        self.assertEqual(member.member_score, -1)
+        self.assertEqual(member.user.username, 'pledge.number2')
+
+        # Rows with a password keep it, the rest get a generated one that's reported back.
+        self.assertTrue(User.objects.get(username='pledge.number1').check_password('pledgePassword1'))
+        self.assertEqual([credential['username'] for credential in report['credentials']],
+                         ['pledge.number2', 'pledge.number3'])
+        generated = report['credentials'][0]['password']
+        self.assertTrue(User.objects.get(username='pledge.number2').check_password(generated))
+
+    def test_bulk_import_reports_row_errors(self):
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        content = roster_csv([
+            roster_row(1),
+            roster_row(2, phone='3035551002'),
+            roster_row(3, email=self.staff.email),
+            roster_row(4, phone='303.555.1001'),
+            roster_row(5, inactive_flag='maybe'),
+            roster_row(6),
+        ])
+        response = self.upload(client, content)
+        report = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['row'] for error in sorted(report['errors'], key=lambda error: error['row'])],
+                         [3, 4, 5, 6])
+        self.assertEqual(Member.objects.filter(phone__startswith='303.555.').count(), 2)
+
+    def test_bulk_import_missing_columns(self):
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        response = self.upload(client, "name,email\nPledge One,pledge1@example.com\n")
+        report = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(report['created'], 0)
+        self.assertTrue('header' in report['errors'][0]['errors'])
+
+    def test_bulk_import_forbidden(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        response = self.upload(client, roster_csv([roster_row(1)]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Member.objects.filter(phone='303.555.1001').exists())
+
+    def test_bulk_import_across_chunks_and_pool(self):
+        """
+        Small chunks and a zero pool threshold push every chunk's passwords through the process pool.
+        """
+        content = roster_csv([roster_row(number) for number in range(1, 8)] + [roster_row(8, phone='303.555.1001')])
+
+        report = MemberImport(chunk_size=3, workers=2, pool_threshold=0, processes=True).run(io.StringIO(content))
+
+        self.assertEqual(report['created'], 7)
+        self.assertEqual([error['row'] for error in report['errors']], [9])
+        self.assertTrue(User.objects.get(username='pledge.number7').check_password(
+            [credential for credential in report['credentials']
+             if credential['username'] == 'pledge.number7'][0]['password']
+        ))
+
+    def test_upload_hashes_on_threads(self):
+        # Forking from a threaded web worker can deadlock the child, so an upload never starts a process pool.
+        content = roster_csv([roster_row(number) for number in range(1, 6)])
+
+        with mock.patch('restapi.member_import.ProcessPoolExecutor') as process_pool:
+            report = MemberImport(workers=2, pool_threshold=0).run(io.StringIO(content))
+
+        process_pool.assert_not_called()
+        self.assertEqual(report['created'], 5)
+        self.assertTrue(User.objects.get(username='pledge.number5').check_password(
+            [credential for credential in report['credentials']
+             if credential['username'] == 'pledge.number5'][0]['password']
+        ))
+
+    def test_import_members_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'roster.csv')
+            credentials_path = os.path.join(directory, 'credentials.csv')
+
+            with open(path, 'w') as roster:
+                roster.write(roster_csv([roster_row(1), roster_row(2)]))
+
+            output = io.StringIO()
+            call_command('import_members', path, credentials=credentials_path, stdout=output, stderr=io.StringIO())
+
+            with open(credentials_path) as credentials:
+                rows = list(csv.reader(credentials))
+
+        self.assertTrue('Imported 2 members' in output.getvalue())
+        self.assertEqual(rows[0], ['username', 'password'])
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(User.objects.get(username=rows[1][0]).check_password(rows[1][1]))
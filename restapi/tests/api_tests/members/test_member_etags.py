@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+
+MEMBER_URL = '/api/v1/member/'
+
+
+class MemberETagTests(APITestCase):
+    def setUp(self):
+        self.staff = generate_fake_new_user(True)
+        self.member = generate_fake_new_user()
+        self.url = MEMBER_URL + str(self.member.id) + '/'
+
+        self.staff_client = get_authed_client(self.staff.name, 'fake_password')
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+    def test_unchanged_member_is_not_modified(self):
+        etag = self.staff_client.get(self.url)['ETag']
+
+        response = self.staff_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        weak = self.staff_client.get(self.url, HTTP_IF_NONE_MATCH='W/' + etag)
+        self.assertEqual(weak.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changed_member_is_sent_again(self):
+        etag = self.staff_client.get(self.url)['ETag']
+
+        self.member.position = 'Treasurer'
+        self.member.save()
+
+        response = self.staff_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(get_response_content(response)['position'], 'Treasurer')
+
+    def test_staff_and_non_staff_views_have_different_etags(self):
+        self.assertNotEqual(self.staff_client.get(self.url)['ETag'], self.client.get(self.url)['ETag'])
+
+    def test_patch_with_stale_etag_is_refused(self):
+        etag = self.staff_client.get(self.url)['ETag']
+        Member.objects.get(id=self.member.id).save()
+
+        response = self.staff_client.patch(self.url, {'position': 'Treasurer'}, format='json', HTTP_IF_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue('etag' in get_response_content(response))
+        self.assertNotEqual(Member.objects.get(id=self.member.id).position, 'Treasurer')
+
+    def test_patch_with_current_etag(self):
+        etag = self.staff_client.get(self.url)['ETag']
+
+        response = self.staff_client.patch(self.url, {'position': 'Treasurer'}, format='json', HTTP_IF_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Member.objects.get(id=self.member.id).position, 'Treasurer')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response['ETag'], self.staff_client.get(self.url)['ETag'])
+
+    def test_missing_member(self):
+        response = self.staff_client.get(MEMBER_URL + '999999/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# List ETags come from the versions bumped as writes commit, so these run outside a test transaction.
+class MemberListETagTests(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.staff = generate_fake_new_user(True)
+        self.member = generate_fake_new_user()
+
+        self.staff_client = get_authed_client(self.staff.name, 'fake_password')
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+    def test_list_etag(self):
+        etag = self.client.get(MEMBER_URL)['ETag']
+        self.assertEqual(self.client.get(MEMBER_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        # Another page is another representation.
+        self.assertNotEqual(self.client.get(MEMBER_URL, {'page': 1})['ETag'], etag)
+
+        self.staff.present += 1
+        self.staff.save()
+        self.assertEqual(self.client.get(MEMBER_URL, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_deleting_a_member_changes_the_list_etag(self):
+        etag = self.staff_client.get(MEMBER_URL)['ETag']
+        self.member.delete()
+
+        self.assertNotEqual(self.staff_client.get(MEMBER_URL)['ETag'], etag)
+
+    def test_list_etag_is_shared_between_processes(self):
+        etag = self.client.get(MEMBER_URL)['ETag']
+
+        # Another process has a cache of its own, but shares the database.
+        with mock.patch.dict(caches._caches.caches, {'default': LocMemCache('other-process', {})}):
+            self.assertEqual(self.client.get(MEMBER_URL)['ETag'], etag)
+
+            self.staff.present += 1
+            self.staff.save()
+
+        self.assertEqual(self.client.get(MEMBER_URL, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
@@ -0,0 +1,124 @@
+import base64
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+
+
+class ApiTests(APITestCase):
+    def setUp(self):
+        self.members = [generate_fake_new_user() for x in range(0, 30)]
+        self.staff = generate_fake_new_user(True)
+
+    def follow_cursors(self, client, params):
+        names = []
+        pages = []
+        response = client.get('/api/v1/member/', data=params, format='json')
+
+        while True:
+            content = get_response_content(response)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            pages.append(content)
+            names += [member['name'] for member in content['results']]
+
+            if content['next'] is None:
+                return names, pages
+            response = client.get(content['next'], format='json')
+
+    def test_cursor_pagination(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        names, pages = self.follow_cursors(client, {'pagination': 'cursor'})
+
+        self.assertEqual(names, list(Member.objects.order_by('id').values_list('name', flat=True)))
+        self.assertEqual(len(pages), 2)
+        self.assertTrue('count' not in pages[0])
+        self.assertEqual(pages[0]['previous'], None)
+
+    def test_cursor_pagination_follows_ordering(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        names, pages = self.follow_cursors(client, {'pagination': 'cursor', 'order_by': 'name.desc'})
+
+        self.assertEqual(names, list(Member.objects.order_by('-name', 'id').values_list('name', flat=True)))
+
+    def test_cursor_with_values_of_the_wrong_type(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': ['abc'], 'r': False}).encode()).decode()
+
+        response = client.get('/api/v1/member/', data={'pagination': 'cursor', 'cursor': cursor}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_pagination_skips_count_query(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/member/', data={'pagination': 'cursor'}, format='json')
+
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_field_projection(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/member/', data={'fields': 'name,phone'}, format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['count'], 31)
+        for member in content['results']:
+            self.assertEqual(set(member.keys()), {'name', 'phone'})
+
+        member_selects = [query['sql'] for query in queries.captured_queries
+                          if 'FROM "restapi_member"' in query['sql'] and 'COUNT(' not in query['sql']]
+        self.assertEqual(len(member_selects), 1)
+        self.assertTrue('"restapi_member"."address"' not in member_selects[0])
+        self.assertTrue('"restapi_member"."legal_name"' not in member_selects[0])
+
+    def test_field_projection_respects_admin_split(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        response = client.get('/api/v1/member/', data={'fields': 'name,member_score'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('fields' in get_response_content(response))
+
+        response = client.get('/api/v1/member/', data={'fields': 'name,favorite_color'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        response = client.get('/api/v1/member/', data={'fields': 'name,member_score'}, format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(content['results'][0].keys()), {'name', 'member_score'})
+
+    def test_field_projection_with_cursor_pagination(self):
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        names, pages = self.follow_cursors(client, {
+            'pagination': 'cursor',
+            'fields': 'name',
+            'order_by': 'rollnumber.desc'
+        })
+
+        self.assertEqual(names, list(Member.objects.order_by('-rollnumber', 'id').values_list('name', flat=True)))
+        self.assertEqual(set(pages[0]['results'][0].keys()), {'name'})
+
+    def test_cursor_pagination_over_search_results(self):
+        client = get_authed_client(self.members[0].name, 'fake_password')
+
+        for member in self.members:
+            member.position = "Recruitment"
+            member.save()
+
+        names, pages = self.follow_cursors(client, {'pagination': 'cursor', 'q': 'recruitment'})
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(sorted(names), sorted(member.name for member in self.members))
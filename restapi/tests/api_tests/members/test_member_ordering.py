@@ -0,0 +1,76 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+
+
+class ApiTests(APITestCase):
+    def setUp(self):
+        self.members = [generate_fake_new_user() for x in range(0, 6)]
+
+        # Three positions, two members each, so the second key has ties to break. The names are fixed, so ordering
+        # by position first can never happen to match ordering by name alone: Casey Clark comes first by position,
+        # but after Alex Adams by name.
+        names = ["Alex Adams", "Blair Brooks", "Casey Clark", "Drew Dixon", "Emery Evans", "Finley Ford"]
+        for index, member in enumerate(self.members):
+            member.name = names[index]
+            member.position = ["Brother", "Recruitment", "Treasurer"][index % 3]
+            member.save()
+
+        self.staff = generate_fake_new_user(True)
+        self.staff.position = "Brother"
+        self.staff.save()
+
+    def get_ordered(self, client, order_by):
+        return client.get('/api/v1/member/', data={'order_by': order_by}, format='json')
+
+    def test_multi_key_ordering(self):
+        client = get_authed_client(self.members[0].user.username, 'fake_password')
+
+        response = self.get_ordered(client, 'position.desc,name.asc')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        expected = list(Member.objects.order_by('-position', 'name', 'id').values_list('name', flat=True))
+        self.assertEqual([member['name'] for member in content['results']], expected)
+
+        # Both keys have to take effect, not just the last one.
+        self.assertNotEqual(expected, list(Member.objects.order_by('name', 'id').values_list('name', flat=True)))
+
+    def test_ordering_bad_format(self):
+        client = get_authed_client(self.members[0].user.username, 'fake_password')
+
+        response = self.get_ordered(client, 'name.sideways')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('order_by' in get_response_content(response))
+
+    def test_ordering_field_not_sortable(self):
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        for field in ['email', 'address', 'legal_name']:
+            response = self.get_ordered(client, 'name.asc,' + field + '.asc')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertTrue('order_by' in get_response_content(response))
+
+        response = self.get_ordered(client, 'name.asc,name.desc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_protected_field(self):
+        client = get_authed_client(self.members[0].user.username, 'fake_password')
+
+        response = self.get_ordered(client, 'member_score.desc')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(content['order_by'], "You've attempted to sort by a field you do not have permission to view.")
+
+        client = get_authed_client(self.staff.name, 'fake_password')
+
+        response = self.get_ordered(client, 'member_score.desc')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        scores = [member['member_score'] for member in content['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
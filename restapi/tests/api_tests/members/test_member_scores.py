@@ -0,0 +1,49 @@
+import datetime
+from unittest import mock
+
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.leases import LeaderLease
+from restapi.member_scores import MemberScoreEngine, MemberScoreUpdater
+from restapi.tests.testing_utilities import *
+from restapi.models.member_score_updates import MemberScoreUpdate
+from restapi.models.members import Member
+
+RECOMPUTE_URL = '/api/v1/member/scores/recompute/'
+
+
+class RecomputeScoresTests(APITestCase):
+    def setUp(self):
+        self.staff = generate_fake_new_user(True)
+        self.client = get_authed_client(self.staff.name, 'fake_password')
+        Member.objects.update(member_score=-1)
+        MemberScoreUpdate.objects.all().delete()
+
+    def test_admin_queues_a_recompute(self):
+        with mock.patch.object(MemberScoreEngine, 'run') as run:
+            response = self.client.post(RECOMPUTE_URL, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(get_response_content(response), {'queued': 1})
+        run.assert_not_called()
+        self.assertEqual(list(MemberScoreUpdate.objects.values_list('member_id', flat=True)), [self.staff.id])
+
+        MemberScoreUpdater(debounce=datetime.timedelta(0)).tick(now=timezone.now() + datetime.timedelta(seconds=1))
+        self.assertFalse(Member.objects.filter(member_score=-1).exists())
+
+    def test_non_admin_cannot_recompute(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        response = client.post(RECOMPUTE_URL, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_recompute_already_running(self):
+        with LeaderLease('member-scores', holder='the command') as lease:
+            self.assertTrue(lease.acquire())
+            response = self.client.post(RECOMPUTE_URL, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(MemberScoreUpdate.objects.exists())
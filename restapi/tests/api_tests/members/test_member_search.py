@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+from restapi.search import trigram_search_enabled
+
+
+def create_member(username, name, first_name, last_name, legal_name, phone, position):
+    user_account = User.objects.create_user(username, username + "@example.com", "fake_password")
+
+    return Member.objects.create(
+        user=user_account,
+        name=name,
+        first_name=first_name,
+        last_name=last_name,
+        legal_name=legal_name,
+        address="123 Test Street",
+        email=username + "@example.com",
+        phone=phone,
+        rollnumber=Member.objects.count() + 1,
+        member_score=0,
+        inactive_flag=False,
+        abroad_flag=False,
+        present=0,
+        position=position
+    )
+
+
+class ApiTests(APITestCase):
+    def setUp(self):
+        self.pete = create_member("pparker", "Pete Parker", "Pete", "Parker", "Peter Benjamin Parker",
+                                  "303.555.0101", "Treasurer")
+        self.tony = create_member("tstark", "Tony Stark", "Anthony", "Stark", "Anthony Edward Stark",
+                                  "720.555.0199", "Brother")
+        self.jose = create_member("jmartinez", "José Martínez", "José", "Martínez", "José Luis Martínez",
+                                  "970.555.0142", "Brother")
+        self.client = get_authed_client("pparker", "fake_password")
+
+    def search(self, query):
+        response = self.client.get('/api/v1/member/', data={'q': query}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [member['name'] for member in get_response_content(response)['results']]
+
+    def test_search_partial_name(self):
+        self.assertEqual(self.search("pet"), ["Pete Parker"])
+        self.assertEqual(self.search("Stark"), ["Tony Stark"])
+
+    def test_search_other_fields(self):
+        # First name that isn't part of the colloquial name.
+        self.assertEqual(self.search("anthony"), ["Tony Stark"])
+
+        self.assertEqual(self.search("treasurer"), ["Pete Parker"])
+        self.assertEqual(self.search("555.0199"), ["Tony Stark"])
+
+    def test_search_ignores_case_and_accents(self):
+        self.assertEqual(self.search("MARTINEZ")[0], "José Martínez")
+
+    def test_search_ranks_name_matches_first(self):
+        # 'Brother' is a position on two members, but Tom Brotherton is also a name match.
+        create_member("tbrother", "Tom Brotherton", "Tom", "Brotherton", "Tom Brotherton", "303.555.0177", "Rush Chair")
+
+        self.assertEqual(self.search("brother")[0], "Tom Brotherton")
+
+    def test_search_no_matches(self):
+        self.assertEqual(self.search("zzzz"), [])
+
+    def test_search_sees_updates(self):
+        self.pete.name = "Spidey Parker"
+        self.pete.save()
+
+        self.assertEqual(self.search("spidey"), ["Spidey Parker"])
+
+        self.tony.delete()
+        self.assertEqual(self.search("stark"), [])
+
+    def test_search_combines_with_other_filters(self):
+        self.assertEqual(len(self.search("brother")), 2)
+
+        response = self.client.get('/api/v1/member/', data={'q': 'brother', 'phone': '720.555.0199'}, format='json')
+        self.assertEqual([member['name'] for member in get_response_content(response)['results']], ["Tony Stark"])
+
+    def test_search_tolerates_typos(self):
+        if not trigram_search_enabled():
+            self.skipTest("Typo tolerance comes from pg_trgm.")
+
+        self.assertEqual(self.search("Parkr")[0], "Pete Parker")
@@ -39,9 +39,8 @@ class ApiTests(APITestCase):
         member = generate_fake_new_user(False)
 
         token = get_tokens(member.name, "fake_password")['access']
-        user = User.objects.get(email=member.email)
 
-        url = '/api/v1/member/' + str(user.id) + '/'
+        url = '/api/v1/member/' + str(member.id) + '/'
 
         client = APIClient()
 
@@ -67,9 +66,8 @@ class ApiTests(APITestCase):
         member = generate_fake_new_user(True)
 
         token = get_tokens(member.name, "fake_password")['access']
-        user = User.objects.get(email=member.email)
 
-        url = '/api/v1/member/' + str(user.id) + '/'
+        url = '/api/v1/member/' + str(member.id) + '/'
 
         client = APIClient()
 
@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from restapi.member_scores import MemberScoreEngine
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+
+MEMBER_URL = '/api/v1/member/'
+
+
+# Versions are bumped as writes commit, so these run outside a test transaction.
+class ResponseCacheTests(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.staff = generate_fake_new_user(True)
+        self.member = generate_fake_new_user()
+        self.shift = create_sober_shift()
+
+        self.staff_client = get_authed_client(self.staff.name, 'fake_password')
+        self.client = get_authed_client(self.member.name, 'fake_password')
+
+    def read(self, client, url, params=None):
+        """
+        Returns the response content and whether it was built from the database, rather than the cache. Reading the
+        cache versions and a record's ETag are the queries a cached read still makes.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, params or {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queried = any('restapi_' in query['sql'] and 'restapi_cacheversion' not in query['sql'] and
+                      not query['sql'].startswith('SELECT "restapi_member"."updated_at"')
+                      for query in queries.captured_queries)
+        return get_response_content(response), queried
+
+    def test_repeated_reads_are_cached(self):
+        first, queried = self.read(self.staff_client, MEMBER_URL)
+        self.assertTrue(queried)
+
+        second, queried = self.read(self.staff_client, MEMBER_URL)
+        self.assertFalse(queried)
+        self.assertEqual(first, second)
+
+        content, queried = self.read(self.staff_client, MEMBER_URL + str(self.member.id) + '/')
+        self.assertTrue(queried)
+        self.assertFalse(self.read(self.staff_client, MEMBER_URL + str(self.member.id) + '/')[1])
+
+    def test_query_params_and_pages_are_keyed_separately(self):
+        self.read(self.staff_client, MEMBER_URL, {'page': 1})
+
+        self.assertTrue(self.read(self.staff_client, MEMBER_URL, {'fields': 'name'})[1])
+        self.assertFalse(self.read(self.staff_client, MEMBER_URL, {'page': 1})[1])
+
+    def test_staff_and_non_staff_are_keyed_separately(self):
+        staff_view, queried = self.read(self.staff_client, MEMBER_URL + str(self.member.id) + '/')
+        member_view, queried = self.read(self.client, MEMBER_URL + str(self.member.id) + '/')
+
+        self.assertTrue(queried)
+        self.assertIn('address', staff_view)
+        self.assertNotIn('address', member_view)
+
+    def test_writes_take_effect_immediately(self):
+        self.read(self.client, MEMBER_URL + str(self.member.id) + '/')
+
+        response = self.staff_client.patch(MEMBER_URL + str(self.member.id) + '/', {'position': 'Treasurer'},
+                                           format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        content, queried = self.read(self.client, MEMBER_URL + str(self.member.id) + '/')
+        self.assertTrue(queried)
+        self.assertEqual(content['position'], 'Treasurer')
+
+    def test_writes_from_other_processes_take_effect_immediately(self):
+        url = MEMBER_URL + str(self.member.id) + '/'
+        self.read(self.client, url)
+
+        # Another process has a cache of its own, but shares the database.
+        with mock.patch.dict(caches._caches.caches, {'default': LocMemCache('other-process', {})}):
+            response = self.staff_client.patch(url, {'position': 'Treasurer'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        content, queried = self.read(self.client, url)
+        self.assertTrue(queried)
+        self.assertEqual(content['position'], 'Treasurer')
+
+    def test_bulk_score_writes_take_effect_immediately(self):
+        Member.objects.filter(id=self.member.id).update(member_score=-1)
+        before, queried = self.read(self.staff_client, MEMBER_URL + str(self.member.id) + '/')
+
+        MemberScoreEngine().run()
+
+        content, queried = self.read(self.staff_client, MEMBER_URL + str(self.member.id) + '/')
+        self.assertNotEqual(content['member_score'], before['member_score'])
+        self.assertEqual(content['member_score'], Member.objects.get(id=self.member.id).member_score)
+
+    def test_roster_changes_take_effect_immediately(self):
+        shift_url = '/api/v1/sober-bro-shift/' + str(self.shift.id) + '/'
+        self.read(self.client, shift_url + 'brothers/')
+        self.read(self.client, '/api/v1/sober-bro-shift/', {'start': self.shift.date.isoformat()})
+
+        response = self.client.post(shift_url + 'brothers/', {'member': self.member.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        roster, queried = self.read(self.client, shift_url + 'brothers/')
+        self.assertEqual([row['member']['id'] for row in roster], [self.member.id])
+
+        shifts, queried = self.read(self.client, '/api/v1/sober-bro-shift/', {'start': self.shift.date.isoformat()})
+        self.assertEqual(shifts['results'][0]['filled'], 1)
+
+    def test_uncommitted_writes_are_not_cached(self):
+        url = MEMBER_URL + str(self.member.id) + '/'
+        original = self.member.position
+
+        try:
+            with transaction.atomic():
+                Member.objects.filter(id=self.member.id).update(position='Rolled back')
+                Member.objects.get(id=self.member.id).save()
+
+                self.assertEqual(self.read(self.client, url)[0]['position'], 'Rolled back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self.read(self.client, url)[0]['position'], original)
@@ -0,0 +1,69 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from restapi.tests.testing_utilities import *
+from restapi.models.sober_bros import SoberBro
+
+
+# Row locks are what keep concurrent sign-ups honest, so this only runs against databases that support them.
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.shift = create_sober_shift()
+        self.staff = generate_fake_new_user(True)
+        self.members = [generate_fake_new_user() for x in range(0, 20)]
+
+    def test_parallel_sign_ups_never_exceed_capacity(self):
+        barrier = threading.Barrier(len(self.members))
+        statuses = []
+        lock = threading.Lock()
+
+        def sign_up(member):
+            client = APIClient()
+            client.force_authenticate(user=self.staff.user)
+
+            try:
+                barrier.wait()
+                response = client.post('/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/',
+                                       data={"member": member.id}, format='json')
+                with lock:
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sign_up, args=(member,)) for member in self.members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(SoberBro.objects.filter(shift=self.shift).count(), self.shift.capacity)
+        self.assertEqual(statuses.count(status.HTTP_201_CREATED), self.shift.capacity)
+        self.assertEqual(statuses.count(status.HTTP_400_BAD_REQUEST), len(self.members) - self.shift.capacity)
+
+    def test_parallel_duplicate_sign_ups_only_add_once(self):
+        member = self.members[0]
+        barrier = threading.Barrier(5)
+
+        def sign_up():
+            client = APIClient()
+            client.force_authenticate(user=self.staff.user)
+
+            try:
+                barrier.wait()
+                client.post('/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/',
+                            data={"member": member.id}, format='json')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=sign_up) for x in range(0, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(SoberBro.objects.filter(shift=self.shift, member=member).count(), 1)
@@ -75,6 +75,18 @@ class ApiTests(APITestCase):
         self.assertTrue('address' not in content[0]['member'])
         self.assertEqual(content[0]['member']['id'], member.id)
 
+    def test_add_sb_without_a_token(self):
+        member = generate_fake_new_user()
+        client = APIClient()
+        client.force_authenticate(user=member.user)
+        url = '/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/'
+
+        response = client.post(url, data={"member": member.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.post(url, data={"member": self.sbs[0].id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_add_sb_fails_if_not_authed_user(self):
         member = generate_fake_new_user()
         client = get_authed_client(member.name, 'fake_password')
@@ -210,3 +222,38 @@ class ApiTests(APITestCase):
                         ' on ' + \
                         str(self.shift.date)
         self.assertEqual(content['delete'], desc_sentence)
+
+    def test_add_sb_fails_if_already_signed_up(self):
+        client = get_authed_client(self.sbs[0].name, 'fake_password')
+
+        data = {"member": self.sbs[0].id}
+        response = client.post('/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/', data=data, format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(content['member'],
+                         "The member you're attempting to assign is already signed up for this shift.")
+        self.assertEqual(SoberBro.objects.filter(shift=self.shift).count(), 4)
+
+    def test_add_sb_fails_if_member_does_not_exist(self):
+        member = generate_fake_new_user(True)
+        client = get_authed_client(member.name, 'fake_password')
+
+        data = {"member": member.id + 1000}
+        response = client.post('/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/', data=data, format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(content['member'], "The member you attempted to add to the shift does not exist.")
+
+    def test_add_sb_fails_if_member_is_not_an_id(self):
+        member = generate_fake_new_user(True)
+        client = get_authed_client(member.name, 'fake_password')
+
+        # JSON true would otherwise be read as member 1.
+        for value in [True, False, 1.5, "abc", None]:
+            response = client.post('/api/v1/sober-bro-shift/' + str(self.shift.id) + '/brothers/',
+                                   data={"member": value}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(SoberBro.objects.filter(shift=self.shift).count(), 4)
@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
@@ -80,6 +82,27 @@ class ApiTests(APITestCase):
         self.assertEqual(brother["name"], member.name)
         self.assertEqual(brother["phone"], member.phone)
 
+    def test_get_next_sb_shift_after_midnight(self):
+        """
+        A shift starting just after midnight is dated the next day, but is still coming up in the next 15 minutes.
+        """
+        timezone = pytz.timezone("America/Denver")
+        now = timezone.localize(datetime.datetime.now())
+
+        SoberBroShift.objects.create(
+            date=now.date() + datetime.timedelta(days=1),
+            time_start=now + datetime.timedelta(minutes=5),
+            time_end=now + datetime.timedelta(hours=2),
+            title="Late Shift",
+            capacity=5
+        )
+
+        response = get_api_key_client().get('/api/v1/next-sb-shift/', format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([shift["title"] for shift in content], ["Late Shift"])
+
     def test_get_next_sb_shift_no_shifts(self):
         response = get_api_key_client().get('/api/v1/next-sb-shift/', format='json')
         content = get_response_content(response)
@@ -98,3 +121,44 @@ class ApiTests(APITestCase):
         response = client.get('/api/v1/next-sb-shift/', format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+
+    def test_next_sb_shift_constant_query_count(self):
+        """
+        Ensuring the number of queries doesn't grow with the number of upcoming shifts or assigned brothers.
+        """
+        timezone = pytz.timezone("America/Denver")
+        now = timezone.localize(datetime.datetime.now())
+
+        client = get_api_key_client()
+
+        # The key is checked against the database once and remembered after that, so that's done up front.
+        client.get('/api/v1/next-sb-shift/', format='json')
+
+        def create_upcoming_shift(minutes, brothers):
+            shift = SoberBroShift.objects.create(
+                date=now.date(),
+                time_start=now + datetime.timedelta(minutes=minutes),
+                time_end=now + datetime.timedelta(hours=2),
+                title="Test Shift " + str(minutes),
+                capacity=5
+            )
+
+            for x in range(0, brothers):
+                SoberBro.objects.create(shift=shift, member=generate_fake_new_user())
+
+        create_upcoming_shift(5, 1)
+
+        with CaptureQueriesContext(connection) as single_shift:
+            response = client.get('/api/v1/next-sb-shift/', format='json')
+        self.assertEqual(len(get_response_content(response)), 1)
+
+        create_upcoming_shift(7, 4)
+        create_upcoming_shift(9, 5)
+
+        with CaptureQueriesContext(connection) as many_shifts:
+            response = client.get('/api/v1/next-sb-shift/', format='json')
+        content = get_response_content(response)
+
+        self.assertEqual(len(content), 3)
+        self.assertEqual([len(shift["brothers"]) for shift in content], [1, 4, 5])
+        self.assertEqual(len(many_shifts.captured_queries), len(single_shift.captured_queries))
@@ -61,9 +61,10 @@ class ApiTests(APITestCase):
         response = client.get('/api/v1/sober-bro-shift/', format='json')
         content = get_response_content(response)
 
-        self.assertTrue('title' in content)
-        self.assertEqual(content['date'], str(datetime.datetime.today().date()))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(content['results']), 1)
+        self.assertTrue('title' in content['results'][0])
+        self.assertEqual(content['results'][0]['date'], str(datetime.datetime.today().date()))
 
         # Now let's ensure that a shift occurring two months away isn't included in the returned object.
         shift = create_sober_shift()
@@ -73,14 +74,88 @@ class ApiTests(APITestCase):
         response = client.get('/api/v1/sober-bro-shift/', format='json')
         content = get_response_content(response)
 
-        self.assertTrue('title' in content)
-        self.assertEqual(content['date'], str(datetime.datetime.today().date()))
+        self.assertEqual(len(content['results']), 1)
+        self.assertEqual(content['results'][0]['date'], str(datetime.datetime.today().date()))
         self.assertEqual(SoberBroShift.objects.all()[0].date, datetime.datetime.today().date())
 
         future_shift = datetime.datetime.today()
         future_shift = future_shift + datetime.timedelta(days=62)
         self.assertEqual(SoberBroShift.objects.all()[1].date, future_shift.date())
 
+    def test_shift_list_date_range(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        shift = create_sober_shift()
+
+        url = '/api/v1/sober-bro-shift/?start=' + str(shift.date) + '&end=' + str(shift.date)
+        content = get_response_content(client.get(url, format='json'))
+
+        self.assertEqual(len(content['results']), 1)
+        self.assertEqual(content['results'][0]['id'], shift.id)
+        self.assertEqual(content['results'][0]['filled'], 0)
+
+        response = client.get('/api/v1/sober-bro-shift/?start=tomorrow', format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        url = '/api/v1/sober-bro-shift/?start=' + str(shift.date) + '&end=' + str(self.shift.date)
+        response = client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_shift_list_includes_fill_level(self):
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        content = get_response_content(client.get('/api/v1/sober-bro-shift/', format='json'))
+
+        self.assertEqual(content['results'][0]['filled'], 4)
+        self.assertEqual(content['results'][0]['capacity'], 5)
+
+    def test_shift_list_cursor_pagination(self):
+        """
+        Ensuring every shift is listed exactly once, in (date, time_start, id) order, while following cursors.
+        """
+        member = generate_fake_new_user()
+        client = get_authed_client(member.name, 'fake_password')
+
+        timezone = pytz.timezone("America/Denver")
+        start = timezone.localize(datetime.datetime.now()) + datetime.timedelta(days=1)
+
+        # Two shifts per day, with ties on time_start to exercise the id tiebreaker.
+        for x in range(0, 30):
+            day = start + datetime.timedelta(days=x // 2)
+            SoberBroShift.objects.create(
+                date=day.date(),
+                title="Paged Shift " + str(x),
+                time_start=day,
+                time_end=day + datetime.timedelta(hours=2),
+                capacity=5
+            )
+
+        expected = list(SoberBroShift.objects.filter(
+            date__range=(datetime.date.today(), datetime.date.today() + datetime.timedelta(days=31))
+        ).order_by('date', 'time_start', 'id').values_list('id', flat=True))
+
+        seen = []
+        pages = []
+        url = '/api/v1/sober-bro-shift/'
+        while url is not None:
+            content = get_response_content(client.get(url, format='json'))
+            pages.append(content)
+            seen += [shift['id'] for shift in content['results']]
+            url = content['next']
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[0]['previous'], None)
+
+        # Stepping back from the second page returns the first.
+        content = get_response_content(client.get(pages[1]['previous'], format='json'))
+        self.assertEqual([shift['id'] for shift in content['results']], expected[:25])
+
+        response = client.get('/api/v1/sober-bro-shift/?cursor=garbage', format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_get_specific_shift(self):
         member = generate_fake_new_user()
         client = get_authed_client(member.name, 'fake_password')
@@ -0,0 +1,129 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from restapi.tests.testing_utilities import *
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+
+SHIFT_URL = '/api/v1/sober-bro-shift/'
+
+
+class ShiftETagTests(APITestCase):
+    def setUp(self):
+        self.staff = generate_fake_new_user(True)
+        self.member = generate_fake_new_user()
+        self.shift = create_sober_shift()
+        self.url = SHIFT_URL + str(self.shift.id) + '/'
+
+        self.client = get_authed_client(self.staff.name, 'fake_password')
+
+    def assertNotModified(self, url, etag, **params):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_shift(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotModified(self.url, etag)
+
+        self.shift.capacity = 6
+        self.shift.save()
+        self.assertNotEqual(self.client.get(self.url)['ETag'], etag)
+
+    def test_roster(self):
+        url = self.url + 'brothers/'
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        response = self.client.post(url, {'member': self.member.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        signed_up = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(signed_up.status_code, status.HTTP_200_OK)
+
+        # The roster shows members' names.
+        self.member.name = 'Renamed Member'
+        self.member.save()
+        renamed = self.client.get(url)
+        self.assertNotEqual(renamed['ETag'], signed_up['ETag'])
+        self.assertEqual(get_response_content(renamed)[0]['member']['name'], 'Renamed Member')
+
+    def test_patch_with_stale_etag_is_refused(self):
+        etag = self.client.get(self.url)['ETag']
+        SoberBroShift.objects.get(id=self.shift.id).save()
+
+        response = self.client.patch(self.url, {'capacity': 8}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(SoberBroShift.objects.get(id=self.shift.id).capacity, self.shift.capacity)
+
+        response = self.client.patch(self.url, {'capacity': 8}, format='json', HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(SoberBroShift.objects.get(id=self.shift.id).capacity, 8)
+
+
+# List ETags come from the versions bumped as writes commit, so this runs outside a test transaction.
+class ShiftListETagTests(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.staff = generate_fake_new_user(True)
+        self.member = generate_fake_new_user()
+        self.shift = create_sober_shift()
+
+        self.client = get_authed_client(self.staff.name, 'fake_password')
+
+    def test_shift_list(self):
+        start = self.shift.date.isoformat()
+        etag = self.client.get(SHIFT_URL, {'start': start})['ETag']
+        self.assertEqual(self.client.get(SHIFT_URL, {'start': start}, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        # Signing up changes how full the shift is.
+        SoberBro.objects.create(shift=self.shift, member=self.member)
+        self.assertEqual(self.client.get(SHIFT_URL, {'start': start}, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+
+    def test_shift_list_etag_is_shared_between_processes(self):
+        start = self.shift.date.isoformat()
+        etag = self.client.get(SHIFT_URL, {'start': start})['ETag']
+
+        # Another process has a cache of its own, but shares the database.
+        with mock.patch.dict(caches._caches.caches, {'default': LocMemCache('other-process', {})}):
+            self.assertEqual(self.client.get(SHIFT_URL, {'start': start})['ETag'], etag)
+            SoberBro.objects.create(shift=self.shift, member=self.member)
+
+        self.assertEqual(self.client.get(SHIFT_URL, {'start': start}, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_200_OK)
+
+
+class NextShiftETagTests(APITestCase):
+    def setUp(self):
+        start = timezone.now() + datetime.timedelta(minutes=5)
+        self.shift = SoberBroShift.objects.create(
+            date=start.date(),
+            title="Upcoming Shift",
+            time_start=start,
+            time_end=start + datetime.timedelta(hours=2),
+            capacity=5
+        )
+        self.member = generate_fake_new_user()
+        SoberBro.objects.create(shift=self.shift, member=self.member)
+
+        self.client = get_api_key_client()
+
+    def test_next_shift(self):
+        response = self.client.get('/api/v1/next-sb-shift/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        not_modified = self.client.get('/api/v1/next-sb-shift/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.member.phone = '303.555.0199'
+        self.member.save()
+        self.assertNotEqual(self.client.get('/api/v1/next-sb-shift/')['ETag'], etag)
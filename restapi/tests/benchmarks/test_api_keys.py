@@ -0,0 +1,24 @@
+import timeit
+
+from django.test import TestCase
+from rest_framework_api_key.models import APIKey
+
+from restapi.api_keys import APIKeyVerifier
+
+UNCACHED_ROUNDS = 5
+CACHED_ROUNDS = 20000
+
+
+class APIKeyVerificationBenchmark(TestCase):
+    def test_benchmark_api_key_verification(self):
+        api_key, key = APIKey.objects.create_key(name="Benchmark key")
+        verifier = APIKeyVerifier()
+        verifier.verify(key)
+
+        uncached_time = timeit.timeit(lambda: APIKey.objects.is_valid(key), number=UNCACHED_ROUNDS)
+        cached_time = timeit.timeit(lambda: verifier.verify(key), number=CACHED_ROUNDS)
+
+        print("\nAPI key verification, checking the hash every time: " +
+              "{:.2f}ms".format(uncached_time / UNCACHED_ROUNDS * 1000) + " per call")
+        print("API key verification, remembered: " +
+              "{:.2f}us".format(cached_time / CACHED_ROUNDS * 1000000) + " per call")
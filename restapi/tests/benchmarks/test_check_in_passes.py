@@ -0,0 +1,19 @@
+import time
+import timeit
+
+from django.test import SimpleTestCase
+
+from restapi.check_in_passes import CheckInPassSigner
+
+ROUNDS = 20000
+
+
+class CheckInPassBenchmark(SimpleTestCase):
+    def test_benchmark_pass_verification(self):
+        signer = CheckInPassSigner()
+        token = signer.sign(1234, 56789, time.time() + 3600)
+
+        verify_time = timeit.timeit(lambda: signer.verify(token), number=ROUNDS)
+
+        print("\nCheck-in pass verification over " + str(ROUNDS) + " rounds: " +
+              "{:.2f}us".format(verify_time / ROUNDS * 1000000) + " per call")
@@ -0,0 +1,102 @@
+import datetime
+import timeit
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from restapi.member_scores import MemberScoreEngine
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.guests import Guest
+from restapi.models.members import Member
+from restapi.models.sober_bros import SoberBro
+
+MEMBERS = 200
+ROUNDS = 3
+
+
+def per_member_scores():
+    """
+    Scoring one member at a time, with a query per input and a save per member.
+    """
+    members = list(Member.objects.order_by('id'))
+    now = timezone.now()
+
+    inputs = {}
+    for member in members:
+        inputs[member.id] = (
+            member.present,
+            SoberBro.objects.filter(member=member, shift__time_end__lte=now).count(),
+            EventAttendance.objects.filter(
+                guest__phone=member.phone.replace('.', '')
+            ).values('event').distinct().count()
+        )
+
+    active = [inputs[member.id] for member in members if not member.inactive_flag]
+    highest = [max([values[x] for values in active] or [0]) for x in range(0, 3)]
+
+    for member in members:
+        score = sum(weight * value / high for weight, value, high in zip((0.5, 0.3, 0.2), inputs[member.id], highest)
+                    if high > 0)
+        member.member_score = round(score * 100, 2) if not member.inactive_flag else 0
+        member.save()
+
+
+class MemberScoreBenchmark(TestCase):
+    def setUp(self):
+        shift = create_sober_shift()
+        shift.time_start = timezone.now() - datetime.timedelta(days=1)
+        shift.time_end = shift.time_start + datetime.timedelta(hours=2)
+        shift.capacity = MEMBERS
+        shift.save()
+
+        events = [create_event(hours_from_now=x * 24) for x in range(0, 5)]
+
+        # Skipping create_user here; hashing 200 passwords would dwarf the thing being measured.
+        for x in range(0, MEMBERS):
+            user = User.objects.create(username="score" + str(x), email="score" + str(x) + "@example.com")
+            member = Member.objects.create(
+                user=user,
+                name="Score Member " + str(x),
+                first_name="Score",
+                last_name="Member",
+                legal_name="Score Member " + str(x),
+                address="123 Score Street",
+                email=user.email,
+                phone="303.555." + str(1000 + x),
+                rollnumber=x,
+                member_score=-1,
+                inactive_flag=x % 10 == 0,
+                abroad_flag=False,
+                present=x % 30,
+                position="Brother"
+            )
+
+            if x % 3 == 0:
+                SoberBro.objects.create(shift=shift, member=member)
+            if x % 4 == 0:
+                guest = Guest.objects.create(phone="303555" + str(1000 + x), name=member.name)
+                for event in events[:x % 5 + 1]:
+                    EventAttendance.objects.create(event=event, guest=guest, arrival_time=event.time_start)
+
+    def test_engine_matches_per_member_scores(self):
+        per_member_scores()
+        expected = list(Member.objects.order_by('id').values_list('member_score', flat=True))
+
+        Member.objects.update(member_score=-1)
+        MemberScoreEngine().run()
+
+        self.assertEqual(list(Member.objects.order_by('id').values_list('member_score', flat=True)), expected)
+
+    def test_benchmark_scoring(self):
+        def engine():
+            Member.objects.update(member_score=-1)
+            MemberScoreEngine().run()
+
+        per_member_time = timeit.timeit(per_member_scores, number=ROUNDS)
+        engine_time = timeit.timeit(engine, number=ROUNDS)
+
+        print("\nScoring " + str(MEMBERS) + " members over " + str(ROUNDS) + " rounds: per member " +
+              "{:.2f}ms".format(per_member_time / ROUNDS * 1000) + ", vectorized " +
+              "{:.2f}ms".format(engine_time / ROUNDS * 1000) + " per run")
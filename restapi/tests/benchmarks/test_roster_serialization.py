@@ -0,0 +1,83 @@
+import timeit
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from restapi.tests.testing_utilities import *
+from restapi.models.members import Member
+from restapi.models.sober_bros import SoberBro
+from restapi.serializers import SoberBroRosterSerializer
+
+ROSTER_SIZE = 100
+ROUNDS = 20
+
+
+def unrestricted_roster(shift_pk):
+    """
+    The same serializer without `roster_columns`: every column is loaded, and each entry fetches its shift and member
+    in queries of their own.
+    """
+    return SoberBroRosterSerializer(SoberBro.objects.filter(shift=shift_pk).order_by('id'), many=True).data
+
+
+def slim_roster(shift_pk):
+    data = SoberBroRosterSerializer.roster_columns(SoberBro.objects.filter(shift=shift_pk).order_by('id'))
+    return SoberBroRosterSerializer(data, many=True).data
+
+
+class RosterSerializationBenchmark(TestCase):
+    def setUp(self):
+        self.shift = create_sober_shift()
+        self.shift.capacity = ROSTER_SIZE
+        self.shift.save()
+
+        # Skipping create_user here; hashing 100 passwords would dwarf the thing being measured.
+        for x in range(0, ROSTER_SIZE):
+            user = User.objects.create(username="roster" + str(x), email="roster" + str(x) + "@example.com")
+            member = Member.objects.create(
+                user=user,
+                name="Roster Member " + str(x),
+                first_name="Roster",
+                last_name="Member",
+                legal_name="Roster Member " + str(x),
+                address="123 Roster Street",
+                email=user.email,
+                phone=get_phone(),
+                rollnumber=x,
+                member_score=0,
+                inactive_flag=False,
+                abroad_flag=False,
+                present=0,
+                position="Brother"
+            )
+            SoberBro.objects.create(shift=self.shift, member=member)
+
+    def test_slim_roster_matches_unrestricted_output(self):
+        roster = slim_roster(self.shift.id)
+
+        self.assertEqual(roster, unrestricted_roster(self.shift.id))
+        self.assertEqual(roster[0], {
+            'shift': {'id': self.shift.id, 'title': self.shift.title},
+            'member': {'id': roster[0]['member']['id'], 'name': "Roster Member 0"}
+        })
+
+    def test_slim_roster_is_a_single_query(self):
+        with CaptureQueriesContext(connection) as unrestricted:
+            unrestricted_roster(self.shift.id)
+
+        with CaptureQueriesContext(connection) as slim:
+            slim_roster(self.shift.id)
+
+        self.assertEqual(len(slim.captured_queries), 1)
+        self.assertLess(len(slim.captured_queries), len(unrestricted.captured_queries))
+        self.assertNotIn('address', slim.captured_queries[0]['sql'])
+
+    def test_benchmark_roster_paths(self):
+        unrestricted_time = timeit.timeit(lambda: unrestricted_roster(self.shift.id), number=ROUNDS)
+        slim_time = timeit.timeit(lambda: slim_roster(self.shift.id), number=ROUNDS)
+
+        print("\n" + str(ROSTER_SIZE) + "-entry roster over " + str(ROUNDS) + " rounds: unrestricted " +
+              "{:.2f}ms".format(unrestricted_time / ROUNDS * 1000) + ", slim " +
+              "{:.2f}ms".format(slim_time / ROUNDS * 1000) + " per call")
@@ -0,0 +1,23 @@
+import timeit
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from restapi.authentication import UserCache
+from restapi.tests.testing_utilities import generate_fake_new_user
+
+ROUNDS = 2000
+
+
+class UserCacheBenchmark(TestCase):
+    def test_benchmark_user_resolution(self):
+        user_id = generate_fake_new_user().user_id
+        cache = UserCache()
+        cache.get(user_id)
+
+        query_time = timeit.timeit(lambda: User.objects.select_related('member').get(id=user_id), number=ROUNDS)
+        cached_time = timeit.timeit(lambda: cache.get(user_id), number=ROUNDS)
+
+        print("\nUser resolution over " + str(ROUNDS) + " rounds, querying: " +
+              "{:.2f}us".format(query_time / ROUNDS * 1000000) + " per call, cached: " +
+              "{:.2f}us".format(cached_time / ROUNDS * 1000000) + " per call")
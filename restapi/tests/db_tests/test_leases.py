@@ -0,0 +1,119 @@
+import datetime
+import threading
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from restapi.leases import LeaderLease
+from restapi.models.leases import Lease
+from restapi.models.slack_messages import SlackMessage
+
+
+class LeaseTableTests(TestCase):
+
+    def lease(self, holder, ttl=datetime.timedelta(seconds=30)):
+        lease = LeaderLease('test-job', ttl=ttl, holder=holder, advisory=False)
+        self.addCleanup(lease.release)
+        return lease
+
+    def test_one_holder_at_a_time(self):
+        first = self.lease('first')
+        second = self.lease('second')
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertEqual(Lease.objects.get(name='test-job').holder, 'first')
+
+    def test_release_hands_over(self):
+        first = self.lease('first')
+        second = self.lease('second')
+
+        first.acquire()
+        first.release()
+
+        self.assertTrue(second.acquire())
+
+    def test_expired_lease_is_taken_over(self):
+        first = self.lease('first')
+        second = self.lease('second')
+
+        first.acquire()
+        Lease.objects.filter(name='test-job').update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.renew())
+
+    def test_renew_extends(self):
+        lease = self.lease('first')
+        lease.acquire()
+        Lease.objects.filter(name='test-job').update(expires_at=timezone.now())
+
+        self.assertTrue(lease.renew())
+        self.assertGreater(Lease.objects.get(name='test-job').expires_at,
+                           timezone.now() + datetime.timedelta(seconds=25))
+
+    def test_advisory_lock(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest("Advisory locks need PostgreSQL.")
+
+        first = LeaderLease('test-job')
+        second = LeaderLease('test-job')
+        self.addCleanup(first.release)
+        self.addCleanup(second.release)
+
+        self.assertTrue(first.advisory)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertIsNone(second.lock_connection)
+        self.assertTrue(first.renew())
+
+        first.release()
+        self.assertTrue(second.acquire())
+
+    def test_leader_only_command_exits_when_lease_is_held(self):
+        holder = LeaderLease('shift-reminders', advisory=False if connection.vendor != 'postgresql' else None)
+        self.addCleanup(holder.release)
+        holder.acquire()
+
+        out = StringIO()
+        call_command('send_shift_reminders', channel='sober-bros', once=True, no_dispatch=True, stdout=out)
+
+        self.assertIn("Another process holds the shift-reminders lease", out.getvalue())
+        self.assertEqual(SlackMessage.objects.count(), 0)
+
+
+class LeaseHeartbeatTests(TransactionTestCase):
+
+    def test_heartbeat_renews(self):
+        lease = LeaderLease('test-job', ttl=datetime.timedelta(seconds=0.6), holder='first', advisory=False)
+        lease.acquire()
+        lease.start_heartbeat()
+
+        time.sleep(1)
+        try:
+            self.assertTrue(lease.held)
+            self.assertGreater(Lease.objects.get(name='test-job').expires_at, timezone.now())
+        finally:
+            lease.release()
+
+    def test_lost_lease_calls_back(self):
+        lease = LeaderLease('test-job', ttl=datetime.timedelta(seconds=0.6), holder='first', advisory=False)
+        stopped = threading.Event()
+        lease.on_lost(stopped.set)
+
+        lease.acquire()
+        lease.start_heartbeat()
+        Lease.objects.filter(name='test-job').update(holder='second')
+
+        try:
+            self.assertTrue(stopped.wait(2))
+            self.assertFalse(lease.held)
+        finally:
+            lease.release()
+
+        # Releasing a lost lease leaves the new holder alone.
+        self.assertEqual(Lease.objects.get(name='test-job').holder, 'second')
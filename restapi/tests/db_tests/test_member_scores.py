@@ -0,0 +1,275 @@
+import datetime
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from restapi.member_scores import MemberScoreEngine, MemberScoreUpdater
+from restapi.tests.testing_utilities import *
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.guests import Guest
+from restapi.models.member_ranks import MemberRank
+from restapi.models.member_score_updates import MemberScoreUpdate
+from restapi.models.members import Member
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+
+
+class MemberScoreEngineTests(TestCase):
+    def setUp(self):
+        self.members = [generate_fake_new_user() for x in range(0, 3)]
+
+        for member, present in zip(self.members, [10, 5, 0]):
+            member.present = present
+            member.save()
+
+        self.past_shift = create_sober_shift()
+        self.past_shift.time_start = timezone.now() - datetime.timedelta(days=2)
+        self.past_shift.time_end = self.past_shift.time_start + datetime.timedelta(hours=2)
+        self.past_shift.save()
+
+    def score(self, member):
+        return Member.objects.get(id=member.id).member_score
+
+    def attend(self, member, event):
+        guest, created = Guest.objects.get_or_create(
+            phone=member.phone.replace('.', ''),
+            defaults={'name': member.name}
+        )
+        EventAttendance.objects.create(event=event, guest=guest, arrival_time=event.time_start)
+
+    def test_attendance_only(self):
+        result = MemberScoreEngine().run()
+
+        self.assertEqual(result['members'], 3)
+        self.assertEqual([self.score(member) for member in self.members], [50, 25, 0])
+
+    def test_every_column_counts(self):
+        SoberBro.objects.create(shift=self.past_shift, member=self.members[1])
+        self.attend(self.members[2], create_event())
+        self.attend(self.members[2], create_event(hours_from_now=24))
+
+        MemberScoreEngine().run()
+
+        self.assertEqual([self.score(member) for member in self.members], [50, 55, 20])
+
+    def test_upcoming_shifts_do_not_count(self):
+        SoberBro.objects.create(shift=create_sober_shift(), member=self.members[1])
+        MemberScoreEngine().run()
+
+        self.assertEqual(self.score(self.members[1]), 25)
+
+    def test_inactive_members_score_zero(self):
+        self.members[0].inactive_flag = True
+        self.members[0].save()
+
+        MemberScoreEngine().run()
+
+        # The inactive member's attendance no longer sets the bar for everyone else.
+        self.assertEqual([self.score(member) for member in self.members], [0, 50, 0])
+
+    def test_only_changes_are_written(self):
+        MemberScoreEngine().run()
+        self.assertEqual(MemberScoreEngine().run()['updated'], 0)
+
+    def test_custom_weights(self):
+        MemberScoreEngine(weights={'present': 1, 'shifts': 0, 'events': 0}).run()
+        self.assertEqual(self.score(self.members[0]), 100)
+
+    def test_no_members(self):
+        Member.objects.all().delete()
+        self.assertEqual(MemberScoreEngine().run(), {'members': 0, 'updated': 0})
+
+    def test_query_count_does_not_grow_with_members(self):
+        with CaptureQueriesContext(connection) as small:
+            MemberScoreEngine().run()
+
+        for x in range(0, 20):
+            generate_fake_new_user()
+        Member.objects.update(member_score=-1)
+
+        with CaptureQueriesContext(connection) as large:
+            MemberScoreEngine().run()
+
+        # The leaderboard refresh writes whichever of its inserts, updates and deletes it needs; it's covered on its
+        # own in test_leaderboard.
+        def scoring_queries(queries):
+            return [query for query in queries.captured_queries if 'memberrank' not in query['sql']]
+
+        self.assertEqual(len(scoring_queries(large)), len(scoring_queries(small)))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('recompute_member_scores', stdout=out)
+
+        self.assertIn('Scored 3 members', out.getvalue())
+        self.assertEqual(self.score(self.members[0]), 50)
+
+
+class IncrementalMemberScoreTests(TestCase):
+    def setUp(self):
+        self.members = [generate_fake_new_user() for x in range(0, 3)]
+
+        for member, present in zip(self.members, [10, 5, 0]):
+            member.present = present
+            member.save()
+
+        self.past_shift = create_sober_shift()
+        self.past_shift.time_start = timezone.now() - datetime.timedelta(days=2)
+        self.past_shift.time_end = self.past_shift.time_start + datetime.timedelta(hours=2)
+        self.past_shift.save()
+        SoberBro.objects.create(shift=self.past_shift, member=self.members[0])
+
+        MemberScoreEngine().run()
+        MemberScoreUpdate.objects.all().delete()
+
+        self.updater = MemberScoreUpdater(debounce=datetime.timedelta(0))
+
+    def score(self, member):
+        return Member.objects.get(id=member.id).member_score
+
+    def queued(self):
+        return set(MemberScoreUpdate.objects.values_list('member_id', flat=True))
+
+    def test_changes_are_queued(self):
+        SoberBro.objects.create(shift=self.past_shift, member=self.members[1])
+        self.members[2].present = 3
+        self.members[2].save()
+
+        self.assertEqual(self.queued(), {self.members[1].id, self.members[2].id})
+
+    def test_unrelated_saves_are_not_queued(self):
+        self.members[0].position = 'President'
+        self.members[0].save(update_fields=['position'])
+
+        self.assertEqual(self.queued(), set())
+
+    def test_event_check_in_queues_the_member(self):
+        guest = Guest.objects.create(phone=self.members[2].phone.replace('.', ''), name=self.members[2].name)
+        EventAttendance.objects.create(event=create_event(), guest=guest, arrival_time=timezone.now())
+
+        self.assertEqual(self.queued(), {self.members[2].id})
+
+    def test_only_queued_members_are_rescored(self):
+        SoberBro.objects.create(shift=self.past_shift, member=self.members[1])
+        Member.objects.filter(id=self.members[0].id).update(member_score=-1)
+
+        with mock.patch.object(MemberScoreEngine, 'run') as full_run:
+            result = self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        full_run.assert_not_called()
+        self.assertEqual(result, {'members': 1, 'updated': 1})
+        self.assertEqual(self.score(self.members[1]), 55)
+        self.assertEqual(self.score(self.members[0]), -1)
+        self.assertEqual(self.queued(), set())
+
+    def test_new_highest_value_rescales_everyone(self):
+        self.members[2].present = 20
+        self.members[2].save()
+
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual([self.score(member) for member in self.members], [55, 12.5, 50])
+
+    def test_rescaling_holds_the_recompute_lease(self):
+        self.members[2].present = 20
+        self.members[2].save()
+
+        heartbeats = []
+        run = MemberScoreEngine.run
+
+        def run_under_lease(engine):
+            heartbeats.extend(thread for thread in threading.enumerate() if thread.name == 'lease-member-scores')
+            return run(engine)
+
+        with mock.patch.object(MemberScoreEngine, 'run', autospec=True, side_effect=run_under_lease):
+            self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual(len(heartbeats), 1)
+        self.assertEqual(self.score(self.members[2]), 50)
+
+    def test_losing_the_highest_value_rescales_everyone(self):
+        self.members[0].inactive_flag = True
+        self.members[0].save()
+
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual([self.score(member) for member in self.members], [0, 50, 0])
+
+    def test_deleted_member_rescales_everyone(self):
+        self.members[0].delete()
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual(self.score(self.members[1]), 50)
+
+    def test_deleted_member_closes_their_gap_in_the_leaderboard(self):
+        self.members[1].delete()
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual(MemberRank.objects.get(member=self.members[2]).rank, 2)
+
+    def test_updates_wait_for_changes_to_settle(self):
+        updater = MemberScoreUpdater(debounce=datetime.timedelta(seconds=5), max_wait=datetime.timedelta(seconds=30))
+        self.members[2].present = 3
+        self.members[2].save()
+
+        self.assertEqual(updater.tick()['members'], 0)
+        self.assertEqual(updater.tick(now=timezone.now() + datetime.timedelta(seconds=6))['members'], 1)
+
+    def test_member_touched_during_a_batch_stays_queued(self):
+        self.members[2].present = 3
+        self.members[2].save()
+        MemberScoreUpdate.objects.update(touched_at=timezone.now() + datetime.timedelta(minutes=1))
+
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=31))
+        self.assertEqual(self.queued(), {self.members[2].id})
+
+    def test_finished_shifts_are_queued(self):
+        shift = create_sober_shift()
+        shift.time_start = timezone.now() - datetime.timedelta(hours=1)
+        shift.time_end = timezone.now() + datetime.timedelta(minutes=1)
+        shift.save()
+        SoberBro.objects.create(shift=shift, member=self.members[1])
+
+        self.updater.tick()
+        self.assertEqual(self.score(self.members[1]), 25)
+
+        SoberBroShift.objects.filter(id=shift.id).update(time_end=timezone.now())
+
+        self.updater.tick()
+        self.assertEqual(self.score(self.members[1]), 55)
+
+    def test_incremental_matches_full_recompute(self):
+        SoberBro.objects.create(shift=self.past_shift, member=self.members[2])
+        self.members[1].present = 7
+        self.members[1].save()
+        self.updater.tick(now=timezone.now() + datetime.timedelta(seconds=1))
+
+        self.assertEqual(MemberScoreEngine().check(), [])
+
+    def test_check_command(self):
+        call_command('check_member_scores', stdout=StringIO())
+
+        Member.objects.filter(id=self.members[0].id).update(member_score=12)
+        with self.assertRaises(CommandError):
+            call_command('check_member_scores', stdout=StringIO())
+
+        heartbeats = []
+        run = MemberScoreEngine.run
+
+        def run_under_lease(engine):
+            heartbeats.extend(thread for thread in threading.enumerate() if thread.name == 'lease-member-scores')
+            return run(engine)
+
+        out = StringIO()
+        with mock.patch.object(MemberScoreEngine, 'run', autospec=True, side_effect=run_under_lease):
+            call_command('check_member_scores', '--fix', stdout=out)
+
+        self.assertIn('stored 12.0, expected 80.0', out.getvalue())
+        self.assertEqual(self.score(self.members[0]), 80)
+        self.assertEqual(len(heartbeats), 1)
@@ -10,6 +10,7 @@ from faker import Faker
 from rest_framework.test import APIClient
 from rest_framework_api_key.models import APIKey
 
+from restapi.models.events import Event
 from restapi.models.members import Member
 from restapi.models.sober_bro_shifts import SoberBroShift
 
@@ -104,6 +105,21 @@ def create_sober_shift():
     )
 
 
+def create_event(hours_from_now=0):
+    timezone = pytz.timezone("America/Denver")
+    start = timezone.localize(datetime.datetime.now()) + timedelta(hours=hours_from_now)
+
+    fake = Faker()
+
+    return Event.objects.create(
+        event_name="Test Event " + fake.uuid4(),
+        location=fake.street_address(),
+        comments="A test event.",
+        time_start=start,
+        time_end=start + timedelta(hours=4)
+    )
+
+
 # Generates a random phone number of a standard xxx.xxx.xxxx format.
 def get_phone():
     random.seed()
@@ -0,0 +1,114 @@
+import datetime
+import os
+from io import StringIO
+from unittest import mock
+
+import pytz
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from restapi.models.slack_messages import SlackMessage
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+from restapi.shift_reminders import ShiftReminderScheduler
+from restapi.tests.testing_utilities import generate_fake_new_user
+
+
+class TestShiftReminderScheduler(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.denver = pytz.timezone("America/Denver")
+
+        # 11:50 PM, so anything starting in the next few minutes crosses midnight.
+        self.now = self.denver.localize(datetime.datetime(2031, 3, 14, 23, 50))
+        self.scheduler = ShiftReminderScheduler('sober-bros')
+
+    def create_shift(self, start, title="Test Shift"):
+        return SoberBroShift.objects.create(
+            date=self.denver.normalize(start).date(),
+            title=title,
+            time_start=start,
+            time_end=start + datetime.timedelta(hours=4),
+            capacity=5
+        )
+
+    def reminders(self):
+        return list(SlackMessage.objects.order_by('id').values_list('text', flat=True))
+
+    def test_shift_after_midnight_is_reminded(self):
+        shift = self.create_shift(self.now + datetime.timedelta(minutes=15), "Late Shift")
+        SoberBro.objects.create(shift=shift, member=generate_fake_new_user())
+
+        self.scheduler.tick(self.now + datetime.timedelta(minutes=1))
+
+        self.assertEqual(len(self.reminders()), 1)
+        self.assertIn("Late Shift", self.reminders()[0])
+        self.assertEqual(SlackMessage.objects.get().channel, 'sober-bros')
+
+    def test_sleeps_until_the_next_reminder(self):
+        self.create_shift(self.now + datetime.timedelta(hours=2))
+        self.scheduler.reload_interval = datetime.timedelta(hours=1)
+
+        wake_at = self.scheduler.tick(self.now)
+        self.assertEqual(wake_at, self.now + datetime.timedelta(hours=1))
+
+        wake_at = self.scheduler.tick(wake_at)
+        self.assertEqual(wake_at, self.now + datetime.timedelta(hours=1, minutes=45))
+        self.assertEqual(self.reminders(), [])
+
+        self.scheduler.tick(wake_at)
+        self.assertEqual(len(self.reminders()), 1)
+
+    def test_each_shift_is_reminded_once(self):
+        self.create_shift(self.now + datetime.timedelta(minutes=10))
+
+        self.scheduler.tick(self.now)
+        self.scheduler.tick(self.now + datetime.timedelta(minutes=2))
+        ShiftReminderScheduler('sober-bros').tick(self.now + datetime.timedelta(minutes=3))
+
+        self.assertEqual(len(self.reminders()), 1)
+
+    def test_moved_shift_is_rescheduled(self):
+        shift = self.create_shift(self.now + datetime.timedelta(minutes=30))
+        self.scheduler.tick(self.now)
+
+        shift.time_start = self.now + datetime.timedelta(hours=1)
+        shift.save()
+
+        self.scheduler.tick(self.now + datetime.timedelta(minutes=20))
+        self.assertEqual(self.reminders(), [])
+
+        self.scheduler.tick(self.now + datetime.timedelta(minutes=45))
+        self.assertEqual(len(self.reminders()), 1)
+
+    def test_deleted_shift_is_not_reminded(self):
+        shift = self.create_shift(self.now + datetime.timedelta(minutes=30))
+        self.scheduler.tick(self.now)
+
+        shift.delete()
+
+        self.scheduler.tick(self.now + datetime.timedelta(minutes=20))
+        self.assertEqual(self.reminders(), [])
+
+    def test_started_shifts_are_skipped(self):
+        self.create_shift(self.now - datetime.timedelta(minutes=5))
+
+        self.scheduler.tick(self.now)
+        self.assertEqual(self.reminders(), [])
+
+    def test_reload_is_one_query(self):
+        for minutes in range(30, 90, 10):
+            self.create_shift(self.now + datetime.timedelta(minutes=minutes))
+
+        with self.assertNumQueries(1):
+            self.scheduler.tick(self.now)
+
+    def test_command_once(self):
+        self.create_shift(datetime.datetime.now(pytz.utc) + datetime.timedelta(minutes=5))
+
+        with mock.patch.dict(os.environ, {'SLACK_SOBER_BRO_CHANNEL': 'sober-bros'}):
+            call_command('send_shift_reminders', once=True, no_dispatch=True, stdout=StringIO())
+
+        self.assertEqual(len(self.reminders()), 1)
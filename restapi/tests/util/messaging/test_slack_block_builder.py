@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from restapi.models.cache_versions import CacheVersion
+from restapi.models.sober_bros import SoberBro
+from restapi.tests.testing_utilities import create_sober_shift, generate_fake_new_user
+from restapi.util.messaging.slack_block_builder import SlackBlockBuilder
+
+
+# Payloads are invalidated as changes commit, so these run outside a test transaction.
+class TestSlackBlockBuilder(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.builder = SlackBlockBuilder()
+
+        self.shift = create_sober_shift()
+        self.members = [generate_fake_new_user() for i in range(2)]
+        for member in self.members:
+            SoberBro.objects.create(shift=self.shift, member=member)
+
+    def block_text(self, payload):
+        return "\n".join(str(block) for block in payload['blocks'])
+
+    def test_shift_reminder(self):
+        payload = self.builder.render('shift_reminder', self.shift)
+
+        self.assertIn(self.shift.title, payload['text'])
+        self.assertEqual(payload['blocks'][0]['type'], 'header')
+        for member in self.members:
+            self.assertIn(member.name, payload['text'])
+            self.assertIn(member.phone, self.block_text(payload))
+        self.assertIn("2 of 5 spots filled", self.block_text(payload))
+
+    def test_roster_summary(self):
+        payload = self.builder.render('roster_summary', self.shift.id)
+
+        self.assertIn("2 of 5 spots filled", payload['text'])
+        self.assertIn("1. " + self.members[0].name, self.block_text(payload))
+        self.assertIn("3 open spots", self.block_text(payload))
+
+    def test_unknown_template(self):
+        self.assertRaises(ValueError, self.builder.render, 'nonexistent', self.shift)
+
+    def test_rendering_is_cached(self):
+        first = self.builder.render('shift_reminder', self.shift)
+
+        # Just the shift's version.
+        with self.assertNumQueries(1):
+            second = self.builder.render('shift_reminder', self.shift)
+
+        self.assertEqual(first, second)
+
+    def test_render_many_loads_uncached_shifts_together(self):
+        shifts = [self.shift] + [create_sober_shift() for i in range(4)]
+        self.builder.render('shift_reminder', shifts[2])
+
+        # The shifts' versions, then the uncached shifts and all of their rosters.
+        with self.assertNumQueries(3):
+            payloads = self.builder.render_many('shift_reminder', shifts)
+
+        self.assertEqual([payload['text'].split(" starts")[0] for payload in payloads],
+                         ["Reminder: " + shift.title for shift in shifts])
+
+        with self.assertNumQueries(1):
+            self.builder.render_many('shift_reminder', shifts)
+
+    def test_sign_up_invalidates(self):
+        self.builder.render('shift_reminder', self.shift)
+
+        newcomer = generate_fake_new_user()
+        SoberBro.objects.create(shift=self.shift, member=newcomer)
+
+        self.assertIn(newcomer.name, self.builder.render('shift_reminder', self.shift)['text'])
+
+    def test_removal_invalidates(self):
+        self.builder.render('roster_summary', self.shift)
+
+        SoberBro.objects.filter(shift=self.shift, member=self.members[0]).delete()
+
+        payload = self.builder.render('roster_summary', self.shift)
+        self.assertNotIn(self.members[0].name, self.block_text(payload))
+        self.assertIn("4 open spots", self.block_text(payload))
+
+    def test_invalidation_waits_for_the_commit(self):
+        key = SlackBlockBuilder.version_key(self.shift.id)
+        version = CacheVersion.objects.get(key=key).version
+
+        with transaction.atomic():
+            SoberBro.objects.filter(shift=self.shift, member=self.members[0]).delete()
+            self.assertEqual(CacheVersion.objects.get(key=key).version, version)
+
+        self.assertGreater(CacheVersion.objects.get(key=key).version, version)
+
+    def test_deleted_shift_drops_its_version(self):
+        key = SlackBlockBuilder.version_key(self.shift.id)
+        self.builder.render('shift_reminder', self.shift)
+
+        self.shift.delete()
+
+        self.assertFalse(CacheVersion.objects.filter(key=key).exists())
+
+    def test_uncommitted_changes_are_not_cached(self):
+        self.builder.render('shift_reminder', self.shift)
+
+        try:
+            with transaction.atomic():
+                SoberBro.objects.filter(shift=self.shift, member=self.members[0]).delete()
+
+                self.assertNotIn(self.members[0].name, self.builder.render('shift_reminder', self.shift)['text'])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertIn(self.members[0].name, self.builder.render('shift_reminder', self.shift)['text'])
+
+    def test_member_change_invalidates(self):
+        self.builder.render('shift_reminder', self.shift)
+
+        self.members[0].phone = '555.867.5309'
+        self.members[0].save()
+
+        self.assertIn('555.867.5309', self.block_text(self.builder.render('shift_reminder', self.shift)))
+
+    def test_mrkdwn_is_escaped(self):
+        self.members[0].name = 'Robert <script> & Co'
+        self.members[0].save()
+
+        payload = self.builder.render('shift_reminder', self.shift)
+        self.assertIn('Robert &lt;script&gt; &amp; Co', payload['text'])
+
+    def test_help_flag_alert(self):
+        payload = self.builder.help_flag_alert('Jane Doe', phone='555.123.4567', location='Main St', note='Need a ride')
+
+        self.assertEqual(payload['text'], "Help flag: Jane Doe needs help at Main St.")
+        self.assertIn('555.123.4567', self.block_text(payload))
+        self.assertIn('Need a ride', self.block_text(payload))
@@ -1,78 +1,167 @@
+import json
 import os
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest import mock
+
 from restapi.client.slack_client import SlackClient
 
 
-def mocked_requests_post(*args, **kwargs):
-    class MockResponse:
-        def __init__(self, json_data, status_code):
-            self.json_data = json_data
-            self.status_code = status_code
+class StubSlackHandler(BaseHTTPRequestHandler):
+    """
+    Answers chat.postMessage based on the message text, the way the old requests.post mock did.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.client_address, self.headers['Authorization'], body))
+
+        text = body['text']
+        if text == 'test200':
+            self.respond(200, {"ok": True})
+        elif text == 'test400':
+            self.respond(400, {"ok": False})
+        elif text == 'test500':
+            self.respond(500, {"ok": False})
+        elif text.startswith('ratelimited'):
+            self.server.rate_limited += 1
+            if self.server.rate_limited <= 2:
+                self.respond(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": "3"})
+            else:
+                self.respond(200, {"ok": True})
+        elif text.startswith('echo'):
+            self.respond(200, {"ok": True, "text": text, "channel": body['channel']})
+        else:
+            self.respond(404, None)
+
+    def respond(self, status, body, headers=None):
+        content = b"Not Found" if body is None else json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
 
-        def json(self):
-            return self.json_data
 
-    body = kwargs.get('json', None)
+# Our test case class
+class TestSlackClient(unittest.TestCase):
 
-    if body is None:
-        return MockResponse({}, 200)
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubSlackHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.slack_url = 'http://127.0.0.1:%d/api/chat.postMessage' % cls.server.server_port
 
-    if body is not None and body['text'] == 'test200':
-        return MockResponse({"ok": True}, 200)
-    elif body is not None and body['text'] == 'test400':
-        return MockResponse({"ok": False}, 400)
-    elif body is not None and body['text'] == 'test500':
-        return MockResponse({"ok": False}, 500)
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
 
-    return MockResponse(None, 404)
+    def setUp(self):
+        self.server.requests = []
+        self.server.rate_limited = 0
 
+        patcher = mock.patch.dict(os.environ, {'SLACK_TOKEN': 'test_token', 'SLACK_URL': self.slack_url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
 
-# Our test case class
-class TestSlackClient(unittest.TestCase):
+        # Nothing in here should actually wait out a backoff.
+        patcher = mock.patch('restapi.client.slack_client.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
 
-    def setUp(self):
-        os.environ['SLACK_TOKEN'] = 'test_token'
-        self.slack_url = 'https://test.slack.api.here.com/postMessage'
+    def client(self, **kwargs):
+        client = SlackClient(**kwargs)
+        self.addCleanup(client.close)
+        return client
 
     # let's test that the client throws if the token is not set
     def test_client_throws_if_token_not_set(self):
-        os.environ.clear()
-        self.assertRaises(Exception, SlackClient)
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertRaises(Exception, SlackClient)
 
-    @mock.patch('requests.post', side_effect=mocked_requests_post)
-    def test_successful_post(self, mock_post):
-        test_slack_client = SlackClient()
-        is_ok, response = test_slack_client.send_message(message='test200', channel='test_channel')
+    def test_successful_post(self):
+        is_ok, response = self.client().send_message(message='test200', channel='test_channel')
         self.assertEqual(is_ok, True)
         self.assertEqual(response, {"ok": True})
+        self.assertEqual(self.server.requests[0][1], 'Bearer test_token')
 
-    @mock.patch('requests.post', side_effect=mocked_requests_post)
-    def test_failed_post(self, mock_post):
-        test_slack_client = SlackClient()
-        is_ok, response = test_slack_client.send_message(message='test400', channel='test_channel')
+    def test_failed_post(self):
+        is_ok, response = self.client().send_message(message='test400', channel='test_channel')
         self.assertEqual(is_ok, False)
         self.assertEqual(response, {"ok": False})
 
-    @mock.patch('requests.post', side_effect=mocked_requests_post)
-    def test_failed_post_with_500(self, mock_post):
-        test_slack_client = SlackClient()
-        is_ok, response = test_slack_client.send_message(message='test500', channel='test_channel')
+    def test_failed_post_with_500(self):
+        is_ok, response = self.client().send_message(message='test500', channel='test_channel')
         self.assertEqual(is_ok, False)
         self.assertEqual(response, {"ok": False})
 
-    @mock.patch('requests.post', side_effect=mocked_requests_post)
-    def test_failed_post_with_404(self, mock_post):
-        test_slack_client = SlackClient()
-        is_ok, response = test_slack_client.send_message(message='test404', channel='test_channel')
+        # The first attempt, then every retry.
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [1, 2, 4])
+
+    def test_failed_post_with_404(self):
+        is_ok, response = self.client().send_message(message='test404', channel='test_channel')
         self.assertEqual(is_ok, False)
         self.assertEqual(response, None)
+        self.assertEqual(len(self.server.requests), 1)
 
     # let's test that send_message can handle blocks
-    @mock.patch('requests.post', side_effect=mocked_requests_post)
-    def test_send_message_with_blocks(self, mock_post):
-        test_slack_client = SlackClient()
-        is_ok, response = test_slack_client.send_message(message='test200', channel='test_channel', blocks=[
-            {'type': 'section', 'text': {'type': 'mrkdwn', 'text': 'test'}}])
+    def test_send_message_with_blocks(self):
+        blocks = [{'type': 'section', 'text': {'type': 'mrkdwn', 'text': 'test'}}]
+        is_ok, response = self.client().send_message(message='test200', channel='test_channel', blocks=blocks)
         self.assertEqual(is_ok, True)
         self.assertEqual(response, {"ok": True})
+        self.assertEqual(self.server.requests[0][2]['blocks'], blocks)
+
+    def test_rate_limit_honours_retry_after(self):
+        is_ok, response = self.client().send_message(message='ratelimited', channel='test_channel')
+        self.assertEqual(is_ok, True)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [3.0, 3.0])
+
+    def test_rate_limit_gives_up_after_max_retries(self):
+        is_ok, response = self.client(max_retries=1).send_message(message='ratelimited', channel='test_channel')
+        self.assertEqual(is_ok, False)
+        self.assertEqual(response['error'], 'ratelimited')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_unreachable_slack_raises_after_retries(self):
+        client = self.client(url='http://127.0.0.1:1/api/chat.postMessage', max_retries=2)
+        with self.assertLogs('restapi.client.slack_client', level='ERROR'):
+            self.assertRaises(Exception, client.send_message, message='test200', channel='test_channel')
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_messages_reuse_one_connection(self):
+        client = self.client()
+        for i in range(5):
+            client.send_message(message='test200', channel='test_channel')
+
+        self.assertEqual(len({address for address, token, body in self.server.requests}), 1)
+
+    def test_send_messages_keeps_order(self):
+        messages = [{'message': 'echo %d' % i, 'channel': 'channel_%d' % i} for i in range(20)]
+        results = self.client(max_workers=4).send_messages(messages)
+
+        self.assertEqual(len(results), 20)
+        for i, (is_ok, response) in enumerate(results):
+            self.assertEqual(is_ok, True)
+            self.assertEqual(response['text'], 'echo %d' % i)
+            self.assertEqual(response['channel'], 'channel_%d' % i)
+
+        # Four workers share the pool, so at most four connections were ever opened.
+        self.assertLessEqual(len({address for address, token, body in self.server.requests}), 4)
+
+    def test_token_is_not_printed(self):
+        with mock.patch('builtins.print') as mocked_print:
+            self.client().send_message(message='test200', channel='test_channel')
+        mocked_print.assert_not_called()
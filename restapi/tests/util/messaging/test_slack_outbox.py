@@ -0,0 +1,162 @@
+import datetime
+import os
+import threading
+from http.server import ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from restapi.client.slack_client import SlackClient
+from restapi.models.slack_messages import SlackMessage
+from restapi.slack_outbox import SlackOutboxDispatcher, enqueue_slack_message
+from restapi.tests.util.messaging.test_slack_client import StubSlackHandler
+
+
+class TestSlackOutbox(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubSlackHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.slack_url = 'http://127.0.0.1:%d/api/chat.postMessage' % cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.rate_limited = 0
+
+        patcher = mock.patch.dict(os.environ, {'SLACK_TOKEN': 'test_token', 'SLACK_URL': self.slack_url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('restapi.client.slack_client.time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def dispatch(self, **options):
+        out = StringIO()
+        call_command('dispatch_slack_outbox', stdout=out, **options)
+        return out.getvalue()
+
+    def test_enqueue_dedupes(self):
+        first = enqueue_slack_message('channel', 'echo reminder', dedupe_key='shift-1-reminder')
+        second = enqueue_slack_message('channel', 'echo reminder again', dedupe_key='shift-1-reminder')
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(SlackMessage.objects.count(), 1)
+
+    def test_claim_outlasts_one_attempt(self):
+        with SlackClient(max_retries=3, timeout=10, max_backoff=30) as client:
+            dispatcher = SlackOutboxDispatcher(client, batch_size=100, concurrency=8)
+
+        # An attempt can take up to 20 seconds and a wait of 30 before the next, but not the whole retry budget.
+        self.assertGreaterEqual(dispatcher.claim_timeout, datetime.timedelta(seconds=50))
+        self.assertLessEqual(dispatcher.claim_timeout, datetime.timedelta(minutes=5))
+
+    def test_claim_is_renewed_while_a_message_is_sent(self):
+        message = enqueue_slack_message('channel', 'echo slow')
+
+        with SlackClient() as client:
+            dispatcher = SlackOutboxDispatcher(client, claim_timeout=datetime.timedelta(seconds=0.3))
+            deliver = dispatcher.deliver
+
+            # time.sleep is patched out for the client's backoff.
+            def slow_deliver(message):
+                threading.Event().wait(0.25)
+                return deliver(message)
+
+            with mock.patch.object(dispatcher, 'deliver', side_effect=slow_deliver), \
+                    mock.patch.object(dispatcher, 'renew_claim', wraps=dispatcher.renew_claim) as renew_claim:
+                dispatcher.run()
+
+        self.assertEqual(renew_claim.call_args[0][0], [message])
+        self.assertEqual(SlackMessage.objects.get().status, SlackMessage.SENT)
+
+    def test_enqueue_rolls_back_with_the_transaction(self):
+        try:
+            with transaction.atomic():
+                enqueue_slack_message('channel', 'echo never sent')
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(SlackMessage.objects.count(), 0)
+
+    def test_dispatch_sends_everything_due(self):
+        for i in range(25):
+            enqueue_slack_message('channel_%d' % i, 'echo %d' % i)
+
+        output = self.dispatch(batch_size=10, concurrency=4)
+
+        self.assertIn("Sent 25 messages", output)
+        self.assertEqual(len(self.server.requests), 25)
+        self.assertEqual(SlackMessage.objects.filter(status=SlackMessage.SENT, attempts=1).count(), 25)
+        self.assertFalse(SlackMessage.objects.filter(sent_at__isnull=True).exists())
+
+        # Nothing is sent twice.
+        self.dispatch()
+        self.assertEqual(len(self.server.requests), 25)
+
+    def test_dispatch_skips_messages_not_yet_due(self):
+        enqueue_slack_message('channel', 'echo later', send_at=timezone.now() + datetime.timedelta(hours=1))
+
+        self.dispatch()
+
+        self.assertEqual(len(self.server.requests), 0)
+        self.assertEqual(SlackMessage.objects.get().status, SlackMessage.PENDING)
+
+    def test_failed_send_is_rescheduled(self):
+        message = enqueue_slack_message('channel', 'test500')
+
+        before = timezone.now()
+        output = self.dispatch()
+        message.refresh_from_db()
+
+        self.assertIn("1 will be retried", output)
+        self.assertEqual(message.status, SlackMessage.PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, before + datetime.timedelta(seconds=29))
+        self.assertIn("Slack rejected the message", message.last_error)
+
+    def test_failed_send_gives_up_after_max_attempts(self):
+        message = enqueue_slack_message('channel', 'test400')
+
+        output = self.dispatch(max_attempts=1)
+        message.refresh_from_db()
+
+        self.assertIn("1 failed", output)
+        self.assertEqual(message.status, SlackMessage.FAILED)
+
+    def test_expired_claim_is_picked_up_again(self):
+        message = enqueue_slack_message('channel', 'echo stranded')
+        SlackMessage.objects.filter(id=message.id).update(
+            status=SlackMessage.SENDING,
+            next_attempt_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        self.dispatch()
+        message.refresh_from_db()
+
+        self.assertEqual(message.status, SlackMessage.SENT)
+
+    def test_unreachable_slack_is_retried(self):
+        message = enqueue_slack_message('channel', 'echo unreachable')
+
+        client = SlackClient(url='http://127.0.0.1:1/api/chat.postMessage', max_retries=0)
+        with client, self.assertLogs('restapi.client.slack_client', level='ERROR'):
+            totals = SlackOutboxDispatcher(client).run()
+        message.refresh_from_db()
+
+        self.assertEqual(totals, {'sent': 0, 'retrying': 1, 'failed': 0})
+        self.assertIn("Unable to reach Slack", message.last_error)
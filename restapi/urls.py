@@ -9,6 +9,8 @@ router = routers.DefaultRouter()
 router.register(r'member', views.MemberViewSet, basename='member')
 router.register(r'sober-bro-shift', views.SoberBroShiftViewSet, basename='sober-bro-shift')
 router.register(r'next-sb-shift', views.NextShiftViewSet, basename='next-shift')
+router.register(r'event', views.EventViewSet, basename='event')
+router.register(r'leaderboard', views.LeaderboardViewSet, basename='leaderboard')
 
 schema_view = get_schema_view(
     openapi.Info(
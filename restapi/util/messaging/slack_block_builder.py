@@ -0,0 +1,218 @@
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from restapi.cache_versions import bump_versions_on_commit, current_versions, delete_versions_on_commit, pending_bumps
+from restapi.models.sober_bro_shifts import SoberBroShift
+from restapi.models.sober_bros import SoberBro
+
+DIVIDER = {"type": "divider"}
+
+
+def escape(text):
+    """
+    Escapes the three characters Slack's mrkdwn treats as control characters.
+    """
+    return str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def header(text):
+    return {"type": "header", "text": {"type": "plain_text", "text": text[:150], "emoji": True}}
+
+
+def section(text):
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def context(text):
+    return {"type": "context", "elements": [{"type": "mrkdwn", "text": text}]}
+
+
+def format_time(value):
+    return timezone.localtime(value).strftime("%I:%M %p").lstrip("0")
+
+
+def format_date(value):
+    return value.strftime("%A, %B ") + str(value.day)
+
+
+def shift_context(shift):
+    """
+    Pulls out everything the shift templates use. Expects the roster prefetched through `soberbro_set`.
+    """
+    brothers = [(escape(entry.member.name), escape(entry.member.phone)) for entry in shift.soberbro_set.all()]
+
+    return {
+        'title': escape(shift.title),
+        'date': format_date(shift.date),
+        'start': format_time(shift.time_start),
+        'end': format_time(shift.time_end),
+        'brothers': brothers,
+        'filled': len(brothers),
+        'capacity': shift.capacity,
+    }
+
+
+def shift_reminder(shift):
+    values = shift_context(shift)
+    names = ", ".join(name for name, phone in values['brothers']) or "nobody yet"
+
+    return {
+        "text": "Reminder: " + values['title'] + " starts at " + values['start'] + ". On shift: " + names + ".",
+        "blocks": [
+            header("Sober Bro shift reminder"),
+            section("*" + values['title'] + "* starts at *" + values['start'] + "* and runs until *" +
+                    values['end'] + "* on " + values['date'] + "."),
+            section("\n".join("• " + name + " (" + phone + ")" for name, phone in values['brothers']) or
+                    "_Nobody has signed up for this shift._"),
+            context(str(values['filled']) + " of " + str(values['capacity']) + " spots filled"),
+        ]
+    }
+
+
+def roster_summary(shift):
+    values = shift_context(shift)
+    open_spots = max(values['capacity'] - values['filled'], 0)
+
+    if open_spots == 0:
+        availability = "This shift is full."
+    else:
+        availability = str(open_spots) + " open spot" + ("" if open_spots == 1 else "s")
+
+    return {
+        "text": values['title'] + " on " + values['date'] + ": " + str(values['filled']) + " of " +
+                str(values['capacity']) + " spots filled.",
+        "blocks": [
+            header(shift.title + " roster"),
+            section(values['date'] + ", " + values['start'] + " to " + values['end']),
+            DIVIDER,
+            section("\n".join(str(position) + ". " + name for position, (name, phone) in
+                              enumerate(values['brothers'], start=1)) or "_Nobody has signed up yet._"),
+            context(availability),
+        ]
+    }
+
+
+class SlackBlockBuilder:
+    """
+    Renders Slack messages, as {'text': ..., 'blocks': [...]} payloads, from templates.
+
+    Shift payloads are cached per shift and template, and a shift's cached payloads are invalidated whenever its
+    roster changes, once the change commits (see restapi.signals). Rendering a list of shifts costs a query for their
+    versions and a cache round trip, plus two queries for whichever shifts weren't already cached.
+
+    Invalidation bumps a per-shift version counter that's part of every cache key (see restapi.cache_versions),
+    rather than deleting keys. A deleted shift's counter is deleted with it.
+    """
+    shift_templates = {
+        'shift_reminder': shift_reminder,
+        'roster_summary': roster_summary,
+    }
+
+    cache_prefix = 'slack_blocks'
+    cache_timeout = 60 * 60 * 24
+
+    def render(self, template, shift):
+        """
+        Renders one shift, given as a SoberBroShift or its id.
+        """
+        return self.render_many(template, [shift])[0]
+
+    def render_many(self, template, shifts):
+        """
+        Renders each shift, given as SoberBroShifts or ids, and returns the payloads in the same order.
+        """
+        if template not in self.shift_templates:
+            raise ValueError("There's no shift template called " + str(template) + ".")
+
+        shift_ids = [getattr(shift, 'id', shift) for shift in shifts]
+        keys = self.cache_keys(template, shift_ids)
+
+        # Shifts this transaction has changed are rendered as they stand, and not cached, until it commits.
+        uncommitted = pending_bumps()
+        cached = [key for shift_id, key in keys.items() if self.version_key(shift_id) not in uncommitted]
+
+        payloads = cache.get_many(cached)
+        missing = [shift_id for shift_id in set(shift_ids) if keys[shift_id] not in payloads]
+
+        if missing:
+            rendered = {}
+            for shift in self.load_shifts(missing):
+                rendered[keys[shift.id]] = self.shift_templates[template](shift)
+
+            cache.set_many({key: payload for key, payload in rendered.items() if key in cached}, self.cache_timeout)
+            payloads.update(rendered)
+
+        return [payloads.get(keys[shift_id]) for shift_id in shift_ids]
+
+    def help_flag_alert(self, name, phone=None, location=None, note=None, raised_at=None, on_duty=None):
+        """
+        Renders an alert that someone has raised a help flag, naming the sober bros in `on_duty` if given. These are
+        one-offs, so they aren't cached.
+        """
+        raised_at = raised_at or timezone.now()
+        where = " at " + escape(location) if location else ""
+
+        blocks = [
+            header("Help flag raised"),
+            section("*" + escape(name) + "* needs help" + where + "."),
+        ]
+
+        if phone:
+            blocks.append(section("Call or text them at *" + escape(phone) + "*."))
+        if note:
+            blocks.append(section(">" + escape(note)))
+        if on_duty:
+            blocks.append(section("On duty: " + ", ".join(escape(sober_bro) for sober_bro in on_duty)))
+        elif on_duty is not None:
+            blocks.append(section("No sober bro shift is on right now."))
+
+        blocks.append(context("Raised at " + format_time(raised_at)))
+
+        return {
+            "text": "Help flag: " + escape(name) + " needs help" + where + ".",
+            "blocks": blocks
+        }
+
+    def load_shifts(self, shift_ids):
+        roster = SoberBro.objects.select_related('member').only(
+            'id',
+            'shift',
+            'member',
+            'member__name',
+            'member__phone'
+        ).order_by('id')
+
+        return SoberBroShift.objects.filter(id__in=shift_ids).prefetch_related(
+            Prefetch('soberbro_set', queryset=roster)
+        )
+
+    def cache_keys(self, template, shift_ids):
+        versions = self.versions(shift_ids)
+        return {
+            shift_id: ":".join([self.cache_prefix, template, str(shift_id), str(versions[shift_id])])
+            for shift_id in shift_ids
+        }
+
+    def versions(self, shift_ids):
+        keys = {shift_id: self.version_key(shift_id) for shift_id in shift_ids}
+        versions = current_versions(keys.values())
+        return {shift_id: versions[key] for shift_id, key in keys.items()}
+
+    @classmethod
+    def invalidate(cls, shift_ids, using=None):
+        """
+        Drops every cached payload for the given shifts, once the transaction changing them commits.
+        """
+        bump_versions_on_commit({cls.version_key(shift_id) for shift_id in shift_ids}, using=using)
+
+    @classmethod
+    def forget(cls, shift_ids, using=None):
+        """
+        Deletes the version counters of shifts that have been deleted, once the deletion commits.
+        """
+        delete_versions_on_commit({cls.version_key(shift_id) for shift_id in shift_ids}, using=using)
+
+    @classmethod
+    def version_key(cls, shift_id):
+        return cls.cache_prefix + ":version:" + str(shift_id)
@@ -1,3 +1,6 @@
 from .member_views import *
 from .sober_bro_shift_views import *
 from .next_shift_views import *
+from .event_views import *
+from .leaderboard_views import *
+from .token_views import *
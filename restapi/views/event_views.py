@@ -0,0 +1,351 @@
+import json
+import os
+import threading
+import time
+
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from restapi.check_in import CheckInError, CheckInSync, check_in as check_in_guest
+from restapi.check_in_passes import CheckInPassSigner, attendance_buffer, qr_code_svg
+from restapi.help_flags import decode_cursor, help_flag_broker, raise_help_flag
+from restapi.mixins import CustomPaginationMixin
+from restapi.models.event_attendances import EventAttendance
+from restapi.models.events import Event
+from restapi.models.guests import Guest
+from restapi.pagination import KeysetPagination
+from restapi.renderers import EventStreamRenderer
+from restapi.serializers import CheckInSerializer, EventAttendanceSerializer, EventSerializer, HelpFlagSerializer
+
+
+class EventViewSet(ViewSet, CustomPaginationMixin):
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-time_start', 'id')
+
+    # The most check-ins a door device can sync in one request.
+    max_sync_batch = 500
+
+    pass_signer = CheckInPassSigner()
+
+    # How long a help flag long poll waits, and how long an event stream stays open before the client reconnects.
+    max_poll_timeout = 25
+    stream_lifetime = 300
+    stream_heartbeat = 15
+
+    # Long polls and streams each hold a server thread while they wait (see gunicorn.conf.py), so only this many
+    # wait at once per process, leaving 4 threads for everything else. The rest are answered straight away, and
+    # streams ask their client to reconnect in `stream_busy_retry` seconds.
+    max_waiting = max(int(os.environ.get('WEB_THREADS', 12)) - 4, 1)
+    waiting = threading.BoundedSemaphore(max_waiting)
+    stream_busy_retry = 5
+
+    def list(self, request):
+        """
+        Lists events, most recent first.
+        """
+        page = self.paginate_queryset(Event.objects.all())
+        serializer = EventSerializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    def retrieve(self, request, pk=None):
+        event = get_object_or_404(Event.objects.all(), id=pk)
+        serializer = EventSerializer(event)
+
+        return Response(serializer.data)
+
+    def create(self, request):
+        serializer = EventSerializer(data=request.data)
+
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def partial_update(self, request, pk=None):
+        event = get_object_or_404(Event.objects.all(), id=pk)
+        serializer = EventSerializer(event, data=request.data, partial=True)
+
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['post', 'get'], detail=True, url_path='check-in', url_name='check_in')
+    def check_in(self, request, pk=None):
+        """
+        POST checks a guest in at the door by phone number, with their name if it's their first visit.
+        GET lists the event's check-ins in arrival order.
+        """
+        if request.method == 'GET':
+            return self.get_check_ins(pk)
+
+        if not Event.objects.filter(id=pk).exists():
+            return Response(
+                {
+                    "event": "The event you're checking in to does not exist."
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = CheckInSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            attendance, guest_count = check_in_guest(pk, **serializer.validated_data)
+        except CheckInError as e:
+            return Response({e.field: e.message}, e.status_code)
+
+        data = EventAttendanceSerializer(attendance).data
+        data['guest_count'] = guest_count
+
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=True, url_path='check-in/sync', url_name='check_in_sync')
+    def sync_check_ins(self, request, pk=None):
+        """
+        Syncs a batch of check-ins a door device took offline. Takes {"records": [...]}, each with an
+        idempotency_key, phone, arrival_time, and optionally name and help_flag. Returns a result per record.
+        """
+        if not Event.objects.filter(id=pk).exists():
+            return Response(
+                {
+                    "event": "The event you're syncing check-ins for does not exist."
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        records = request.data.get('records') if isinstance(request.data, dict) else None
+
+        if not isinstance(records, list) or not records:
+            return Response(
+                {
+                    "records": "A non-empty list of check-in records is required."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(records) > self.max_sync_batch:
+            return Response(
+                {
+                    "records": "At most " + str(self.max_sync_batch) + " check-ins can be synced at a time."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results, guest_count = CheckInSync(int(pk)).run(records)
+
+        return Response({
+            "guest_count": guest_count,
+            "results": results
+        }, status=status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=True, url_path='pass', url_name='pass')
+    def check_in_pass(self, request, pk=None):
+        """
+        Issues a signed check-in pass for ?guest=<id>, good until the event ends, along with an SVG QR code of it.
+        """
+        event = get_object_or_404(Event.objects.only('id', 'time_end'), id=pk)
+
+        guest_id = request.query_params.get('guest', '')
+        if not guest_id.isdigit() or not Guest.objects.filter(id=guest_id).exists():
+            return Response(
+                {
+                    "guest": "The guest you're issuing a pass for does not exist."
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if event.time_end <= timezone.now():
+            return Response(
+                {
+                    "event": "This event has already ended."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        token = self.pass_signer.sign(event.id, guest_id, event.time_end.timestamp())
+
+        return Response({
+            "pass": token,
+            "expires_at": event.time_end,
+            "qr_code": qr_code_svg(token)
+        }, status=status.HTTP_200_OK)
+
+    @action(methods=['post'], detail=True, url_path='scan', url_name='scan')
+    def scan_pass(self, request, pk=None):
+        """
+        Checks a guest in from a scanned pass. The pass is verified in memory and the check-in is queued to be written
+        with others in a batch, so a scan never waits on the database.
+        """
+        token = request.data.get('pass') if isinstance(request.data, dict) else None
+
+        if not isinstance(token, str) or not token:
+            return Response(
+                {
+                    "pass": "A check-in pass is required."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            event_id, guest_id = self.pass_signer.verify(token)
+        except CheckInError as e:
+            return Response({e.field: e.message}, e.status_code)
+
+        if str(event_id) != str(pk):
+            return Response(
+                {
+                    "pass": "This pass is for a different event."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queued = attendance_buffer.add(event_id, guest_id, timezone.now())
+
+        return Response({
+            "event": event_id,
+            "guest": guest_id,
+            "already_checked_in": not queued
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=['post', 'get'], detail=True, url_path='help', url_name='help')
+    def help(self, request, pk=None):
+        """
+        POST raises the help flag for a checked-in guest, by phone number, and alerts the sober bros on duty.
+        GET long polls for raised flags after ?cursor=, waiting up to ?timeout= seconds for one.
+        """
+        if not Event.objects.filter(id=pk).exists():
+            return Response(
+                {
+                    "event": "The event you're looking for does not exist."
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if request.method == 'GET':
+            return self.poll_help_flags(request, int(pk))
+
+        serializer = HelpFlagSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            attendance, raised = raise_help_flag(int(pk), **serializer.validated_data)
+        except CheckInError as e:
+            return Response({e.field: e.message}, e.status_code)
+
+        data = EventAttendanceSerializer(attendance).data
+
+        return Response(data, status=status.HTTP_201_CREATED if raised else status.HTTP_200_OK)
+
+    @action(methods=['get'], detail=True, url_path='help/stream', url_name='help_stream',
+            renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def help_stream(self, request, pk=None):
+        """
+        Streams raised help flags as Server-Sent Events. Each event's id is its cursor, so a client that reconnects
+        with Last-Event-ID picks up where it left off.
+        """
+        if not Event.objects.filter(id=pk).exists():
+            return Response(
+                {
+                    "event": "The event you're looking for does not exist."
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        after = decode_cursor(request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('cursor'))
+        lifetime = self.get_timeout(request, self.stream_lifetime)
+
+        response = StreamingHttpResponse(
+            self.stream_help_flags(int(pk), after, lifetime),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    def poll_help_flags(self, request, event_id):
+        after = decode_cursor(request.query_params.get('cursor'))
+        timeout = self.get_timeout(request, self.max_poll_timeout)
+
+        waiting = timeout > 0 and self.waiting.acquire(blocking=False)
+        try:
+            alerts = help_flag_broker.poll(event_id, after, timeout if waiting else 0)
+        finally:
+            if waiting:
+                self.waiting.release()
+
+        return Response({
+            "cursor": alerts[-1]['cursor'] if alerts else request.query_params.get('cursor'),
+            "alerts": alerts
+        }, status=status.HTTP_200_OK)
+
+    def stream_help_flags(self, event_id, after, lifetime):
+        # Taken once the stream starts, rather than in the view, so a response that's never sent can't keep it.
+        waiting = self.waiting.acquire(blocking=False)
+        if not waiting:
+            lifetime = 0
+            yield "retry: " + str(self.stream_busy_retry * 1000) + "\n\n"
+
+        try:
+            deadline = time.monotonic() + lifetime
+            alerts = help_flag_broker.poll(event_id, after, 0)
+
+            while True:
+                for alert in alerts:
+                    after = decode_cursor(alert['cursor'])
+                    yield "id: " + alert['cursor'] + "\nevent: help_flag\ndata: " + json.dumps(alert) + "\n\n"
+
+                if not alerts:
+                    yield ": keep-alive\n\n"
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+
+                alerts = help_flag_broker.wait(event_id, after, min(remaining, self.stream_heartbeat))
+        finally:
+            if waiting:
+                self.waiting.release()
+
+    def get_timeout(self, request, maximum):
+        try:
+            timeout = float(request.query_params.get('timeout', maximum))
+        except ValueError:
+            return maximum
+
+        return min(timeout, maximum) if timeout >= 0 else 0
+
+    def get_check_ins(self, event_pk):
+        get_object_or_404(Event.objects.only('id'), id=event_pk)
+
+        self.keyset_ordering = ('arrival_time', 'id')
+        data = EventAttendance.objects.filter(event=event_pk).select_related('guest')
+
+        page = self.paginate_queryset(data)
+        serializer = EventAttendanceSerializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+    def get_permissions(self):
+        """
+        Instantiates and returns the list of permissions that this view requires.
+        """
+
+        admin_only = ['partial_update', 'create']
+
+        if self.action in admin_only:
+            permission_classes = [IsAdminUser]
+        else:
+            permission_classes = [IsAuthenticated]
+        return [permission() for permission in permission_classes]
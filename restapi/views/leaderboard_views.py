@@ -0,0 +1,58 @@
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from restapi.authentication import request_member
+from restapi.data_utilities import protected_fields
+from restapi.mixins import CustomPaginationMixin
+from restapi.models.member_ranks import MemberRank
+from restapi.pagination import KeysetPagination
+from restapi.serializers import LeaderboardSerializer
+
+
+class LeaderboardViewSet(ViewSet, CustomPaginationMixin):
+    """
+    Members ranked by member_score, read from the MemberRank table the scoring engine keeps up to date. Only staff
+    see the scores themselves.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('rank', 'id')
+
+    def list(self, request):
+        """
+        Lists the leaderboard from the top, a page at a time.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = LeaderboardSerializer(page, many=True, fields=self.get_fields(request))
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=False, url_path='me', url_name='me')
+    def me(self, request):
+        """
+        Gets the requesting member's own place on the leaderboard.
+        """
+        rank = get_object_or_404(self.get_queryset(), member=request_member(request))
+        serializer = LeaderboardSerializer(rank, fields=self.get_fields(request))
+
+        return Response(serializer.data)
+
+    def get_queryset(self):
+        return MemberRank.objects.select_related('member').only(
+            'id',
+            'rank',
+            'member_score',
+            'member__id',
+            'member__name',
+            'member__position'
+        )
+
+    def get_fields(self, request):
+        fields = list(LeaderboardSerializer().fields)
+
+        if request.user.is_staff:
+            return fields
+        return [field for field in fields if field not in protected_fields]
@@ -1,7 +1,10 @@
+import io
 import re
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
+from rest_framework.decorators import action
 from rest_framework.viewsets import ViewSet
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
@@ -15,9 +18,17 @@ from django.contrib.auth.models import User
 from restapi.serializers import MemberSerializerAdmin
 from restapi.serializers import MemberSerializerNonAdmin
 
+from restapi.etags import conditional, make_etag, request_state, row_state, version_state
+from restapi.leases import LeaderLease
+from restapi.member_import import MemberImport
+from restapi.member_scores import RECOMPUTE_LEASE, queue_score_updates
 from restapi.mixins import CustomPaginationMixin
+from restapi.pagination import KeysetPagination
+from restapi.response_cache import cache_response
 
-from restapi.data_utilities import apply_search_filters, apply_ordering
+from restapi.data_utilities import apply_search_filters, apply_ordering, parse_ordering, OrderingError
+
+ORDER_BY_PATTERN = re.compile(r'^([a-z_]+)\.(asc|desc)$')
 
 
 class MemberViewSet(ViewSet, CustomPaginationMixin):
@@ -25,10 +36,12 @@ class MemberViewSet(ViewSet, CustomPaginationMixin):
 
     calculated_fields = ['member_score', 'present']
 
-    # TODO: I think there's room for optimization and code cleanup here.
+    @conditional('get_list_etag')
+    @cache_response(Member)
     def list(self, request):
         """
         Lists the member records in the database.
+        Supports ?pagination=cursor for keyset pagination, and ?fields=name,phone to return only those fields.
         """
         data = Member.objects.all().order_by('id')
         data = apply_search_filters(data, request.query_params, request.user.is_staff)
@@ -39,44 +52,96 @@ class MemberViewSet(ViewSet, CustomPaginationMixin):
 
             for op in operations:
                 # Ensuring the commands are in the format we expect.
-                regex = '^([a-z_]+)\.(asc|desc)$'
-                if re.search(regex, op) is None:
+                if ORDER_BY_PATTERN.search(op) is None:
                     return Response({
                         "order_by": "One or more of your ordering parameters are formatted incorrectly. Please ensure "
                                     "they follow the format: ?order_by=name.asc,phone.desc "
                     }, status.HTTP_400_BAD_REQUEST)
 
-            data = apply_ordering(data, request.query_params, request.user.is_staff)
-
-            if type(data) is str:
+            try:
+                data = apply_ordering(data, request.query_params, request.user.is_staff)
+            except OrderingError as e:
                 return Response({
-                    "order_by": str(data)
-                }, status.HTTP_403_FORBIDDEN)
+                    "order_by": e.message
+                }, e.status_code)
 
         if request.user.is_staff:
-            response_object = self.list_admin(request, data)
+            serializer_class = MemberSerializerAdmin
         else:
-            response_object = self.list_nonadmin(request, data)
+            serializer_class = MemberSerializerNonAdmin
 
-        return response_object
+        fields = None
+        if 'fields' in request.query_params:
+            fields = self.get_projected_fields(request.query_params['fields'], serializer_class)
 
-    def list_admin(self, request, data):
-        page = self.paginate_queryset(data)
-        if page is not None:
-            serializer = MemberSerializerAdmin(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        else:
-            serializer = MemberSerializerAdmin(data, many=True)
-            return serializer.data
+            if fields is None:
+                return Response({
+                    "fields": "You can only request the following fields: " +
+                              ", ".join(serializer_class().fields) + "."
+                }, status.HTTP_400_BAD_REQUEST)
+
+            # The ordering columns stay loaded too, since cursors are built from them.
+            data = data.only(*set(fields + self.get_ordering_fields(request)))
+
+        if request.query_params.get('pagination') == 'cursor':
+            self.pagination_class = KeysetPagination
 
-    def list_nonadmin(self, request, data):
         page = self.paginate_queryset(data)
         if page is not None:
-            serializer = MemberSerializerNonAdmin(page, many=True)
+            serializer = serializer_class(page, many=True, fields=fields)
             return self.get_paginated_response(serializer.data)
         else:
-            serializer = MemberSerializerNonAdmin(data, many=True)
-            return serializer.data
+            serializer = serializer_class(data, many=True, fields=fields)
+            return Response(serializer.data)
+
+    def get_list_etag(self, request):
+        """
+        Built from the Member version, so a change to any member changes the ETag of every list, whatever it filters
+        to. The version is kept in the database, so every process gives the same ETag for the same members, and it's
+        read in one small query, which keeps cursor pagination free of a count.
+        """
+        versions = version_state(Member)
+        if versions is None:
+            return None
+
+        return make_etag('members', versions, request_state(request))
+
+    def get_member_etag(self, request, pk=None):
+        updated_at = row_state(Member, pk, request)
+        if updated_at is None:
+            return None
+
+        return make_etag('member', pk, updated_at, bool(request.user.is_staff))
+
+    def get_projected_fields(self, requested, serializer_class):
+        """
+        Returns the requested fields as a list, or None if any of them aren't available to this serializer.
+        """
+        fields = [field.strip() for field in requested.split(",") if field.strip()]
+        available = serializer_class().fields
+
+        if not fields or any(field not in available for field in fields):
+            return None
+        return fields
+
+    def get_keyset_ordering(self, request):
+        """
+        Cursor pagination follows the requested ordering, then search rank, then id.
+        """
+        if 'order_by' in request.query_params:
+            return parse_ordering(request.query_params['order_by'], request.user.is_staff)
+        if request.query_params.get('q', '').strip():
+            return ['-search_rank', 'id']
+        return ['id']
+
+    def get_ordering_fields(self, request):
+        """
+        The Member columns the active ordering reads from.
+        """
+        model_fields = [field.name for field in Member._meta.concrete_fields]
+        ordering = [key.lstrip('-') for key in self.get_keyset_ordering(request)]
+
+        return [field for field in ordering if field in model_fields]
 
     def create(self, request):
         """
@@ -98,6 +163,50 @@ class MemberViewSet(ViewSet, CustomPaginationMixin):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['post'], detail=False, url_path='bulk', url_name='bulk_import')
+    def bulk_import(self, request):
+        """
+        Creates Members and their Users from an uploaded CSV file, sent as the `file` field of a multipart request.
+        Rows that fail validation are reported back without stopping the rest of the import.
+        """
+        if 'file' not in request.FILES:
+            return Response(
+                {'file': 'A CSV file is required, uploaded as the file field of a multipart request.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        csv_file = io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8-sig', newline='')
+        report = MemberImport().run(csv_file)
+
+        if report['created'] == 0 and report['errors']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=False, url_path='scores/recompute', url_name='recompute_scores')
+    def recompute_scores(self, request):
+        """
+        Queues every member to have their member_score recomputed by the MemberScoreUpdater. Refused while the
+        recompute_member_scores command, or a full recompute the updater fell back to, holds the recompute lease.
+        """
+        lease = LeaderLease(RECOMPUTE_LEASE)
+
+        if not lease.acquire():
+            return Response(
+                {'scores': 'Member scores are already being recomputed. Try again in a moment.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            member_ids = list(Member.objects.values_list('id', flat=True))
+            with transaction.atomic():
+                queue_score_updates(member_ids)
+        finally:
+            lease.release()
+
+        return Response({'queued': len(member_ids)}, status=status.HTTP_202_ACCEPTED)
+
+    @conditional('get_member_etag')
+    @cache_response(Member)
     def retrieve(self, request, pk=None):
         """
         Gets a single member record from the table.
@@ -126,6 +235,7 @@ class MemberViewSet(ViewSet, CustomPaginationMixin):
         # update the entirety of a Member record. Especially if PATCH supports multi-field updates already.
         return self.partial_update(request, pk)
 
+    @conditional('get_member_etag')
     def partial_update(self, request, pk=None):
         """
         Updates one or more but not all of the fields from a request.
@@ -190,7 +300,7 @@ class MemberViewSet(ViewSet, CustomPaginationMixin):
         Instantiates and returns the list of permissions that this view requires.
         """
 
-        admin_only = ['update', 'partial_update', 'destroy', 'create']
+        admin_only = ['update', 'partial_update', 'destroy', 'create', 'bulk_import', 'recompute_scores']
 
         if self.action in admin_only:
             permission_classes = [IsAdminUser]
@@ -1,36 +1,29 @@
 import datetime
 import pytz
 
+from django.db.models import Count, Max, Prefetch
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
+from restapi.api_keys import HasCachedAPIKey
+from restapi.etags import conditional, make_etag
 from restapi.mixins import CustomPaginationMixin
 from restapi.models.sober_bro_shifts import SoberBroShift
 from restapi.models.sober_bros import SoberBro
-from restapi.serializers import SoberBroShiftSerializer
-from restapi.serializers import UpcomingSoberBroSerializer
-from rest_framework_api_key.permissions import HasAPIKey
+from restapi.serializers import UpcomingSoberBroShiftSerializer
 
 
 class NextShiftViewSet(ViewSet, CustomPaginationMixin):
-    permission_classes = [HasAPIKey]
+    permission_classes = [HasCachedAPIKey]
 
+    @conditional('get_list_etag')
     def list(self, request):
         """
         Returns a list of shifts beginning in the next 15 minutes, and their associated sober bros.
         """
-        tz = pytz.timezone('America/Denver')
-        now = datetime.datetime.now(tz)
-        max_start = now + datetime.timedelta(minutes=15)
-
         try:
-            data = SoberBroShift.objects.filter(
-                date=now.date(),
-                time_start__gte=now,
-                time_start__lt=max_start,
-                time_end__gt=now
-            )
+            data = self.upcoming_shifts().order_by('time_start', 'id').prefetch_related(self.roster_prefetch())
         except Exception as e:
             print(str(e))
             return Response(
@@ -48,16 +41,46 @@ class NextShiftViewSet(ViewSet, CustomPaginationMixin):
                 status=status.HTTP_200_OK
             )
 
-        serializer = SoberBroShiftSerializer(data, many=True)
+        serializer = UpcomingSoberBroShiftSerializer(data, many=True)
+
+        return Response(serializer.data)
+
+    def upcoming_shifts(self):
+        tz = pytz.timezone('America/Denver')
+        now = datetime.datetime.now(tz)
+        max_start = now + datetime.timedelta(minutes=15)
 
-        for current_shift in serializer.data:
-            assigned_brothers = SoberBro.objects.filter(shift=current_shift["id"])
+        # Filtering on start time alone, since a shift starting just after midnight has tomorrow's date.
+        return SoberBroShift.objects.filter(
+            time_start__gte=now,
+            time_start__lt=max_start,
+            time_end__gt=now
+        )
 
-            brothers_list = []
+    def get_list_etag(self, request):
+        """
+        Built from which shifts are coming up, when each was last saved, and the state of their rosters, which is two
+        small queries in place of loading and serializing them.
+        """
+        shifts = list(self.upcoming_shifts().order_by('id').values_list('id', 'updated_at'))
+        roster = SoberBro.objects.filter(shift__in=[shift_id for shift_id, updated_at in shifts]).aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at'),
+            member_updated_at=Max('member__updated_at')
+        )
 
-            for brother in assigned_brothers:
-                brothers_list.append(UpcomingSoberBroSerializer(brother.member).data)
+        return make_etag('next-shifts', shifts, sorted(roster.items()))
 
-            current_shift["brothers"] = brothers_list
+    def roster_prefetch(self):
+        """
+        Loads every roster for the matched shifts in a single query, joined to only the member columns we return.
+        """
+        roster = SoberBro.objects.select_related('member').only(
+            'id',
+            'shift',
+            'member',
+            'member__name',
+            'member__phone'
+        ).order_by('id')
 
-        return Response(serializer.data)
+        return Prefetch('soberbro_set', queryset=roster)
@@ -1,48 +1,67 @@
 import datetime
-from json import loads, dumps
 
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.settings import api_settings
 from rest_framework.viewsets import ViewSet
 
+from restapi.authentication import request_member
+from restapi.etags import conditional, make_etag, request_state, row_state, version_state
 from restapi.mixins import CustomPaginationMixin
 from restapi.models.members import Member
 from restapi.models.sober_bro_shifts import SoberBroShift
 from restapi.models.sober_bros import SoberBro
-from restapi.serializers import SoberBroSerializer
+from restapi.pagination import KeysetPagination
+from restapi.response_cache import cache_response
+from restapi.serializers import SoberBroRosterSerializer
 from restapi.serializers import SoberBroShiftSerializer
+from restapi.serializers import SoberBroShiftListSerializer
 
 
 class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
-    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    pagination_class = KeysetPagination
+    keyset_ordering = ('date', 'time_start', 'id')
 
+    # The default window starts today, so yesterday's cached pages aren't reused.
+    @conditional('get_list_etag')
+    @cache_response(SoberBroShift, SoberBro, vary=lambda request: datetime.date.today())
     def list(self, request):
         """
-        Lists the Sober Bro shifts in the database.
-        By default, it only grabs shifts within 31 days of the current day. 
+        Lists the Sober Bro shifts in the database, along with how many brothers have signed up for each.
+        By default, it only grabs shifts within 31 days of the current day. The window can be moved with the
+        `start` and `end` query parameters, both in YYYY-MM-DD.
         """
-        today_min = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
-        today_max = self.add_one_month(datetime.datetime.combine(datetime.date.today(), datetime.time.max))
-
         try:
-            data = SoberBroShift.objects.get(date__range=(today_min, today_max))
-        except ObjectDoesNotExist:
+            start, end = self.get_date_range(request.query_params)
+        except ValueError:
             return Response(
                 {
-                    "no_shifts": "There are no shifts found in the next month"
+                    "date_range": "The start and end parameters must be dates in the format YYYY-MM-DD."
                 },
-                status=status.HTTP_200_OK
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if start > end:
+            return Response(
+                {
+                    "date_range": "The start of the date range must not be after the end."
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = SoberBroShiftSerializer(data)
+        data = SoberBroShift.objects.filter(date__range=(start, end)).annotate(filled=Count('soberbro'))
 
-        return Response(serializer.data)
+        page = self.paginate_queryset(data)
+        serializer = SoberBroShiftListSerializer(page, many=True)
+
+        return self.get_paginated_response(serializer.data)
 
+    @conditional('get_shift_etag')
+    @cache_response(SoberBroShift)
     def retrieve(self, request, pk=None):
         """
         Gets a specific sober bro shift from the DB.
@@ -60,7 +79,7 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
             url_path="brothers", url_name='manage_brothers')
     def manage_brothers(self, request, pk=None):
         if request.method == 'GET':
-            return self.get_sober_brothers(pk)
+            return self.get_sober_brothers(request, pk)
 
         if 'member' not in request.data.copy():
             return Response(
@@ -73,8 +92,8 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
         # if the user isn't staff, we only want them to be able to add or remove themselves from shifts.
         if not request.user.is_staff:
             member_request_id = request.data.get('member')
-            current_member = Member.objects.get(email=request.user.email)
-            if member_request_id != current_member.id:
+            member = request_member(request)
+            if member is None or member_request_id != member.id:
                 return Response(
                     {
                         'operation': 'You are trying to either drop or add a sober bro who is not yourself. You do '
@@ -88,12 +107,13 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
         if request.method == 'POST':
             return self.add_sober_brother(pk, request)
 
-    def get_sober_brothers(self, shift_pk):
-        data = SoberBro.objects.filter(shift=shift_pk)
-        serializer = SoberBroSerializer(data, many=True)
+    @conditional('get_roster_etag')
+    @cache_response(SoberBro, SoberBroShift, Member)
+    def get_sober_brothers(self, request, shift_pk):
+        data = SoberBroRosterSerializer.roster_columns(SoberBro.objects.filter(shift=shift_pk).order_by('id'))
+        serializer = SoberBroRosterSerializer(data, many=True)
 
-        return_list = self.trim_data(serializer.data)
-        return Response(return_list, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def delete_sober_brother(self, shift_pk, request):
         validated_data = self.ensure_shift_exists(shift_pk, request.data.copy())
@@ -126,21 +146,56 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
         )
 
     def add_sober_brother(self, shift_pk, request):
-        validated_data = self.ensure_shift_exists(shift_pk, request.data.copy())
+        """
+        Signs a member up for a shift. The shift row stays locked until the sign-up commits, so concurrent
+        sign-ups for the same shift are serialized and can never push it past capacity.
+        """
+        # IntegerField rather than int(), which would take JSON true as member 1.
+        try:
+            member_id = serializers.IntegerField().run_validation(request.data.get('member'))
+        except serializers.ValidationError:
+            member_id = None
 
-        shift = SoberBroShift.objects.get(pk=shift_pk)
-        brothers = SoberBro.objects.filter(shift=shift_pk)
+        member = None
+        if member_id is not None:
+            member = Member.objects.only('id', 'name').filter(id=member_id).first()
 
-        if brothers.count() == shift.capacity:
-            return Response({
-                'shift': 'Shift is currently full. Unable to add another brother.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            serializer = SoberBroSerializer(data=validated_data)
-            if serializer.is_valid():
-                serializer.save()
-                return Response(self.trim_data(serializer.data), status=status.HTTP_201_CREATED)
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if member is None:
+            return Response(
+                {
+                    "member": "The member you attempted to add to the shift does not exist."
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                shift = get_object_or_404(SoberBroShift.objects.select_for_update(), pk=shift_pk)
+                roster = list(SoberBro.objects.filter(shift=shift).values_list('member_id', flat=True))
+
+                if member_id in roster:
+                    return self.already_signed_up_response()
+
+                if len(roster) >= shift.capacity:
+                    return Response({
+                        'shift': 'Shift is currently full. Unable to add another brother.'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
+                sober_bro = SoberBro.objects.create(shift=shift, member=member)
+        except IntegrityError:
+            # The unique constraint on (shift, member) is the backstop if the lock is ever bypassed.
+            return self.already_signed_up_response()
+
+        serializer = SoberBroRosterSerializer(sober_bro)
+        return Response([serializer.data], status=status.HTTP_201_CREATED)
+
+    def already_signed_up_response(self):
+        return Response(
+            {
+                "member": "The member you're attempting to assign is already signed up for this shift."
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
     def create(self, request):
         validated_data = request.data.copy()
@@ -169,6 +224,7 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
         # update the entirety of a SoberBroShift record. Especially if PATCH supports multi-field updates already.
         return self.partial_update(request, pk)
 
+    @conditional('get_shift_etag')
     def partial_update(self, request, pk=None):
         queryset = SoberBroShift.objects.all()
         shift = get_object_or_404(queryset, id=pk)
@@ -201,30 +257,40 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
 
             )
 
-    # TODO: Remove this. It's a crutch because I'm not fully an expert with nested serializers yet.
-    def trim_data(self, serializer_data):
-        return_list = []
-        data = loads(dumps(serializer_data))
-
-        if type(data) is list:
-            for objects in data:
-                shift = objects.pop('shift')
-                member = objects.pop('member')
-
-                stripped_shift = {'id': shift['id'], 'title': shift['title']}
-                stripped_member = {'id': member['id'], 'name': member['name']}
+    def get_list_etag(self, request):
+        """
+        Built from the shift and sign-up versions, so any change to either changes the ETag of every window. They're
+        kept in the database, so every process gives the same ETag for the same shifts.
+        """
+        versions = version_state(SoberBroShift, SoberBro)
+        if versions is None:
+            return None
 
-                return_list.append({'shift': stripped_shift, 'member': stripped_member})
-        elif type(data) is dict:
-            shift = data.pop('shift')
-            member = data.pop('member')
+        return make_etag('shifts', versions, datetime.date.today(), request_state(request))
 
-            stripped_shift = {'id': shift['id'], 'title': shift['title']}
-            stripped_member = {'id': member['id'], 'name': member['name']}
+    def get_shift_etag(self, request, pk=None):
+        updated_at = row_state(SoberBroShift, pk, request)
+        if updated_at is None:
+            return None
 
-            return_list.append({'shift': stripped_shift, 'member': stripped_member})
+        return make_etag('shift', pk, updated_at)
 
-        return return_list
+    def get_roster_etag(self, request, shift_pk):
+        """
+        Roster rows show the shift's title and the members' names, so their last saves count too.
+        """
+        try:
+            roster = SoberBro.objects.filter(shift=shift_pk)
+        except ValueError:
+            return None
+
+        state = roster.aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at'),
+            member_updated_at=Max('member__updated_at'),
+            shift_updated_at=Max('shift__updated_at')
+        )
+        return make_etag('roster', shift_pk, sorted(state.items()))
 
     def ensure_shift_exists(self, shift_pk, validated_data):
         if 'shift' not in validated_data:
@@ -236,6 +302,22 @@ class SoberBroShiftViewSet(ViewSet, CustomPaginationMixin):
         use_date = dt0 + datetime.timedelta(days=+31)
         return use_date
 
+    def get_date_range(self, query_params):
+        """
+        Returns the (start, end) dates requested, defaulting to today through 31 days from now.
+        """
+        if 'start' in query_params:
+            start = datetime.date.fromisoformat(query_params['start'])
+        else:
+            start = datetime.date.today()
+
+        if 'end' in query_params:
+            end = datetime.date.fromisoformat(query_params['end'])
+        else:
+            end = self.add_one_month(start)
+
+        return start, end
+
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
@@ -0,0 +1,10 @@
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from restapi.serializers import MemberTokenObtainPairSerializer
+
+
+class MemberTokenObtainPairView(TokenObtainPairView):
+    """
+    /api/token/, issuing tokens with the claims restapi.authentication.MemberJWTAuthentication checks.
+    """
+    serializer_class = MemberTokenObtainPairSerializer
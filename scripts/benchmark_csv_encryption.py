@@ -0,0 +1,119 @@
+"""
+
+    Purpose: Times csv_encryption_manager against a synthetic roster export.
+
+    Compares the original cell-by-cell approach (a new Fernet per cell, one write per cell) with the streamed
+    single-Fernet path and the process pool, and checks that every encrypted file decrypts back to the input.
+
+        python scripts/benchmark_csv_encryption.py --rows 100000 --workers 4
+
+"""
+
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import csv_encryption_manager  # noqa: E402
+
+
+def write_synthetic_roster(path, rows):
+    generator = random.Random(2021)
+
+    with open(path, "w", newline="") as output_file:
+        writer = csv.writer(output_file, lineterminator="\n")
+        writer.writerow(["name", "email", "phone", "rollnumber", "position", "address"])
+
+        for index in range(rows):
+            first = "".join(generator.choices(string.ascii_lowercase, k=7)).capitalize()
+            last = "".join(generator.choices(string.ascii_lowercase, k=9)).capitalize()
+            writer.writerow([
+                first + " " + last,
+                first.lower() + "." + last.lower() + "@example.com",
+                "+1555" + str(generator.randrange(1000000, 9999999)),
+                str(1000 + index),
+                "Brother",
+                str(generator.randrange(100, 9999)) + " College Ave",
+            ])
+
+
+def legacy_encrypt(input_path, output_path, key):
+    """
+    The loop encrypt_file used before it streamed, minus the prompts.
+    """
+    with open(input_path, "r") as input_file, open(output_path, "w") as output_file:
+        current_line = input_file.readline()
+        while current_line != '':
+            processed = current_line.strip().split(",")
+
+            for x in range(0, len(processed)):
+                output_file.write(csv_encryption_manager.encrypt(processed[x], key))
+                if x < (len(processed) - 1):
+                    output_file.write(",")
+                else:
+                    output_file.write("\n")
+            current_line = input_file.readline()
+
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    print("{:<24}{:>8.2f}s".format(label, elapsed))
+    return elapsed
+
+
+def assert_round_trip(source, encrypted, key, directory):
+    decrypted = os.path.join(directory, "round_trip.csv")
+    csv_encryption_manager.transform_file(encrypted, decrypted, key, "decrypt")
+
+    with open(source, "r") as expected, open(decrypted, "r") as actual:
+        if expected.read() != actual.read():
+            raise AssertionError(encrypted + " did not decrypt back to the original roster.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks CSV encryption on a synthetic roster.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-legacy", action="store_true", help="Leave out the original cell-by-cell loop.")
+    args = parser.parse_args()
+
+    key = Fernet.generate_key()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "roster.csv")
+        write_synthetic_roster(source, args.rows)
+        print("{} rows, {:.1f} MB, {} workers".format(args.rows, os.path.getsize(source) / 1e6, args.workers))
+
+        results = {}
+        if not args.skip_legacy:
+            output = os.path.join(directory, "legacy.csv")
+            results["legacy"] = timed("legacy", legacy_encrypt, source, output, key)
+            assert_round_trip(source, output, key, directory)
+
+        output = os.path.join(directory, "streamed.csv")
+        results["streamed"] = timed("streamed", csv_encryption_manager.transform_file, source, output, key,
+                                    "encrypt")
+        assert_round_trip(source, output, key, directory)
+
+        output = os.path.join(directory, "parallel.csv")
+        results["parallel"] = timed("parallel", csv_encryption_manager.transform_file, source, output, key,
+                                    "encrypt", args.workers)
+        assert_round_trip(source, output, key, directory)
+
+        if "legacy" in results:
+            for label in ("streamed", "parallel"):
+                print("{} speedup over legacy: {:.1f}x".format(label, results["legacy"] / results[label]))
+
+
+if __name__ == "__main__":
+    main()
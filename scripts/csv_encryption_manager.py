@@ -4,77 +4,132 @@
     Date: 19 January 2021
     Purpose: This script provides encryption and decryption methods for CSV files.
 
+    Every cell is encrypted on its own, so an encrypted file is still a CSV with the same shape as the original.
+    Run with no arguments for the interactive prompts, or non-interactively:
+
+        python scripts/csv_encryption_manager.py encrypt brothers.csv
+        python scripts/csv_encryption_manager.py decrypt encrypted_brothers.csv --key <key> --workers 4
+
+    The key can also come from the DB_ENCRYPTION_KEY environment variable, which is what populate_encrypted reads.
+    When encrypting without a key, one is generated and printed.
+
 """
 
+import argparse
+import csv
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from cryptography.fernet import Fernet
 
+KEY_ENVIRONMENT_VARIABLE = "DB_ENCRYPTION_KEY"
+
+# Rows handed to a worker at a time, and the file buffer size. Both are large enough to amortize per-call overhead.
+CHUNK_ROWS = 2000
+BUFFER_SIZE = 1 << 20
+
+# Each worker process builds its Fernet once, in init_worker, and reuses it for every chunk it's given.
+_worker_fernet = None
+
 
 def encrypt_file():
     filename = input("Please enter the name of the file to encrypt: ")
-    try:
-        input_file = open(filename, "r")
-    except FileNotFoundError as e:
-        print(e)
+    if not os.path.isfile(filename):
+        print("No such file: " + filename)
         exit(1)
 
-    output_file = open("encrypted_" + filename, "w")
-
     encryption_key = Fernet.generate_key()
     print("We'll generate a cryptographically secure encryption key for you...")
     print("Encryption key:\n" + str(encryption_key.decode()))
 
-    current_line = input_file.readline()
-    while current_line != '':
-        processed = current_line.strip().split(",")
-
-        for x in range(0, len(processed)):
-            csv = encrypt(processed[x], encryption_key)
-            output_file.write(str(csv))
-            if x < (len(processed) - 1):
-                output_file.write(",")
-            else:
-                output_file.write("\n")
-        current_line = input_file.readline()
-
-    input_file.close()
-    output_file.close()
+    transform_file(filename, output_name(filename, "encrypt"), encryption_key, "encrypt")
     print("Successfully encrypted comma separated values.")
 
 
 def decrypt_file():
     filename = input("Please enter the name of the file to decrypt: ")
-
-    input_file = None
-
-    try:
-        input_file = open(filename, "r")
-    except FileNotFoundError as e:
-        print(e)
+    if not os.path.isfile(filename):
+        print("No such file: " + filename)
         exit(1)
 
-    output_file = open("decrypted_" + filename.replace("encrypted_", ""), "w")
-
     encryption_key = input("Please enter the encryption key used:")
     encryption_key = encryption_key.strip().encode()
 
-    current_line = input_file.readline()
-    while current_line != '':
-        processed = current_line.strip().split(",")
-
-        for x in range(0, len(processed)):
-            csv = decrypt(processed[x], encryption_key)
-            output_file.write(str(csv))
-            if x < (len(processed) - 1):
-                output_file.write(",")
-            else:
-                output_file.write("\n")
-        current_line = input_file.readline()
-
-    input_file.close()
-    output_file.close()
+    transform_file(filename, output_name(filename, "decrypt"), encryption_key, "decrypt")
     print("Successfully decrypted comma separated values.")
 
 
+def transform_file(input_path, output_path, key, mode, workers=1, chunk_rows=CHUNK_ROWS):
+    """
+    Encrypts or decrypts every cell of input_path into output_path, streaming chunk_rows rows at a time.
+    With more than one worker, chunks are spread over a process pool and written back in their original order.
+    Returns the number of rows written.
+    """
+    rows_written = 0
+
+    with open(input_path, "r", newline="", buffering=BUFFER_SIZE) as input_file, \
+            open(output_path, "w", newline="", buffering=BUFFER_SIZE) as output_file:
+        reader = csv.reader(input_file)
+        writer = csv.writer(output_file, lineterminator="\n")
+        chunks = iter(lambda: list(islice(reader, chunk_rows)), [])
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(key,)) as pool:
+                for chunk in ordered_map(pool, transform_chunk_in_worker, chunks, mode, workers * 2):
+                    writer.writerows(chunk)
+                    rows_written += len(chunk)
+        else:
+            fernet = Fernet(key)
+            for chunk in chunks:
+                chunk = transform_chunk(fernet, chunk, mode)
+                writer.writerows(chunk)
+                rows_written += len(chunk)
+
+    return rows_written
+
+
+def transform_chunk(fernet, rows, mode):
+    if mode == "encrypt":
+        return [[fernet.encrypt(cell.encode()).decode() for cell in row] for row in rows]
+    return [[fernet.decrypt(cell.encode()).decode() for cell in row] for row in rows]
+
+
+def init_worker(key):
+    global _worker_fernet
+    _worker_fernet = Fernet(key)
+
+
+def transform_chunk_in_worker(rows, mode):
+    return transform_chunk(_worker_fernet, rows, mode)
+
+
+def ordered_map(pool, function, chunks, mode, window):
+    """
+    Like pool.map, but only keeps `window` chunks in flight, so memory stays bounded however large the file is.
+    Results come back in submission order.
+    """
+    pending = deque()
+
+    for chunk in chunks:
+        pending.append(pool.submit(function, chunk, mode))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def output_name(input_path, mode):
+    directory, filename = os.path.split(input_path)
+
+    if mode == "encrypt":
+        return os.path.join(directory, "encrypted_" + filename)
+    return os.path.join(directory, "decrypted_" + filename.replace("encrypted_", ""))
+
+
 def encrypt(csv, key):
     f = Fernet(key)
     encrypted = f.encrypt(csv.encode())
@@ -85,3 +140,42 @@ def decrypt(csv, key):
     f = Fernet(key)
     decrypted = f.decrypt(csv.encode())
     return decrypted.decode()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encrypts or decrypts every cell of a CSV file with Fernet.")
+    parser.add_argument("mode", choices=["encrypt", "decrypt"])
+    parser.add_argument("input", help="The CSV file to read.")
+    parser.add_argument("-o", "--output", help="Where to write the result. Defaults to encrypted_/decrypted_ "
+                                               "alongside the input.")
+    parser.add_argument("-k", "--key", default=os.environ.get(KEY_ENVIRONMENT_VARIABLE),
+                        help="The Fernet key. Defaults to $" + KEY_ENVIRONMENT_VARIABLE + ".")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Processes to spread the rows across.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows handed to a worker at a time.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.input):
+        parser.error("No such file: " + args.input)
+
+    key = args.key
+    if key is None:
+        if args.mode == "decrypt":
+            parser.error("A key is required to decrypt. Pass --key or set " + KEY_ENVIRONMENT_VARIABLE + ".")
+
+        key = Fernet.generate_key().decode()
+        print("Generated encryption key:\n" + key, file=sys.stderr)
+
+    output = args.output or output_name(args.input, args.mode)
+    rows = transform_file(args.input, output, key.strip().encode(), args.mode, args.workers, args.chunk_rows)
+
+    print(args.mode.capitalize() + "ed " + str(rows) + " rows into " + output, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        if input("Would you like to encrypt or decrypt a file? ").strip().lower().startswith("d"):
+            decrypt_file()
+        else:
+            encrypt_file()
+    else:
+        main()